@@ -1,7 +1,17 @@
 # ai_client.py - Gelişmiş AI Tarif Sistemi
 import streamlit as st
-from typing import List, Dict
-import random
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from ai_throttle import FlightStream, RequestThrottle, finished_stream
+from atomic_json import AtomicJsonFile
+from expiry_engine import expiry_to_ordinal
+from recipe_index import RECIPES_FILE, get_recipe_index, render_recipe
+from utils import NON_FOOD_CATEGORIES, get_setting, normalize_name
 
 # Gemini AI'ı dene, yoksa gelişmiş mock kullan
 try:
@@ -12,10 +22,254 @@ except ImportError:
     GEMINI_AVAILABLE = False
 
 
+def recipe_cache_key(kind: str, inventory_items: List[Dict] = (), expiring_items: List[Dict] = (),
+                     selected_items: List[str] = (), cuisine_type: str = "") -> str:
+    """İstek girdilerinden sıra ve yazım farklarına duyarsız önbellek anahtarı üret"""
+    payload = {
+        "kind": kind,
+        "inventory": sorted(
+            (normalize_name(item.get('name')), str(item.get('quantity', 0)), normalize_name(item.get('unit', 'adet')))
+            for item in inventory_items
+        ),
+        "expiring": sorted(
+            (normalize_name(item.get('name')), str(item.get('expiry_date', '')), str(item.get('quantity', 0)))
+            for item in expiring_items
+        ),
+        "selected": sorted(normalize_name(name) for name in selected_items),
+        "cuisine": normalize_name(cuisine_type),
+    }
+    raw = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    """Yerel token tahmini (yaklaşık 4 karakter = 1 token)"""
+    return (len(text) + 3) // 4
+
+
+def _compact_whitespace(text: str) -> str:
+    """İstek şablonundaki girinti boşluklarını at"""
+    return "\n".join(line.strip() for line in text.strip().splitlines())
+
+
+def _item_line(item: Dict, with_expiry: bool = False) -> str:
+    amount = f"{item.get('quantity', 0)} {item.get('unit', 'adet')}"
+    if with_expiry:
+        return f"- {item['name']} (SKT: {item['expiry_date']}, {amount})"
+    return f"- {item['name']} ({amount})"
+
+
+def compact_recipe_items(inventory_items: List[Dict], expiring_items: List[Dict], token_budget: int,
+                         base_tokens: int = 0) -> Tuple[List[Dict], List[Dict], Dict]:
+    """Tarif isteğine girecek malzemeleri seç
+
+    Yiyecek olmayan kategoriler çıkarılır, aynı adlı ürünler birleştirilir ve
+    ürünler son kullanma aciliyetine göre sıralanıp tahmini token bütçesi
+    dolana kadar alınır. Son kullanması yaklaşanlar önce gelir ve tüm
+    malzemeler listesinde tekrarlanmaz. (yaklaşanlar, diğerleri, rapor) döndürür.
+    """
+    expiring_names = {normalize_name(item.get('name')) for item in expiring_items}
+    merged: Dict[str, Dict] = {}
+    seen = set()
+    excluded = duplicates = 0
+
+    for item in list(expiring_items) + list(inventory_items):
+        # get_expiring_items envanterdeki sözlüklerin kendisini döndürür; iki kez sayma
+        identity = item.get('id') or id(item)
+        if identity in seen:
+            continue
+        seen.add(identity)
+
+        if item.get('category') in NON_FOOD_CATEGORIES:
+            excluded += 1
+            continue
+
+        key = normalize_name(item.get('name'))
+        if not key:
+            continue
+        ordinal = item.get('expiry_ordinal')
+        if ordinal is None and item.get('expiry_date'):
+            ordinal = expiry_to_ordinal(item['expiry_date'])
+
+        entry = merged.get(key)
+        if entry is None:
+            merged[key] = {
+                'name': " ".join(str(item['name']).split()),
+                'quantity': item.get('quantity', 0),
+                'unit': item.get('unit', 'adet'),
+                'expiry_date': item.get('expiry_date', ''),
+                'expiry_ordinal': ordinal,
+            }
+            continue
+
+        duplicates += 1
+        quantity = item.get('quantity', 0)
+        if entry['unit'] == item.get('unit', 'adet') and isinstance(entry['quantity'], (int, float)) \
+                and isinstance(quantity, (int, float)):
+            entry['quantity'] += quantity
+        if ordinal is not None and (entry['expiry_ordinal'] is None or ordinal < entry['expiry_ordinal']):
+            entry['expiry_date'] = item.get('expiry_date', '')
+            entry['expiry_ordinal'] = ordinal
+
+    ranked = sorted(merged.items(), key=lambda pair: (pair[1]['expiry_ordinal'] is None,
+                                                      pair[1]['expiry_ordinal'] or 0, pair[0]))
+    candidates = [(entry, True) for key, entry in ranked if key in expiring_names]
+    candidates += [(entry, False) for key, entry in ranked if key not in expiring_names]
+
+    expiring, others = [], []
+    tokens = base_tokens
+    for entry, is_expiring in candidates:
+        line_tokens = estimate_tokens(_item_line(entry, is_expiring)) + 1
+        if tokens + line_tokens > token_budget:
+            break
+        tokens += line_tokens
+        (expiring if is_expiring else others).append(entry)
+
+    used = len(expiring) + len(others)
+    report = {
+        'items_total': len(seen),
+        'excluded_non_food': excluded,
+        'duplicates': duplicates,
+        'items_used': used,
+        'trimmed': len(candidates) - used,
+        'tokens': tokens,
+        'token_budget': token_budget,
+    }
+    return expiring, others, report
+
+
+class RecipeCache:
+    """Gemini yanıtları için TTL'li, LRU sınırlı ve diske kaydedilen önbellek
+
+    Kayıtlar `{"entries": {anahtar: {"text", "created_at"}}}` biçiminde JSON
+    dosyasında tutulur; dosyadaki sıra LRU sırasıdır (en eski başta).
+    """
+
+    def __init__(self, path: Optional[str] = "recipe_cache.json", ttl_seconds: float = 24 * 3600,
+                 max_entries: int = 200):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._file = AtomicJsonFile(path) if path else None
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if self._file is None:
+            return
+        try:
+            data = self._file.read() or {}
+        except ValueError:
+            # Bozuk önbellek dosyası kritik değil, boş başla
+            data = {}
+        now = time.time()
+        for key, entry in data.get("entries", {}).items():
+            if now - entry.get("created_at", 0) < self.ttl_seconds:
+                self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _persist(self, snapshot: Dict[str, Dict]):
+        if self._file is None:
+            return
+        try:
+            self._file.update(lambda data: data.update(entries=snapshot))
+        except OSError:
+            # Diske yazılamazsa önbellek bellekte çalışmaya devam eder
+            pass
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["created_at"] >= self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["text"]
+
+    def put(self, key: str, text: str):
+        with self._lock:
+            self._entries[key] = {"text": text, "created_at": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            snapshot = dict(self._entries)
+        self._persist(snapshot)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self._persist({})
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+class _RecipeRequest:
+    __slots__ = ("cache_key", "build_prompt", "fallback", "error_label", "report")
+
+    def __init__(self, cache_key: str, build_prompt: Callable[[], str], fallback: Callable[[], str],
+                 error_label: str, report: Optional[Dict] = None):
+        self.cache_key = cache_key
+        self.build_prompt = build_prompt
+        self.fallback = fallback
+        self.error_label = error_label
+        self.report = report
+
+
+class _RenderTarget:
+    """_render_real_ai'de bir alanın akışı ve o ana kadar yazılan yanıt"""
+    __slots__ = ("container", "placeholder", "request", "stream", "text", "hedged")
+
+    def __init__(self, container: Any, request: _RecipeRequest, stream: FlightStream):
+        self.container = container
+        self.placeholder = container.empty()
+        self.request = request
+        self.stream = stream
+        self.text = ""
+        self.hedged = False
+
+
 class GeminiClient:
     def __init__(self):
         """Gemini AI'ı başlat"""
         self.use_real_ai = False
+        self.recipe_cache = RecipeCache(
+            get_setting("RECIPE_CACHE_FILE", "recipe_cache.json"),
+            ttl_seconds=float(get_setting("RECIPE_CACHE_TTL_HOURS", 24)) * 3600,
+            max_entries=int(get_setting("RECIPE_CACHE_MAX_ENTRIES", 200))
+        )
+        # get_gemini() süreç genelinde paylaşıldığı için sınır tüm oturumlar için geçerlidir
+        self.throttle = RequestThrottle(
+            rate_per_minute=float(get_setting("GEMINI_RATE_PER_MINUTE", 15)),
+            burst=int(get_setting("GEMINI_BURST", 5)),
+            max_queue=int(get_setting("GEMINI_MAX_QUEUE", 20)),
+            max_wait=float(get_setting("GEMINI_MAX_QUEUE_WAIT_SECONDS", 30)),
+            max_concurrency=int(get_setting("GEMINI_MAX_CONCURRENCY", 4))
+        )
+        # Bu sürede ilk parça gelmezse mock tarifler gösterilir; gerçek yanıt en fazla
+        # request_timeout saniye beklenir. Bütçe zaman aşımının yarısıyla sınırlıdır,
+        # böylece mock tarifler zaman aşımından önce mutlaka gösterilir.
+        self.request_timeout = float(get_setting("GEMINI_TIMEOUT_SECONDS", 60))
+        self.latency_budget = min(float(get_setting("GEMINI_LATENCY_BUDGET_SECONDS", 5)), self.request_timeout / 2)
+        # Büyük envanterlerde istek bu tahmini token sayısına sığacak şekilde kırpılır
+        self.prompt_token_budget = int(get_setting("GEMINI_PROMPT_TOKEN_BUDGET", 2000))
+        # Mock motorun tarif derlemi bir kez yüklenip indekslenir
+        self.recipe_index = get_recipe_index(get_setting("RECIPE_CORPUS_FILE", RECIPES_FILE))
 
         if GEMINI_AVAILABLE:
             try:
@@ -33,36 +287,216 @@ class GeminiClient:
         else:
             st.info("🤖 Gelişmiş Mock AI kullanılıyor")
 
-    def get_recipe_suggestions(self, inventory_items: List[Dict], expiring_items: List[Dict]) -> str:
+    def get_recipe_suggestions(self, inventory_items: List[Dict], expiring_items: List[Dict],
+                               bypass_cache: bool = False) -> str:
         """Tarif önerileri"""
+        return "".join(self.stream_recipe_suggestions(inventory_items, expiring_items, bypass_cache))
+
+    def get_custom_recipe_suggestions(self, selected_items: List[str], cuisine_type: str = "Türk",
+                                      bypass_cache: bool = False) -> str:
+        """Seçilen malzemeler için özel tarif önerileri"""
+        return "".join(self.stream_custom_recipe_suggestions(selected_items, cuisine_type, bypass_cache))
+
+    def stream_recipe_suggestions(self, inventory_items: List[Dict], expiring_items: List[Dict],
+                                  bypass_cache: bool = False) -> Iterator[str]:
+        """Tarif önerilerini üretildikçe parça parça döndür (st.write_stream ile kullanılır)"""
         if self.use_real_ai:
-            return self._get_real_ai_recipes(inventory_items, expiring_items)
+            return self._stream_real_ai(self._recipe_request(inventory_items, expiring_items), bypass_cache)
+        return _stream_text(self._get_smart_mock_recipes(inventory_items, expiring_items))
+
+    def stream_custom_recipe_suggestions(self, selected_items: List[str], cuisine_type: str = "Türk",
+                                         bypass_cache: bool = False) -> Iterator[str]:
+        """Özel tarif önerilerini üretildikçe parça parça döndür"""
+        if self.use_real_ai:
+            return self._stream_real_ai(self._custom_request(selected_items, cuisine_type), bypass_cache)
+        return _stream_text(self._get_smart_custom_recipes(selected_items, cuisine_type))
+
+    def render_recipe_suggestions(self, inventory_items: List[Dict], expiring_items: List[Dict],
+                                  bypass_cache: bool = False):
+        """Tarif önerilerini sayfaya yaz; AI gecikirse önce mock tarifleri göster"""
+        if self.use_real_ai:
+            request = self._recipe_request(inventory_items, expiring_items)
+            report = request.report
+            st.caption(f"📏 AI isteği: {report['items_used']}/{report['items_total']} ürün, "
+                       f"~{report['tokens']} token")
+            self._render_real_ai([(st, request)], bypass_cache)
         else:
-            return self._get_smart_mock_recipes(inventory_items, expiring_items)
+            st.write_stream(_stream_text(self._get_smart_mock_recipes(inventory_items, expiring_items)))
 
-    def get_custom_recipe_suggestions(self, selected_items: List[str], cuisine_type: str = "Türk") -> str:
-        """Seçilen malzemeler için özel tarif önerileri"""
+    def render_custom_recipe_suggestions(self, selected_items: List[str], cuisine_type: str = "Türk",
+                                         bypass_cache: bool = False):
+        """Özel tarif önerilerini sayfaya yaz; AI gecikirse önce mock tarifleri göster"""
         if self.use_real_ai:
-            return self._get_real_custom_recipes(selected_items, cuisine_type)
+            self._render_real_ai([(st, self._custom_request(selected_items, cuisine_type))], bypass_cache)
         else:
-            return self._get_smart_custom_recipes(selected_items, cuisine_type)
+            st.write_stream(_stream_text(self._get_smart_custom_recipes(selected_items, cuisine_type)))
 
-    def _get_real_ai_recipes(self, inventory_items: List[Dict], expiring_items: List[Dict]) -> str:
-        """Gerçek AI'dan tarif al"""
+    def render_multi_cuisine_recipes(self, selected_items: List[str], cuisine_types: List[str],
+                                     bypass_cache: bool = False):
+        """Her mutfak türü için ayrı sekmede tarif öner; istekler aynı anda gönderilir"""
+        if len(cuisine_types) == 1:
+            self.render_custom_recipe_suggestions(selected_items, cuisine_types[0], bypass_cache)
+            return
+
+        tabs = st.tabs([f"🍽️ {cuisine_type}" for cuisine_type in cuisine_types])
+        if self.use_real_ai:
+            self._render_real_ai([
+                (tab, self._custom_request(selected_items, cuisine_type))
+                for tab, cuisine_type in zip(tabs, cuisine_types)
+            ], bypass_cache)
+        else:
+            for tab, cuisine_type in zip(tabs, cuisine_types):
+                tab.write_stream(_stream_text(self._get_smart_custom_recipes(selected_items, cuisine_type)))
+
+    def compact_recipe_prompt(self, inventory_items: List[Dict], expiring_items: List[Dict]) -> Tuple[str, Dict]:
+        """Sıkıştırılmış tarif isteğini ve boyut raporunu döndür"""
+        request = self._recipe_request(inventory_items, expiring_items)
+        return request.build_prompt(), request.report
+
+    def get_throttle_stats(self) -> Dict:
+        """Gemini çağrı kuyruğu ve bekleme süresi istatistikleri"""
+        return self.throttle.stats()
+
+    def _recipe_request(self, inventory_items: List[Dict], expiring_items: List[Dict]) -> _RecipeRequest:
+        base_tokens = estimate_tokens(self._build_recipe_prompt([], []))
+        prompt_expiring, prompt_others, report = compact_recipe_items(
+            inventory_items, expiring_items, self.prompt_token_budget, base_tokens
+        )
+        return _RecipeRequest(
+            recipe_cache_key("expiring", prompt_others, prompt_expiring),
+            lambda: self._build_recipe_prompt(prompt_expiring, prompt_others),
+            lambda: self._get_smart_mock_recipes(inventory_items, expiring_items),
+            "AI tarif hatası",
+            report
+        )
+
+    def _custom_request(self, selected_items: List[str], cuisine_type: str) -> _RecipeRequest:
+        return _RecipeRequest(
+            recipe_cache_key("custom", selected_items=selected_items, cuisine_type=cuisine_type),
+            lambda: self._build_custom_prompt(selected_items, cuisine_type),
+            lambda: self._get_smart_custom_recipes(selected_items, cuisine_type),
+            "Özel tarif hatası"
+        )
+
+    def _open_real_stream(self, request: _RecipeRequest, bypass_cache: bool = False) -> FlightStream:
+        """Önbellekteki yanıtı ya da Gemini akışını döndür
+
+        Tamamlanan yanıtlar önbelleğe yazılır. `bypass_cache` önbellekteki yanıtı
+        atlayıp yenisini üretir (ve önbellekteki kaydı onunla değiştirir). Aynı
+        anahtarla süren bir çağrı varsa yeni çağrı yapılmaz, onun akışına katılınır.
+        """
+        if not bypass_cache:
+            cached = self.recipe_cache.get(request.cache_key)
+            if cached is not None:
+                return finished_stream(cached.splitlines(keepends=True))
+
+        def start():
+            # Arka plan iş parçacığında çalışır; istek ve akış request_timeout ile sınırlıdır
+            deadline = time.monotonic() + self.request_timeout
+            response = self.model.generate_content(request.build_prompt(), stream=True,
+                                                   request_options={"timeout": self.request_timeout})
+            for chunk in response:
+                if time.monotonic() > deadline:
+                    raise TimeoutError("Gemini yanıtı zaman aşımına uğradı")
+                yield chunk.text
+
+        # Mock yanıtları ve yarım kalan akışlar önbelleğe alınmaz
+        return self.throttle.stream(request.cache_key, start,
+                                    on_complete=lambda text: self.recipe_cache.put(request.cache_key, text))
+
+    def _stream_real_ai(self, request: _RecipeRequest, bypass_cache: bool = False,
+                        stream: Optional[FlightStream] = None) -> Iterator[str]:
+        """Gemini akışından gelen parçaları ilet; hiç parça gelmeden hata olursa mock'a dön"""
+        started = False
         try:
-            expiring_list = [
-                f"- {item['name']} (SKT: {item['expiry_date']}, {item.get('quantity', 0)} {item.get('unit', 'adet')})"
-                for item in expiring_items]
-            all_items = [f"- {item['name']} ({item.get('quantity', 0)} {item.get('unit', 'adet')})" for item in
-                         inventory_items]
+            if stream is None:
+                stream = self._open_real_stream(request, bypass_cache)
+            for text in stream:
+                started = True
+                yield text
+        except Exception as e:
+            st.error(f"❌ {request.error_label}: {str(e)}")
+            if not started:
+                yield from _stream_text(request.fallback())
+        finally:
+            # Sayfa yarıda kesilirse (ör. yeniden çalıştırma) abonelik bırakılır
+            if stream is not None:
+                stream.close()
+
+    def _render_real_ai(self, targets: List[Tuple[Any, _RecipeRequest]], bypass_cache: bool = False):
+        """İstekleri birlikte başlat, her alanı kendi yanıtı geldikçe parça parça doldur
+
+        Tüm akışlar aynı döngüde yoklanır; bir alanın uzun yanıtı diğerlerinin gecikme
+        bütçesi ve zaman aşımı denetimini geciktirmez. Bütçe aşılırsa henüz yanıtı
+        gelmeyen alanlara mock tarifler yazılır; gerçek yanıt gelince yerine konur.
+        `targets` (alan, istek) çiftleridir; alan `st` ya da bir sekme/kapsayıcı olabilir.
+        """
+        pending = []
+        for container, request in targets:
+            try:
+                stream = self._open_real_stream(request, bypass_cache)
+            except Exception as e:
+                container.error(f"❌ {request.error_label}: {str(e)}")
+                container.write_stream(_stream_text(request.fallback()))
+                continue
+            pending.append(_RenderTarget(container, request, stream))
 
-            prompt = f"""
+        started = time.monotonic()
+        try:
+            while pending:
+                progressed = False
+                for target in list(pending):
+                    try:
+                        parts, finished = target.stream.poll()
+                    except Exception as e:
+                        target.container.error(f"❌ {target.request.error_label}: {str(e)}")
+                        if not target.text and not target.hedged:
+                            target.placeholder.markdown(target.request.fallback())
+                        parts, finished = [], True
+                    if parts:
+                        target.text += "".join(parts)
+                        target.placeholder.markdown(target.text)
+                        progressed = True
+                    if finished:
+                        pending.remove(target)
+                        target.stream.close()
+
+                elapsed = time.monotonic() - started
+                # Bütçe ve zaman aşımı yalnızca henüz hiç parça gelmemiş alanlar için
+                waiting = [target for target in pending if not target.text]
+                if elapsed >= self.latency_budget:
+                    for target in waiting:
+                        if not target.hedged:
+                            target.hedged = True
+                            with target.placeholder.container():
+                                st.info("⏳ AI yanıtı gecikiyor, şimdilik hazır tarifler gösteriliyor...")
+                                st.markdown(target.request.fallback())
+                if elapsed >= self.request_timeout:
+                    for target in waiting:
+                        if not target.hedged:
+                            target.placeholder.markdown(target.request.fallback())
+                        target.container.warning("⚠️ AI yanıtı zaman aşımına uğradı, hazır tarifler gösteriliyor.")
+                        pending.remove(target)
+                        target.stream.close()
+                if pending and not progressed:
+                    time.sleep(0.05)
+        finally:
+            # Beklenmeyen akışlardan ayrıl; başka abonesi yoksa Gemini çağrısı bırakılır
+            for target in pending:
+                target.stream.close()
+
+    def _build_recipe_prompt(self, expiring_items: List[Dict], other_items: List[Dict]) -> str:
+        """Son kullanma tarihi yaklaşan ürünler için tarif isteği (malzemeler compact_recipe_items'tan)"""
+        expiring_list = [_item_line(item, with_expiry=True) for item in expiring_items]
+        all_items = [_item_line(item) for item in other_items]
+
+        return _compact_whitespace(f"""
             Bir ev envanteri uygulamasında kullanıcıya yardım ediyorsun.
 
             YAKINDA SON KULLANMA TARİHİ GEÇECEKLERİ (ÖNCELİK):
             {chr(10).join(expiring_list)}
 
-            TÜM MEVCUT MALZEMELER:
+            DİĞER MEVCUT MALZEMELER:
             {chr(10).join(all_items)}
 
             Lütfen:
@@ -84,21 +518,17 @@ class GeminiClient:
             2. [adım 2]
 
             **İpucu:** [özel ipucu]
-            """
-
-            response = self.model.generate_content(prompt)
-            return response.text
-
-        except Exception as e:
-            st.error(f"❌ AI tarif hatası: {str(e)}")
-            return self._get_smart_mock_recipes(inventory_items, expiring_items)
+            """)
 
-    def _get_real_custom_recipes(self, selected_items: List[str], cuisine_type: str) -> str:
-        """Gerçek AI'dan özel tarif al"""
-        try:
-            items_text = ", ".join(selected_items)
+    def _build_custom_prompt(self, selected_items: List[str], cuisine_type: str) -> str:
+        """Seçilen malzemeler için tarif isteği"""
+        # Aynı malzeme farklı yazımlarla birden fazla seçilmiş olabilir
+        unique_items = {}
+        for name in selected_items:
+            unique_items.setdefault(normalize_name(name), " ".join(str(name).split()))
+        items_text = ", ".join(unique_items.values())
 
-            prompt = f"""
+        return _compact_whitespace(f"""
             Kullanıcı şu malzemeleri seçti: {items_text}
             Mutfak türü: {cuisine_type}
 
@@ -119,14 +549,7 @@ class GeminiClient:
             1. [detaylı adım]
             2. [detaylı adım]
             **İpucu:** [özel ipucu]
-            """
-
-            response = self.model.generate_content(prompt)
-            return response.text
-
-        except Exception as e:
-            st.error(f"❌ Özel tarif hatası: {str(e)}")
-            return self._get_smart_custom_recipes(selected_items, cuisine_type)
+            """)
 
     def _get_smart_mock_recipes(self, inventory_items: List[Dict], expiring_items: List[Dict]) -> str:
         """Gelişmiş mock tarif önerileri"""
@@ -134,27 +557,13 @@ class GeminiClient:
             return "✅ Şu anda son kullanma tarihi yaklaşan ürün bulunmuyor. Tüm ürünleriniz taze!"
 
         recipes = []
-        recipe_database = self._get_recipe_database()
-
-        for item in expiring_items[:3]:
-            item_name = item.get('name', '').lower()
-            quantity = item.get('quantity', 0)
-            unit = item.get('unit', 'adet')
-
-            # Malzeme bazlı tarif seçimi
-            matching_recipes = []
-            for ingredient, recipe_list in recipe_database.items():
-                if ingredient in item_name:
-                    matching_recipes.extend(recipe_list)
-
-            if matching_recipes:
-                recipe = random.choice(matching_recipes)
-                recipe_text = recipe.format(
-                    item_name=item.get('name', 'Malzeme'),
-                    quantity=quantity,
-                    unit=unit
-                )
-                recipes.append(recipe_text)
+
+        # Yaklaşan ürünleri en çok kullanan, malzemeleri en çok elde olan tarifler
+        for recipe, covered_items in self.recipe_index.rank(inventory_items, expiring_items, k=3):
+            recipes.append(render_recipe(recipe, ", ".join(
+                f"{item.get('name', 'Malzeme')} ({item.get('quantity', 0)} {item.get('unit', 'adet')})"
+                for item in covered_items
+            )))
 
         if not recipes:
             # Genel tarif önerisi
@@ -188,85 +597,11 @@ class GeminiClient:
         # Malzeme kombinasyonlarına göre tarif önerileri
         recipes = []
 
-        if len(selected_items) == 1:
-            item = selected_items[0].lower()
-            if 'domates' in item:
-                recipes.append(f"""
-## 🍅 Domates Salatası (2 kişilik, 10 dakika)
-**Ana Malzemeler:** {items_text}
-**Ek Malzemeler:** Soğan, zeytinyağı, limon, tuz
-**Yapılışı:**
-1. Domatesleri dilimleyin
-2. İnce doğranmış soğan ekleyin
-3. Zeytinyağı, limon ve tuz ile karıştırın
-**İpucu:** Taze ve sağlıklı bir seçenek!
-""")
-            elif 'yumurta' in item:
-                recipes.append(f"""
-## 🍳 Sahanda Yumurta (1 kişilik, 5 dakika)
-**Ana Malzemeler:** {items_text}
-**Ek Malzemeler:** Tereyağı, tuz, karabiber
-**Yapılışı:**
-1. Tavayı ısıtın ve tereyağı ekleyin
-2. Yumurtayı kırıp tavaya alın
-3. Tuz ve karabiber serpip pişirin
-**İpucu:** Hızlı ve pratik bir kahvaltı!
-""")
-            elif 'tavuk' in item:
-                recipes.append(f"""
-## 🍗 Tavuk Izgara (2 kişilik, 20 dakika)
-**Ana Malzemeler:** {items_text}
-**Ek Malzemeler:** Zeytinyağı, tuz, karabiber, kekik
-**Yapılışı:**
-1. Tavuğu marine edin
-2. Izgarada veya tavada pişirin
-3. Baharatlarla lezzetlendirin
-**İpucu:** Salata ile servis edin!
-""")
-            elif 'mayonez' in item:
-                recipes.append(f"""
-## 🥗 Mayonezli Patates Salatası (3-4 kişilik, 15 dakika)
-**Ana Malzemeler:** {items_text}
-**Ek Malzemeler:** Patates, havuç, bezelye, turşu
-**Yapılışı:**
-1. Patatesleri haşlayın
-2. Sebzeleri doğrayın
-3. Mayonez ile karıştırın
-**İpucu:** Soğuk servis edin!
-""")
-
+        recipe = self.recipe_index.custom_recipe_for(selected_items)
+        if recipe is not None:
+            recipes.append(render_recipe(recipe, items_text))
         elif len(selected_items) >= 2:
-            # Çoklu malzeme tarifleri
-            if any('yumurta' in item.lower() for item in selected_items) and any(
-                    'domates' in item.lower() for item in selected_items):
-                recipes.append(f"""
-## 🍳 Menemen (2-3 kişilik, 15 dakika)
-**Ana Malzemeler:** {items_text}
-**Ek Malzemeler:** Soğan, biber, zeytinyağı, tuz
-**Yapılışı:**
-1. Soğan ve biberi doğrayıp kavurun
-2. Domatesleri ekleyip pişirin
-3. Yumurtaları çırpıp ekleyin
-4. Karıştırarak pişirin
-**İpucu:** Türk mutfağının klasik lezzeti!
-""")
-
-            elif any('tavuk' in item.lower() for item in selected_items) and any(
-                    'mayonez' in item.lower() for item in selected_items):
-                recipes.append(f"""
-## 🍗 Tavuklu Sandviç (2 kişilik, 10 dakika)
-**Ana Malzemeler:** {items_text}
-**Ek Malzemeler:** Ekmek, marul, domates
-**Yapılışı:**
-1. Tavuğu haşlayıp didikleyin
-2. Mayonez ile karıştırın
-3. Ekmek arasına koyun
-4. Sebzelerle süsleyin
-**İpucu:** Pratik ve doyurucu!
-""")
-
-            else:
-                recipes.append(f"""
+            recipes.append(f"""
 ## 🍽️ {cuisine_type} Usulü Karışık Yemek (3-4 kişilik, 25 dakika)
 **Ana Malzemeler:** {items_text}
 **Ek Malzemeler:** Soğan, sarımsak, zeytinyağı, baharat
@@ -292,86 +627,10 @@ class GeminiClient:
 
         return "\n---\n".join(recipes)
 
-    def _get_recipe_database(self):
-        """Tarif veritabanı"""
-        return {
-            'domates': [
-                """
-## 🍅 Domates Soslu Makarna (3-4 kişilik, 25 dakika)
-**Ana Malzemeler:** {item_name} ({quantity} {unit})
-**Ek Malzemeler:** Makarna (300g), soğan, sarımsak, zeytinyağı
-**Yapılışı:**
-1. Makarnayı haşlayın
-2. Soğan ve sarımsakları kavurun
-3. Domatesleri ekleyip sos yapın
-4. Makarna ile karıştırıp servis edin
-**İpucu:** Taze fesleğen eklerseniz daha lezzetli olur!
-""",
-                """
-## 🍅 Domates Çorbası (4 kişilik, 30 dakika)
-**Ana Malzemeler:** {item_name} ({quantity} {unit})
-**Ek Malzemeler:** Soğan, tereyağı, un, süt, baharat
-**Yapılışı:**
-1. Domatesleri haşlayıp geçirin
-2. Soğanı kavurup un ekleyin
-3. Domates püresini ve sıcak suyu ekleyin
-4. Süt ile koyulaştırıp servis edin
-**İpucu:** Üzerine krema damlatabilirsiniz!
-"""
-            ],
-            'yumurta': [
-                """
-## 🍳 Omlet (1-2 kişilik, 10 dakika)
-**Ana Malzemeler:** {item_name} ({quantity} {unit})
-**Ek Malzemeler:** Süt, tuz, tereyağı, peynir (isteğe bağlı)
-**Yapılışı:**
-1. Yumurtaları çırpın, süt ve tuz ekleyin
-2. Tavayı ısıtıp tereyağı ekleyin
-3. Yumurta karışımını dökün
-4. Peynir ekleyip katlayın
-**İpucu:** Sebze ekleyerek çeşitlendirebilirsiniz!
-"""
-            ],
-            'süt': [
-                """
-## 🥛 Sütlaç (4-5 kişilik, 45 dakika)
-**Ana Malzemeler:** {item_name} ({quantity} {unit})
-**Ek Malzemeler:** Pirinç (1/2 su bardağı), şeker, vanilya
-**Yapılışı:**
-1. Pirinci haşlayın
-2. Sütü ekleyip kaynatın
-3. Şeker ve vanilya ile tatlandırın
-4. Koyulaşana kadar pişirin
-**İpucu:** Üzerine tarçın serpebilirsiniz!
-"""
-            ],
-            'tavuk': [
-                """
-## 🍗 Tavuk Sote (3-4 kişilik, 35 dakika)
-**Ana Malzemeler:** {item_name} ({quantity} {unit})
-**Ek Malzemeler:** Soğan, biber, domates, baharat
-**Yapılışı:**
-1. Tavuğu küp küp doğrayın
-2. Sebzeleri kavurun
-3. Tavuğu ekleyip pişirin
-4. Baharatlarla lezzetlendirin
-**İpucu:** Pilav ile servis edebilirsiniz!
-"""
-            ],
-            'mayonez': [
-                """
-## 🥗 Rus Salatası (4-5 kişilik, 20 dakika)
-**Ana Malzemeler:** {item_name} ({quantity} {unit})
-**Ek Malzemeler:** Patates, havuç, bezelye, turşu, yumurta
-**Yapılışı:**
-1. Sebzeleri haşlayıp doğrayın
-2. Yumurtaları haşlayın
-3. Mayonez ile karıştırın
-4. Soğuk servis edin
-**İpucu:** Bir gece bekletirseniz daha lezzetli olur!
-"""
-            ]
-        }
+
+def _stream_text(text: str) -> Iterator[str]:
+    """Hazır metni satır satır akış olarak döndür (mock motoru da aynı arayüzü kullanır)"""
+    yield from text.splitlines(keepends=True)
 
 
 @st.cache_resource
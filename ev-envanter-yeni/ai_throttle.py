@@ -0,0 +1,279 @@
+# ai_throttle.py - Gemini çağrıları için istek birleştirme ve hız sınırlama
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class ThrottleError(Exception):
+    """Kuyruk dolu ya da bekleme süresi aşıldı"""
+
+
+class FlightAbandoned(Exception):
+    """Akışın tüm aboneleri ayrıldı; üst akış çağrısı bırakıldı"""
+
+
+class TokenBucket:
+    """Saniyede `rate` jeton dolan, en fazla `capacity` jeton biriktiren kova"""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_estimate(self, ahead: int = 0) -> float:
+        """Önünde `ahead` istek bekleyen yeni bir isteğin jeton için bekleyeceği tahmini süre"""
+        with self._lock:
+            self._refill(self._clock())
+            return max(0.0, (ahead + 1 - self._tokens) / self.rate)
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """Bir jeton al ve beklenen süreyi döndür; süre aşılırsa ThrottleError"""
+        start = self._clock()
+        deadline = None if timeout is None else start + timeout
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return now - start
+                needed = (1 - self._tokens) / self.rate
+            if deadline is not None and now + needed > deadline:
+                raise ThrottleError("Gemini istek sınırı: bekleme süresi aşıldı")
+            self._sleep(needed)
+
+
+class _Flight:
+    """Tek bir üst akış çağrısının sonuçlarını tüm abonelere dağıtır"""
+
+    def __init__(self):
+        self.parts = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.abandoned = False
+        self.cond = threading.Condition()
+
+    def push(self, text: str):
+        with self.cond:
+            self.parts.append(text)
+            self.cond.notify_all()
+
+    def finish(self, error: Optional[BaseException] = None):
+        with self.cond:
+            self.error = error
+            self.done = True
+            self.cond.notify_all()
+
+    def subscribe(self) -> Optional["FlightStream"]:
+        """Akışa abone ol; tüm aboneler ayrıldığı için bırakılmışsa None"""
+        with self.cond:
+            if self.abandoned:
+                return None
+            self.subscribers += 1
+        return FlightStream(self)
+
+    def unsubscribe(self):
+        with self.cond:
+            self.subscribers -= 1
+            if self.subscribers <= 0 and not self.done:
+                self.abandoned = True
+
+
+class FlightStream:
+    """Bir akışa abonelik: parçaları baştan itibaren, geldikçe döndürür"""
+
+    def __init__(self, flight: _Flight):
+        self._flight = flight
+        self._index = 0
+        self._closed = False
+
+    def close(self):
+        """Akıştan ayrıl; son abone de ayrılırsa üst akış çağrısı bırakılır"""
+        if not self._closed:
+            self._closed = True
+            self._flight.unsubscribe()
+
+    def wait_ready(self, timeout: Optional[float]) -> bool:
+        """İlk parça gelene ya da akış bitene kadar en fazla `timeout` saniye bekle"""
+        flight = self._flight
+        with flight.cond:
+            return flight.cond.wait_for(lambda: flight.parts or flight.done, timeout)
+
+    def poll(self) -> Tuple[List[str], bool]:
+        """Beklemeden, son çağrıdan bu yana gelen parçalar ve akışın bitip bitmediği
+
+        Akış hatayla bittiyse kalan parçalar alındıktan sonraki çağrıda hata yükseltilir.
+        """
+        flight = self._flight
+        with flight.cond:
+            new_parts = flight.parts[self._index:]
+            self._index = len(flight.parts)
+            finished = flight.done
+        if finished and not new_parts and flight.error is not None:
+            raise flight.error
+        return new_parts, finished and flight.error is None
+
+    def __iter__(self) -> Iterator[str]:
+        flight = self._flight
+        while True:
+            with flight.cond:
+                while self._index == len(flight.parts) and not flight.done:
+                    flight.cond.wait()
+                new_parts = flight.parts[self._index:]
+                self._index = len(flight.parts)
+                finished = flight.done
+            yield from new_parts
+            if finished and self._index == len(flight.parts):
+                if flight.error is not None:
+                    raise flight.error
+                return
+
+
+def finished_stream(parts: Iterable[str]) -> FlightStream:
+    """Hazır parçalardan tamamlanmış bir akış oluştur (ör. önbellekteki yanıt)"""
+    flight = _Flight()
+    flight.parts = list(parts)
+    flight.done = True
+    return flight.subscribe()
+
+
+class RequestThrottle:
+    """Aynı anahtarlı eşzamanlı istekleri tek çağrıda birleştirir, çağrıları jeton kovasıyla sınırlar
+
+    Her yeni çağrı en fazla `max_concurrency` iş parçacıklı havuzda jeton bekler ve
+    akışı çalıştırır; aynı anahtarla gelen istekler bu akışa abone olur. Tüm aboneler
+    `close` ile ayrılırsa çağrı başlamadan ya da sonraki parçada bırakılır. Çağrı, üst
+    akış başlayana kadar (boş iş parçacığı ve jeton beklerken) kuyrukta sayılır.
+    Kuyrukta en fazla `max_queue` çağrı bekler; kuyruk doluysa, jeton bekleme tahmini
+    `max_wait`i aşıyorsa ya da çağrı `max_wait` saniye içinde başlayamazsa
+    ThrottleError yükseltilir. `clock`/`sleep` testlerde sahte saatle değiştirilebilir.
+    """
+
+    def __init__(self, rate_per_minute: float = 15, burst: int = 5, max_queue: int = 20,
+                 max_wait: Optional[float] = 30.0, max_concurrency: int = 4,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst, clock=clock, sleep=sleep)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="gemini")
+        self._clock = clock
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._queued = 0
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.abandoned = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def stream(self, key: str, start: Callable[[], Iterable[str]],
+               on_complete: Optional[Callable[[str], None]] = None) -> FlightStream:
+        """`start()` akışını çalıştır ya da aynı anahtarlı süren akışa katıl"""
+        with self._lock:
+            flight = self._flights.get(key)
+            subscription = flight.subscribe() if flight is not None else None
+            if subscription is not None:
+                self.coalesced += 1
+                return subscription
+            if self._queued >= self.max_queue:
+                self.rejected += 1
+                raise ThrottleError("Gemini istek kuyruğu dolu")
+            # Öndeki çağrılar da jeton bekleyecek; sınır aşılacaksa hemen reddet
+            if self.max_wait is not None and self.bucket.wait_estimate(self._queued) > self.max_wait:
+                self.rejected += 1
+                raise ThrottleError("Gemini istek sınırı: bekleme süresi aşılacak")
+            flight = _Flight()
+            subscription = flight.subscribe()
+            self._flights[key] = flight
+            self._queued += 1
+
+        self._executor.submit(self._run, key, flight, start, on_complete, self._clock())
+        return subscription
+
+    def _run(self, key: str, flight: _Flight, start: Callable[[], Iterable[str]],
+             on_complete: Optional[Callable[[str], None]], queued_at: float):
+        try:
+            try:
+                if flight.abandoned:
+                    raise FlightAbandoned("Gemini isteği başlamadan bırakıldı")
+                # Boş iş parçacığı beklenen süre de max_wait'e sayılır
+                remaining = None
+                if self.max_wait is not None:
+                    remaining = self.max_wait - (self._clock() - queued_at)
+                    if remaining <= 0:
+                        raise ThrottleError("Gemini istek sınırı: bekleme süresi aşıldı")
+                self.bucket.acquire(remaining)
+            finally:
+                with self._lock:
+                    self._queued -= 1
+            if flight.abandoned:
+                raise FlightAbandoned("Gemini isteği başlamadan bırakıldı")
+            waited = self._clock() - queued_at
+            with self._lock:
+                self.upstream_calls += 1
+                self.wait_count += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+            upstream = iter(start())
+            try:
+                for text in upstream:
+                    if flight.abandoned:
+                        raise FlightAbandoned("Gemini akışı yarıda bırakıldı")
+                    if text:
+                        flight.push(text)
+            finally:
+                # Bırakılan akışın bağlantısı hemen kapansın
+                close = getattr(upstream, "close", None)
+                if close is not None:
+                    close()
+        except Exception as e:
+            with self._lock:
+                self._release(key, flight)
+                if isinstance(e, ThrottleError):
+                    self.rejected += 1
+                elif isinstance(e, FlightAbandoned):
+                    self.abandoned += 1
+            flight.finish(e)
+            return
+
+        # Aboneler akışın sonunu görmeden önce sonuç kaydedilsin (ör. önbelleğe)
+        if on_complete is not None and flight.parts:
+            try:
+                on_complete("".join(flight.parts))
+            except Exception:
+                pass
+        with self._lock:
+            self._release(key, flight)
+        flight.finish()
+
+    def _release(self, key: str, flight: _Flight):
+        """Biten akışı kaydından sil; aynı anahtarla yeni bir akış başladıysa ona dokunma"""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "upstream_calls": self.upstream_calls,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "abandoned": self.abandoned,
+                "in_flight": len(self._flights),
+                "queued": self._queued,
+                "avg_wait_seconds": self.wait_total / self.wait_count if self.wait_count else 0.0,
+                "max_wait_seconds": self.wait_max,
+            }
@@ -0,0 +1,225 @@
+# alert_scheduler.py - Tüm kullanıcılar için günlük son kullanma uyarısı taraması (Streamlit dışında çalışır)
+#
+# Kullanım:
+#   python alert_scheduler.py once [--sink sqlite:alerts_outbox.db] [--state alert_state.json]
+#   python alert_scheduler.py daemon [--hour 7] [--sink jsonl:alerts.jsonl]
+import argparse
+import json
+import os
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from atomic_json import AtomicJsonFile
+from utils import get_setting
+
+# Uyarılar sayfasındaki "Kritik (3 gün içinde)" bölümüyle aynı pencere
+CRITICAL_DAYS = 3
+
+
+class JsonlAlertSink:
+    """Uyarıları dosyaya satır başına bir JSON olarak ekler"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def emit(self, alerts: List[Dict]) -> int:
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for alert in alerts:
+                f.write(json.dumps(alert, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return len(alerts)
+
+    def close(self):
+        pass
+
+
+class SQLiteAlertOutbox:
+    """Uyarıları gönderilmeyi bekleyen kayıtlar olarak SQLite tablosunda tutar (outbox)
+
+    Aynı uyarı (kullanıcı, ürün, seviye, son kullanma günü) bir kez yazılır; tarama
+    yarıda kalıp tekrarlansa da çift kayıt oluşmaz. Gönderici `pending` ile okuyup
+    `mark_delivered` ile işaretler.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS alert_outbox (
+            alert_id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            level TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            delivered_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_alert_outbox_pending ON alert_outbox (delivered_at, created_at);
+    """
+
+    def __init__(self, db_file: str = "alerts_outbox.db"):
+        self.db_file = db_file
+        self._conn = sqlite3.connect(db_file, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.executescript(self.SCHEMA)
+
+    def emit(self, alerts: List[Dict]) -> int:
+        with self._conn:
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO alert_outbox (alert_id, user_id, level, payload, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(alert['alert_id'], alert['user_id'], alert['level'],
+                  json.dumps(alert, ensure_ascii=False), alert['created_at']) for alert in alerts]
+            )
+        return cursor.rowcount
+
+    def pending(self, limit: int = 100) -> List[Dict]:
+        """Henüz gönderilmemiş uyarılar, eskiden yeniye"""
+        rows = self._conn.execute(
+            "SELECT payload FROM alert_outbox WHERE delivered_at IS NULL ORDER BY created_at, alert_id LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return [json.loads(row["payload"]) for row in rows]
+
+    def mark_delivered(self, alert_ids: Iterable[str]):
+        now = time.time()
+        with self._conn:
+            self._conn.executemany("UPDATE alert_outbox SET delivered_at = ? WHERE alert_id = ?",
+                                   [(now, alert_id) for alert_id in alert_ids])
+
+    def close(self):
+        self._conn.close()
+
+
+def create_alert_sink(spec: str):
+    """Ayardan uyarı hedefini oluştur ("sqlite:<dosya>" ya da "jsonl:<dosya>")"""
+    kind, _, path = spec.partition(":")
+    if kind == "sqlite":
+        return SQLiteAlertOutbox(path or "alerts_outbox.db")
+    if kind == "jsonl":
+        return JsonlAlertSink(path or "alerts.jsonl")
+    raise ValueError(f"Bilinmeyen uyarı hedefi: {spec}")
+
+
+def sweep(source: Callable[[Optional[int], Optional[int]], Iterable[Tuple[str, Dict]]], sink,
+          state_file: str = "alert_state.json", today: Optional[date] = None,
+          critical_days: int = CRITICAL_DAYS, batch_size: int = 500,
+          clock: Callable[[], float] = time.time) -> Dict:
+    """Tüm kullanıcıların ürünlerini tek akışta tarayıp son taramadan bu yana yeni uyarıları yaz
+
+    `source(expiry_from, expiry_to)` son kullanma günü aralıktaki (user_id, ürün)
+    çiftlerini akış halinde vermelidir (ör. FirebaseClient.iter_expiring_items);
+    yalnızca [son tarama günü, bugün + critical_days] aralığı okunur ve uyarılar
+    `batch_size`'lık parçalarla yazılır, bellek kullanımı kullanıcı sayısından bağımsızdır.
+
+    Yeni uyarılar:
+    - critical: son taramada pencerenin dışındayken kritik pencereye girenler ve
+      son taramadan sonra eklenip pencerede olanlar
+    - expired: son taramadan bu yana süresi geçenler
+    İlk taramada yalnızca kritik penceredeki ürünler için uyarı üretilir.
+    """
+    today_ordinal = (today or date.today()).toordinal()
+    state = AtomicJsonFile(state_file)
+    previous = state.read() or {}
+    last_day = min(previous.get('last_day', today_ordinal), today_ordinal)
+    last_sweep_at = previous.get('last_sweep_at', 0.0)
+    # Tarama sürerken eklenen ürünler bir sonraki taramada da "yeni" sayılır (outbox tekrarı yazmaz)
+    started_at = clock()
+
+    counts = {'scanned': 0, 'critical': 0, 'expired': 0, 'written': 0}
+    batch = []
+    for user_id, item in source(last_day, today_ordinal + critical_days):
+        counts['scanned'] += 1
+        ordinal = item['expiry_ordinal']
+        if ordinal >= today_ordinal:
+            added_since = (item.get('created_at') or 0) > last_sweep_at
+            if ordinal <= last_day + critical_days and not added_since:
+                # Son taramada da kritikti, uyarısı verildi
+                continue
+            level = "critical"
+        else:
+            # Son taramada henüz süresi geçmemişti
+            level = "expired"
+
+        counts[level] += 1
+        batch.append({
+            'alert_id': f"{user_id}:{item['id']}:{level}:{ordinal}",
+            'user_id': user_id,
+            'item_id': item['id'],
+            'name': item.get('name', 'Bilinmeyen'),
+            'level': level,
+            'expiry_date': item.get('expiry_date', ''),
+            'days_left': ordinal - today_ordinal,
+            'created_at': started_at
+        })
+        if len(batch) >= batch_size:
+            counts['written'] += sink.emit(batch)
+            batch = []
+    if batch:
+        counts['written'] += sink.emit(batch)
+
+    # Durum yalnızca tarama tamamlanınca ilerler; yarıda kalan tarama aynı aralıkla tekrarlanır
+    state.update(lambda data: data.update({'last_day': today_ordinal, 'last_sweep_at': started_at}))
+    return counts
+
+
+def next_run_at(now: datetime, hour: int) -> datetime:
+    """Bir sonraki günlük tarama zamanı"""
+    run_at = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    return run_at if run_at > now else run_at + timedelta(days=1)
+
+
+def run_sweep(args) -> Dict:
+    from firebase_client import FirebaseClient
+
+    sink = create_alert_sink(args.sink)
+    try:
+        counts = sweep(FirebaseClient().iter_expiring_items, sink, args.state, critical_days=args.critical_days)
+    finally:
+        sink.close()
+    print(f"✅ {counts['scanned']} ürün tarandı: {counts['critical']} kritik, {counts['expired']} süresi geçmiş, "
+          f"{counts['written']} yeni uyarı yazıldı.", flush=True)
+    return counts
+
+
+def _daemon_sweep(args):
+    """Daemon taraması: hata daemon'u durdurmaz, yarım kalan aralık sonraki taramada yeniden taranır"""
+    try:
+        run_sweep(args)
+    except Exception as e:
+        print(f"❌ Uyarı taraması hatası: {str(e)}", flush=True)
+
+
+def run_daemon(args):
+    """Her gün `hour`da tara; kaçırılmış bir gün varsa başlarken hemen tara"""
+    last_day = (AtomicJsonFile(args.state).read() or {}).get('last_day')
+    if last_day is None or last_day < date.today().toordinal():
+        _daemon_sweep(args)
+    while True:
+        run_at = next_run_at(datetime.now(), args.hour)
+        print(f"⏰ Sonraki tarama: {run_at:%Y-%m-%d %H:%M}", flush=True)
+        time.sleep(max(0.0, (run_at - datetime.now()).total_seconds()))
+        _daemon_sweep(args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Son kullanma uyarısı zamanlayıcısı")
+    parser.add_argument("--sink", default=get_setting("ALERT_SINK", "sqlite:alerts_outbox.db"),
+                        help='"sqlite:<dosya>" ya da "jsonl:<dosya>"')
+    parser.add_argument("--state", default=get_setting("ALERT_STATE_FILE", "alert_state.json"))
+    parser.add_argument("--critical-days", type=int, default=int(get_setting("ALERT_CRITICAL_DAYS", CRITICAL_DAYS)))
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    once = subparsers.add_parser("once", help="Tek tarama yap ve çık")
+    once.set_defaults(func=run_sweep)
+
+    daemon = subparsers.add_parser("daemon", help="Her gün belirli saatte tara")
+    daemon.add_argument("--hour", type=int, default=int(get_setting("ALERT_SWEEP_HOUR", 7)))
+    daemon.set_defaults(func=run_daemon)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,9 @@ import streamlit as st
 from firebase_client import get_firebase
 from ai_client import get_gemini
 from utils import *
+from expiry_engine import analyze_inventory
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import plotly.express as px
 
 # Sayfa konfigürasyonu
@@ -143,14 +144,42 @@ def main_dashboard():
         show_recipes()
 
 
+# Grafikler özet değerlerine göre önbellekte tutulur; değerler değişmediyse rerun'da
+# Plotly figürü yeniden kurulmaz. Önbellek tüm oturumlarca paylaşılır ve sınırlıdır.
+CHART_CACHE_MAX_ENTRIES = int(get_setting("CHART_CACHE_MAX_ENTRIES", 64))
+
+
+@st.cache_resource(max_entries=CHART_CACHE_MAX_ENTRIES, show_spinner=False)
+def category_chart(categories):
+    """Kategori dağılımı pasta grafiği; categories (kategori, adet) çiftleri"""
+    return px.pie(
+        values=[count for _, count in categories],
+        names=[category for category, _ in categories],
+        title="Ürün Kategorileri"
+    )
+
+
+@st.cache_resource(max_entries=CHART_CACHE_MAX_ENTRIES, show_spinner=False)
+def expiry_chart(expiry_status):
+    """Son kullanma durumu çubuk grafiği; expiry_status (durum, adet) çiftleri"""
+    counts = [count for _, count in expiry_status]
+    return px.bar(
+        x=[status for status, _ in expiry_status],
+        y=counts,
+        title="Son Kullanma Tarihi Durumu",
+        color=counts,
+        color_continuous_scale="RdYlGn_r"
+    )
+
+
 def show_dashboard():
     """Ana dashboard göster"""
     st.markdown('<h1 class="main-header">🏠 Ev Envanter Dashboard</h1>', unsafe_allow_html=True)
 
-    # Envanter verilerini al
+    # Metrikler ve grafikler tüm ürünler yerine kullanıcının özet kaydından okunur
     user_id = st.session_state.user['localId']
-    inventory = st.session_state.firebase.get_inventory(user_id)
-    stats = calculate_inventory_stats(inventory)
+    summary = st.session_state.firebase.get_inventory_stats(user_id)
+    stats = summary.stats()
 
     # Üst metrikler
     col1, col2, col3, col4 = st.columns(4)
@@ -188,50 +217,25 @@ def show_dashboard():
     with col1:
         if stats['categories']:
             st.subheader("📊 Kategori Dağılımı")
-            fig = px.pie(
-                values=list(stats['categories'].values()),
-                names=list(stats['categories'].keys()),
-                title="Ürün Kategorileri"
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(category_chart(tuple(sorted(stats['categories'].items()))), use_container_width=True)
         else:
             st.info("📦 Henüz ürün eklenmemiş.")
 
     with col2:
-        if inventory:
+        if stats['total_items']:
             st.subheader("📅 Son Kullanma Tarihi Durumu")
 
             # Son kullanma durumu analizi
-            expiry_status = {"İyi": 0, "Yaklaşıyor": 0, "Kritik": 0, "Geçmiş": 0}
-
-            for item in inventory:
-                expiry_date = item.get('expiry_date', '')
-                if expiry_date:
-                    days_left = days_until_expiry(expiry_date)
-                    if days_left < 0:
-                        expiry_status["Geçmiş"] += 1
-                    elif days_left <= 3:
-                        expiry_status["Kritik"] += 1
-                    elif days_left <= 7:
-                        expiry_status["Yaklaşıyor"] += 1
-                    else:
-                        expiry_status["İyi"] += 1
-
-            fig = px.bar(
-                x=list(expiry_status.keys()),
-                y=list(expiry_status.values()),
-                title="Son Kullanma Tarihi Durumu",
-                color=list(expiry_status.values()),
-                color_continuous_scale="RdYlGn_r"
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            expiry_status = summary.status_counts()
+            st.plotly_chart(expiry_chart(tuple(expiry_status.items())), use_container_width=True)
 
     # Son eklenen ürünler
-    if inventory:
+    recent, _ = st.session_state.firebase.query_inventory(user_id, order_by="created_at", descending=True, limit=5)
+    if recent:
         st.subheader("🆕 Son Eklenen Ürünler")
-        recent_items = sorted(inventory, key=lambda x: x.get('created_at', ''), reverse=True)[:5]
+        analysis = analyze_inventory(recent)
 
-        for item in recent_items:
+        for index, item in enumerate(recent):
             col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
 
             with col1:
@@ -241,13 +245,36 @@ def show_dashboard():
             with col3:
                 expiry_date = item.get('expiry_date', '')
                 if expiry_date:
-                    days_left = days_until_expiry(expiry_date)
+                    days_left = int(analysis.days_left[index])
                     emoji, status, color = get_expiry_status(days_left)
                     st.write(f"{emoji} {format_date_turkish(expiry_date)}")
             with col4:
                 st.write(f"🏷️ {item.get('category', 'Diğer')}")
 
 
+def inventory_table(items):
+    """Envanter sayfasını tablo olarak hazırla (satır indeksi ürün id'si)"""
+    analysis = analyze_inventory(items)
+    rows = []
+    for index, item in enumerate(items):
+        expiry, remaining = "", ""
+        if item.get('expiry_date'):
+            days_left = int(analysis.days_left[index])
+            emoji, status, color = get_expiry_status(days_left)
+            expiry = f"{emoji} {format_date_turkish(item['expiry_date'])}"
+            remaining = f"{days_left} gün kaldı" if days_left >= 0 else "Süresi geçmiş"
+        rows.append({
+            "Ürün": item.get('name', 'Bilinmeyen'),
+            "Miktar": f"{item.get('quantity', 0)} {item.get('unit', 'adet')}",
+            "Kategori": item.get('category', 'Diğer'),
+            "Son Kullanma": expiry,
+            "Kalan": remaining,
+            "Konum": item.get('location', ''),
+            "Notlar": item.get('notes', '')
+        })
+    return pd.DataFrame(rows, index=[item['id'] for item in items])
+
+
 def show_inventory():
     """Envanter sayfası"""
     st.markdown('<h1 class="main-header">📦 Envanter Yönetimi</h1>', unsafe_allow_html=True)
@@ -290,83 +317,138 @@ def show_inventory():
                 else:
                     st.error("❌ Ürün adı gereklidir!")
 
-    # Mevcut ürünleri listele
-    inventory = st.session_state.firebase.get_inventory(user_id)
-
-    if inventory:
-        st.subheader(f"📋 Mevcut Ürünler ({len(inventory)} adet)")
+    # Toplu içe aktarma
+    with st.expander("📥 Toplu İçe Aktar (CSV / JSONL)", expanded=False):
+        st.caption("Sütunlar: name, category, quantity, unit, expiry_date (YYYY-AA-GG), location, notes")
+        uploaded_file = st.file_uploader("Dosya seçin", type=["csv", "jsonl"])
 
-        # Filtreleme
-        col1, col2, col3 = st.columns(3)
+        if uploaded_file is not None and st.button("📥 İçe Aktar", use_container_width=True):
+            errors = []
 
-        with col1:
-            filter_category = st.selectbox("🔍 Kategori Filtresi", ["Tümü"] + CATEGORIES)
-        with col2:
-            filter_expiry = st.selectbox("⏰ Son Kullanma Filtresi",
-                                         ["Tümü", "Bugün Bitiyor", "3 Gün İçinde", "1 Hafta İçinde", "Süresi Geçmiş"])
-        with col3:
-            search_term = st.text_input("🔍 Ürün Ara", placeholder="Ürün adı...")
+            def valid_items():
+                for line_no, item, error in read_item_rows(uploaded_file, uploaded_file.name):
+                    if error:
+                        errors.append(f"{line_no}. satır: {error}")
+                    else:
+                        yield item
 
-        # Filtreleme uygula
-        filtered_inventory = inventory.copy()
+            with st.spinner("📥 Ürünler aktarılıyor..."):
+                added = st.session_state.firebase.bulk_add_items(user_id, valid_items())
 
-        if filter_category != "Tümü":
-            filtered_inventory = [item for item in filtered_inventory if item.get('category') == filter_category]
+            if added:
+                st.success(f"✅ {added} ürün eklendi.")
+            if errors:
+                st.warning(f"⚠️ {len(errors)} satır atlandı:\n\n" + "\n".join(f"- {e}" for e in errors[:20]))
 
-        if search_term:
-            filtered_inventory = [item for item in filtered_inventory
-                                  if search_term.lower() in item.get('name', '').lower()]
+    # Mevcut ürünleri listele
+    st.subheader("📋 Mevcut Ürünler")
 
-        if filter_expiry != "Tümü":
-            temp_filtered = []
-            for item in filtered_inventory:
-                expiry_date = item.get('expiry_date', '')
-                if expiry_date:
-                    days_left = days_until_expiry(expiry_date)
-                    if filter_expiry == "Bugün Bitiyor" and days_left == 0:
-                        temp_filtered.append(item)
-                    elif filter_expiry == "3 Gün İçinde" and 0 <= days_left <= 3:
-                        temp_filtered.append(item)
-                    elif filter_expiry == "1 Hafta İçinde" and 0 <= days_left <= 7:
-                        temp_filtered.append(item)
-                    elif filter_expiry == "Süresi Geçmiş" and days_left < 0:
-                        temp_filtered.append(item)
-            filtered_inventory = temp_filtered
-
-        # Ürünleri göster
-        for item in filtered_inventory:
-            with st.container():
-                col1, col2, col3, col4, col5 = st.columns([3, 2, 2, 2, 1])
-
-                with col1:
-                    st.write(f"**{item.get('name', 'Bilinmeyen')}**")
-                    if item.get('notes'):
-                        st.caption(f"📝 {item.get('notes')}")
-
-                with col2:
-                    st.write(f"📦 {item.get('quantity', 0)} {item.get('unit', 'adet')}")
-                    st.caption(f"🏷️ {item.get('category', 'Diğer')}")
-
-                with col3:
-                    expiry_date = item.get('expiry_date', '')
-                    if expiry_date:
-                        days_left = days_until_expiry(expiry_date)
-                        emoji, status, color = get_expiry_status(days_left)
-                        st.write(f"{emoji} {format_date_turkish(expiry_date)}")
-                        st.caption(f"({days_left} gün kaldı)" if days_left >= 0 else "(Süresi geçmiş)")
-
-                with col4:
-                    if item.get('location'):
-                        st.write(f"📍 {item.get('location')}")
-
-                with col5:
-                    if st.button("🗑️", key=f"delete_{item['id']}", help="Sil"):
-                        if st.session_state.firebase.delete_item(user_id, item['id']):
-                            st.rerun()
+    # Filtreleme
+    col1, col2, col3 = st.columns(3)
 
-                st.markdown("---")
+    with col1:
+        filter_category = st.selectbox("🔍 Kategori Filtresi", ["Tümü"] + CATEGORIES)
+    with col2:
+        filter_expiry = st.selectbox("⏰ Son Kullanma Filtresi",
+                                     ["Tümü", "Bugün Bitiyor", "3 Gün İçinde", "1 Hafta İçinde", "Süresi Geçmiş"])
+    with col3:
+        search_term = st.text_input("🔍 Ürün Ara", placeholder="Ürün adı...")
+
+    # Kategori ve son kullanma filtreleri sorguya (Firestore'da sunucuya) aktarılır
+    today = date.today().toordinal()
+    expiry_windows = {
+        "Bugün Bitiyor": (today, today),
+        "3 Gün İçinde": (today, today + 3),
+        "1 Hafta İçinde": (today, today + 7),
+        "Süresi Geçmiş": (None, today - 1)
+    }
+    expiry_from, expiry_to = expiry_windows.get(filter_expiry, (None, None))
+    category_filter = filter_category if filter_category != "Tümü" else None
+    firebase = st.session_state.firebase
+    page_size = int(get_setting("INVENTORY_PAGE_SIZE", 50))
+
+    # Sayfalama durumu: cursors[n], n. sayfanın başlangıç imleci (start_after);
+    # filtre değişince ilk sayfaya dönülür. Her görünüm yeni tablo anahtarı alır,
+    # böylece önceki sayfadaki satır seçimi yeni sayfaya taşınmaz.
+    query_key = (category_filter, expiry_from, expiry_to, search_term, page_size)
+    pager = st.session_state.get('inventory_pager')
+    if pager is None or pager['query'] != query_key:
+        view = pager['view'] + 1 if pager else 0
+        pager = st.session_state.inventory_pager = {'query': query_key, 'cursors': [None], 'page': 0, 'view': view}
+    page = pager['page']
+
+    if search_term:
+        # Türkçe harf kurallarına uygun, yazım hatalarına dayanıklı arama; en iyi eşleşme başta
+        inventory, _ = firebase.query_inventory(user_id, category=category_filter,
+                                                expiry_from=expiry_from, expiry_to=expiry_to)
+        ranked_ids = firebase.search_inventory(user_id, search_term, items=inventory)
+        rank = {item_id: position for position, item_id in enumerate(ranked_ids)}
+        inventory = sorted((item for item in inventory if item['id'] in rank), key=lambda item: rank[item['id']])
+        total = len(inventory)
+        items = inventory[page * page_size:(page + 1) * page_size]
+        has_next = total > (page + 1) * page_size
     else:
+        # Yalnızca görüntülenen sayfa okunur (Firestore'da limit/start_after sunucuda)
+        items, next_cursor = firebase.query_inventory(
+            user_id,
+            category=category_filter,
+            expiry_from=expiry_from,
+            expiry_to=expiry_to,
+            limit=page_size,
+            start_after=pager['cursors'][page]
+        )
+        del pager['cursors'][page + 1:]
+        if next_cursor is not None:
+            pager['cursors'].append(next_cursor)
+        has_next = next_cursor is not None
+        total = firebase.get_inventory_stats(user_id).count(category_filter, expiry_from, expiry_to)
+
+    if not items and page > 0:
+        # Son sayfadaki ürünler silindi
+        pager['page'] -= 1
+        pager['view'] += 1
+        st.rerun()
+
+    if items:
+        if total is not None:
+            pages = max(1, -(-total // page_size))
+            st.caption(f"{total} ürün listeleniyor · Sayfa {page + 1} / {pages}")
+        else:
+            st.caption(f"Sayfa {page + 1}")
+
+        table = inventory_table(items)
+        event = st.dataframe(
+            table,
+            key=f"inventory_table_{pager['view']}",
+            on_select="rerun",
+            selection_mode="multi-row",
+            hide_index=True,
+            use_container_width=True
+        )
+        selected_ids = [table.index[row] for row in event.selection.rows]
+
+        col1, col2, col3 = st.columns([1, 1, 2])
+        with col1:
+            if st.button("◀ Önceki", disabled=page == 0, use_container_width=True):
+                pager['page'] -= 1
+                pager['view'] += 1
+                st.rerun()
+        with col2:
+            if st.button("Sonraki ▶", disabled=not has_next, use_container_width=True):
+                pager['page'] += 1
+                pager['view'] += 1
+                st.rerun()
+        with col3:
+            if st.button(f"🗑️ Seçilenleri Sil ({len(selected_ids)})", disabled=not selected_ids,
+                         use_container_width=True):
+                deleted = firebase.delete_items(user_id, selected_ids)
+                pager['view'] += 1
+                if deleted:
+                    st.rerun()
+    elif filter_category == "Tümü" and filter_expiry == "Tümü" and not search_term:
         st.info("📦 Henüz ürün eklenmemiş. Yukarıdaki formu kullanarak ürün ekleyebilirsiniz.")
+    else:
+        st.info("🔍 Filtrelere uyan ürün bulunamadı.")
 
 
 def show_warnings():
@@ -374,68 +456,49 @@ def show_warnings():
     st.markdown('<h1 class="main-header">⚠️ Son Kullanma Tarihi Uyarıları</h1>', unsafe_allow_html=True)
 
     user_id = st.session_state.user['localId']
-    inventory = st.session_state.firebase.get_inventory(user_id)
+    firebase = st.session_state.firebase
 
-    if not inventory:
+    if not firebase.get_inventory_stats(user_id).stats()['total_items']:
         st.info("📦 Henüz ürün eklenmemiş.")
         return
 
-    # Uyarı kategorileri
-    expired_items = []
-    critical_items = []
-    warning_items = []
-
-    for item in inventory:
-        expiry_date = item.get('expiry_date', '')
-        if expiry_date:
-            days_left = days_until_expiry(expiry_date)
-            if days_left < 0:
-                expired_items.append(item)
-            elif days_left <= 3:
-                critical_items.append(item)
-            elif days_left <= 7:
-                warning_items.append(item)
+    # Uyarı kategorileri: son kullanma indeksinden gün aralıkları (güne göre sıralı)
+    today = date.today().toordinal()
+    expired_items, _ = firebase.query_inventory(user_id, expiry_to=today - 1)
+    critical_items, _ = firebase.query_inventory(user_id, expiry_from=today, expiry_to=today + 3)
+    warning_items, _ = firebase.query_inventory(user_id, expiry_from=today + 4, expiry_to=today + 7)
+    for item in critical_items + warning_items:
+        item['days_left'] = item['expiry_ordinal'] - today
+
+    # Her bölüm tek HTML bloğu; sınırı aşan ürünler açılır "daha fazla" bölümünde
+    visible = int(get_setting("WARNINGS_VISIBLE_ITEMS", 20))
+
+    def show_bucket(items, css_class, emoji, show_days_left=True):
+        st.markdown(expiry_cards_html(items[:visible], css_class, emoji, show_days_left), unsafe_allow_html=True)
+        if len(items) > visible:
+            with st.expander(f"➕ {len(items) - visible} ürün daha"):
+                st.markdown(expiry_cards_html(items[visible:], css_class, emoji, show_days_left),
+                            unsafe_allow_html=True)
 
     # Süresi geçmiş ürünler
     if expired_items:
         st.markdown("### 🔴 Süresi Geçmiş Ürünler")
-        for item in expired_items:
-            st.markdown(f"""
-            <div class="expiry-critical">
-                <strong>🔴 {item.get('name', 'Bilinmeyen')}</strong><br>
-                📅 Son Kullanma: {format_date_turkish(item.get('expiry_date', ''))}<br>
-                📦 Miktar: {item.get('quantity', 0)} {item.get('unit', 'adet')}<br>
-                📍 Konum: {item.get('location', 'Belirtilmemiş')}
-            </div>
-            """, unsafe_allow_html=True)
+        if st.button(f"🗑️ Süresi Geçmiş {len(expired_items)} Ürünü Sil", type="primary"):
+            deleted = st.session_state.firebase.delete_expired_items(user_id)
+            if deleted:
+                st.success(f"✅ {deleted} ürün silindi.")
+                st.rerun()
+        show_bucket(expired_items, "expiry-critical", "🔴", show_days_left=False)
 
     # Kritik ürünler (3 gün içinde)
     if critical_items:
         st.markdown("### 🟡 Kritik Uyarı (3 Gün İçinde)")
-        for item in critical_items:
-            days_left = days_until_expiry(item.get('expiry_date', ''))
-            st.markdown(f"""
-            <div class="expiry-critical">
-                <strong>🟡 {item.get('name', 'Bilinmeyen')}</strong><br>
-                📅 Son Kullanma: {format_date_turkish(item.get('expiry_date', ''))} ({days_left} gün kaldı)<br>
-                📦 Miktar: {item.get('quantity', 0)} {item.get('unit', 'adet')}<br>
-                📍 Konum: {item.get('location', 'Belirtilmemiş')}
-            </div>
-            """, unsafe_allow_html=True)
+        show_bucket(critical_items, "expiry-critical", "🟡")
 
     # Uyarı ürünleri (1 hafta içinde)
     if warning_items:
         st.markdown("### 🟠 Uyarı (1 Hafta İçinde)")
-        for item in warning_items:
-            days_left = days_until_expiry(item.get('expiry_date', ''))
-            st.markdown(f"""
-            <div class="expiry-warning">
-                <strong>🟠 {item.get('name', 'Bilinmeyen')}</strong><br>
-                📅 Son Kullanma: {format_date_turkish(item.get('expiry_date', ''))} ({days_left} gün kaldı)<br>
-                📦 Miktar: {item.get('quantity', 0)} {item.get('unit', 'adet')}<br>
-                📍 Konum: {item.get('location', 'Belirtilmemiş')}
-            </div>
-            """, unsafe_allow_html=True)
+        show_bucket(warning_items, "expiry-warning", "🟠")
 
     # Uyarı yoksa
     if not expired_items and not critical_items and not warning_items:
@@ -461,7 +524,7 @@ def show_recipes():
         st.markdown("### ⏰ Son Kullanma Tarihi Yaklaşan Ürünler İçin Tarifler")
 
         # Son kullanma tarihi yaklaşan ürünleri bul
-        expiring_items = get_expiring_items(inventory, days_threshold=7)
+        expiring_items = st.session_state.firebase.get_expiring_items(user_id, days_threshold=7)
 
         if expiring_items:
             # Yaklaşan ürünleri göster
@@ -485,13 +548,14 @@ def show_recipes():
             with col1:
                 st.markdown("### 🤖 AI Tarif Önerileri")
             with col2:
-                if st.button("🔄 Yeni Tarifler", use_container_width=True):
-                    st.cache_resource.clear()
-
-            if st.button("🤖 AI Tarif Önerileri Al", use_container_width=True, type="primary"):
-                with st.spinner("🤖 AI tarifler hazırlanıyor..."):
-                    recipes = st.session_state.gemini.get_recipe_suggestions(inventory, expiring_items)
-                    st.markdown(recipes)
+                # Önbellekteki yanıtı atlayıp yeni tarif üretir
+                regenerate = st.button("🔄 Yeni Tarifler", use_container_width=True)
+
+            if st.button("🤖 AI Tarif Önerileri Al", use_container_width=True, type="primary") or regenerate:
+                # Tarifler üretildikçe sayfaya yazılır
+                st.session_state.gemini.render_recipe_suggestions(
+                    inventory, expiring_items, bypass_cache=regenerate
+                )
         else:
             st.success("✅ Harika! Şu anda yakında son kullanma tarihi gelecek ürün bulunmuyor.")
             st.balloons()
@@ -524,9 +588,11 @@ def show_recipes():
 
         with col2:
             st.markdown("**🍽️ Mutfak Türü:**")
-            cuisine_type = st.selectbox(
-                "Hangi mutfak?",
-                ["Türk", "İtalyan", "Çin", "Meksika", "Hint", "Akdeniz", "Vejetaryen"]
+            # Birden fazla mutfak seçilirse her biri ayrı sekmede, aynı anda hazırlanır
+            cuisine_types = st.multiselect(
+                "Hangi mutfaklar?",
+                ["Türk", "İtalyan", "Çin", "Meksika", "Hint", "Akdeniz", "Vejetaryen"],
+                default=["Türk"]
             )
 
             st.markdown("**⏱️ Pişirme Süresi:**")
@@ -549,12 +615,11 @@ def show_recipes():
 
             # Özel tarif önerisi al
             if st.button("🎯 Özel Tarif Önerisi Al", use_container_width=True, type="primary"):
-                with st.spinner("🤖 Size özel tarifler hazırlanıyor..."):
-                    custom_recipes = st.session_state.gemini.get_custom_recipe_suggestions(
-                        selected_items, cuisine_type
-                    )
+                if cuisine_types:
                     st.markdown("### 🍽️ Size Özel Tarifler:")
-                    st.markdown(custom_recipes)
+                    st.session_state.gemini.render_multi_cuisine_recipes(selected_items, cuisine_types)
+                else:
+                    st.error("❌ Lütfen en az bir mutfak türü seçin!")
         else:
             st.info("👆 Yukarıdan en az bir malzeme seçin!")
 
@@ -563,8 +628,9 @@ def show_recipes():
     st.markdown("### 📦 Tüm Malzemeleriniz")
 
     # Kategorilere göre grupla
+    analysis = analyze_inventory(inventory)
     categories = {}
-    for item in inventory:
+    for item, days_left in zip(inventory, analysis.days_left.tolist()):
         category = item.get('category', 'Diğer')
         if category not in categories:
             categories[category] = []
@@ -573,7 +639,7 @@ def show_recipes():
             'quantity': item.get('quantity', 0),
             'unit': item.get('unit', 'adet'),
             'expiry_date': item.get('expiry_date', ''),
-            'days_left': days_until_expiry(item.get('expiry_date', '')) if item.get('expiry_date') else 999
+            'days_left': days_left
         })
 
     # Kategorileri göster
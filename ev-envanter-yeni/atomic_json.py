@@ -0,0 +1,194 @@
+# atomic_json.py - Çökme ve çoklu süreç güvenli JSON dosyası
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(lock_path: str):
+    """Süreçler arası özel (exclusive) kilit; ayrı bir .lock dosyası üzerinde tutulur"""
+    with open(lock_path, 'a+b') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        else:
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK ~10 saniye denedikten sonra vazgeçer
+                    continue
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class _PendingWrite:
+    __slots__ = ("fn", "result", "error", "done")
+
+    def __init__(self, fn: Callable[[Dict], Any]):
+        self.fn = fn
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class AtomicJsonFile:
+    """Kilitli oku-değiştir-yaz ve geçici dosya + atomik yeniden adlandırma ile JSON dosyası
+
+    Yazmalar `update(fn)` ile yapılır: `fn` dosyadaki veriyi yerinde değiştirir.
+    Aynı süreçte aynı anda gelen yazmalar tek bir kilit/okuma/fsync'li kayıtta
+    birleştirilir (group commit). `group_commit_window` > 0 ise ilk yazma bu
+    süre kadar bekleyerek arkadan gelenleri de aynı kayda toplar. `on_commit(data)`
+    her kayıttan sonra kilit tutulurken çağrılır (ör. türetilmiş yan dosyaları yazmak için).
+    """
+
+    def __init__(self, path: str, group_commit_window: float = 0.0,
+                 on_commit: Optional[Callable[[Dict], None]] = None):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.group_commit_window = group_commit_window
+        self.on_commit = on_commit
+        self._queue_lock = threading.Lock()
+        self._pending = []
+        self._committing = False
+        self.commits = 0
+        self.writes = 0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def read(self) -> Optional[Dict]:
+        """Dosyayı oku; yoksa None. Yazmalar atomik olduğu için okuma kilit gerektirmez"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except json.JSONDecodeError as e:
+            # Bozuk dosyayı boş veritabanı sayıp üzerine yazmamak için hatayı yükselt
+            raise ValueError(f"{self.path} okunamadı (bozuk JSON): {e}") from e
+
+    def update(self, fn: Callable[[Dict], Any]) -> Any:
+        """Veriyi kilit altında değiştirip kaydet, `fn`in dönüş değerini döndür"""
+        write = _PendingWrite(fn)
+        with self._queue_lock:
+            self._pending.append(write)
+            leader = not self._committing
+            if leader:
+                self._committing = True
+
+        if leader:
+            # İlk gelen yazma kaydı üstlenir, diğerleri sonucu bekler
+            if self.group_commit_window:
+                time.sleep(self.group_commit_window)
+            self._run_commits()
+
+        write.done.wait()
+        if write.error is not None:
+            raise write.error
+        return write.result
+
+    def _run_commits(self):
+        while True:
+            with self._queue_lock:
+                batch = self._pending
+                self._pending = []
+                if not batch:
+                    self._committing = False
+                    return
+            self._commit(batch)
+
+    def _commit(self, batch):
+        try:
+            with file_lock(self.lock_path):
+                data = self._apply(batch)
+                applied = sum(1 for write in batch if write.error is None)
+                if applied:
+                    self._write(data)
+                    self.commits += 1
+                    self.writes += applied
+                    if self.on_commit is not None:
+                        try:
+                            self.on_commit(data)
+                        except Exception:
+                            # Kayıt tamamlandı; yan dosya yazılamazsa okuyanlar ana dosyaya döner
+                            pass
+        except Exception as e:
+            for write in batch:
+                if write.error is None:
+                    write.error = e
+        finally:
+            for write in batch:
+                write.done.set()
+
+    def _apply(self, batch) -> Dict:
+        """Yazmaları dosyadaki veriye sırayla uygula; hata veren yazmanın değişikliği kaydedilmez
+
+        Bir `fn` veriyi yarıda değiştirip hata verirse veri dosyadan yeniden okunur
+        ve yalnızca başarılı yazmalar (sırayla, yeniden) uygulanır. Hata nadir
+        olduğundan olağan durumda veri kopyalanmaz.
+        """
+        while True:
+            data = self.read()
+            if data is None:
+                data = {}
+            for write in batch:
+                if write.error is not None:
+                    continue
+                try:
+                    write.result = write.fn(data)
+                except Exception as e:
+                    write.error = e
+                    break
+            else:
+                return data
+
+    def replace(self, data: Dict):
+        """Dosyayı kilit almadan atomik olarak yaz, fsync yapmadan
+
+        Kilidi çağıran tutmalıdır. Çökmede kaybolabilecek, kaynaktan yeniden
+        üretilebilen yan dosyalar içindir.
+        """
+        self._write(data, durable=False)
+
+    def _write(self, data: Dict, durable: bool = True):
+        """Geçici dosyaya yaz, diske zorla (fsync) ve atomik olarak yerine taşı"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+                f.flush()
+                if durable:
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # Yeniden adlandırmanın kalıcı olması için dizini de diske yaz (yalnızca POSIX)
+        if durable and fcntl is not None:
+            dir_fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
@@ -0,0 +1,131 @@
+# expiry_engine.py - Envanterin son kullanma/stok analizini tek geçişte yapan motor
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Tarihi olmayan ya da okunamayan ürünler için kullanılan gün sayısı
+NO_EXPIRY_DAYS = 999
+
+# Stok azalıyor eşiği
+LOW_STOCK_THRESHOLD = 5
+
+# datetime64[D] değerlerini (1970-01-01'den gün sayısı) date.toordinal() değerine çevirmek için
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def expiry_to_ordinal(expiry_date_str: str) -> Optional[int]:
+    """'%Y-%m-%d' tarihini gün sıra numarasına (date.toordinal) çevir, okunamazsa None"""
+    try:
+        return datetime.strptime(expiry_date_str, '%Y-%m-%d').toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+def normalize_item_fields(item: Dict) -> bool:
+    """expiry_ordinal ve sayısal created_at alanlarını doldur, değişiklik olduysa True döndür"""
+    changed = False
+
+    ordinal = expiry_to_ordinal(item['expiry_date']) if item.get('expiry_date') else None
+    if item.get('expiry_ordinal') != ordinal:
+        item['expiry_ordinal'] = ordinal
+        changed = True
+
+    created_at = item.get('created_at')
+    if not isinstance(created_at, (int, float)):
+        # Firestore zaman damgası (DatetimeWithNanoseconds) ya da eksik değer
+        item['created_at'] = created_at.timestamp() if hasattr(created_at, 'timestamp') else 0.0
+        changed = True
+
+    return changed
+
+
+def _parse_ordinals(expiry_dates: List[str]) -> np.ndarray:
+    """Tarih metinlerini gün sıra numarasına çevir (okunamayanlar 0)"""
+    # Aynı tarih çok sayıda üründe tekrarlandığı için yalnızca benzersiz tarihler ayrıştırılır
+    codes, unique_dates = pd.factorize(pd.Series(expiry_dates, dtype=object))
+    parsed = pd.to_datetime(pd.Series(unique_dates, dtype=object), format='%Y-%m-%d',
+                            errors='coerce').to_numpy(dtype='datetime64[D]')
+    unique_ordinals = np.where(np.isnat(parsed), 0, parsed.astype(np.int64) + _EPOCH_ORDINAL)
+    return unique_ordinals[codes]
+
+
+class InventoryAnalysis:
+    """Envanter listesiyle aynı sırada tutulan sütunlar ve maskeler"""
+
+    def __init__(self, days_left: np.ndarray, has_expiry: np.ndarray,
+                 low_stock: np.ndarray, categories: Dict[str, int]):
+        self.days_left = days_left
+        self.has_expiry = has_expiry
+        self.low_stock = low_stock
+        self.categories = categories
+
+    def __len__(self):
+        return len(self.days_left)
+
+    def window_mask(self, start_day: int, end_day: int) -> np.ndarray:
+        """Son kullanmasına [start_day, end_day] gün kalan ürünler"""
+        return self.has_expiry & (self.days_left >= start_day) & (self.days_left <= end_day)
+
+    def expired_mask(self) -> np.ndarray:
+        """Süresi geçmiş ürünler"""
+        return self.has_expiry & (self.days_left < 0)
+
+    def window_indices(self, start_day: int, end_day: int) -> np.ndarray:
+        """Penceredeki ürünlerin indeksleri, kalan güne göre sıralı"""
+        indices = np.flatnonzero(self.window_mask(start_day, end_day))
+        return indices[np.argsort(self.days_left[indices], kind="stable")]
+
+    def status_counts(self) -> Dict[str, int]:
+        """Dashboard grafiği için son kullanma durumu sayıları"""
+        days = self.days_left[self.has_expiry]
+        expired = int(np.count_nonzero(days < 0))
+        critical = int(np.count_nonzero((days >= 0) & (days <= 3)))
+        approaching = int(np.count_nonzero((days > 3) & (days <= 7)))
+        return {
+            "İyi": len(days) - expired - critical - approaching,
+            "Yaklaşıyor": approaching,
+            "Kritik": critical,
+            "Geçmiş": expired
+        }
+
+    def stats(self) -> Dict:
+        """calculate_inventory_stats ile aynı biçimde özet"""
+        return {
+            'total_items': len(self),
+            'expiring_soon': int(np.count_nonzero(self.window_mask(0, 7))),
+            'expired': int(np.count_nonzero(self.expired_mask())),
+            'low_stock': int(np.count_nonzero(self.low_stock)),
+            'categories': dict(self.categories)
+        }
+
+
+def analyze_inventory(inventory: List[Dict], today: Optional[date] = None) -> InventoryAnalysis:
+    """Son kullanma bilgilerini tek bir "bugün"e göre tek geçişte analiz et"""
+    today = today or date.today()
+
+    has_expiry = np.fromiter((bool(item.get('expiry_date')) for item in inventory),
+                             dtype=bool, count=len(inventory))
+    ordinals = np.fromiter((item.get('expiry_ordinal') or 0 for item in inventory),
+                           dtype=np.int64, count=len(inventory))
+
+    # expiry_ordinal alanı olmayan eski kayıtlar için tarih metnini ayrıştır
+    missing = np.flatnonzero(has_expiry & (ordinals == 0))
+    if len(missing):
+        ordinals[missing] = _parse_ordinals([inventory[i]['expiry_date'] for i in missing])
+
+    valid = has_expiry & (ordinals > 0)
+    days_left = np.where(valid, ordinals - today.toordinal(), NO_EXPIRY_DAYS)
+
+    quantities = [item.get('quantity', 0) for item in inventory]
+    try:
+        quantities = np.array(quantities, dtype=float)
+    except (TypeError, ValueError):
+        quantities = pd.to_numeric(pd.Series(quantities, dtype=object), errors='coerce').to_numpy(dtype=float)
+    low_stock = np.nan_to_num(quantities, nan=0.0) <= LOW_STOCK_THRESHOLD
+
+    categories = Counter([item.get('category', 'Diğer') for item in inventory])
+
+    return InventoryAnalysis(days_left, has_expiry, low_stock, dict(categories))
@@ -0,0 +1,45 @@
+# expiry_index.py - Son kullanma gününe göre sıralı envanter indeksi
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class ExpiryIndex:
+    """Bir kullanıcının ürünleri, (expiry_ordinal, id) sırasında
+
+    Gün aralığı sorguları ikili arama ile dilim sınırlarını bulur; maliyet
+    envanter büyüklüğüne değil sonuç sayısına bağlıdır. Son kullanma tarihi
+    olmayan ürünler aralık sorgularında yer almaz (query_items ile aynı kural).
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[int, str]] = []
+        self._ordinals: Dict[str, Optional[int]] = {}
+        self._items: Dict[str, Dict] = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def ids(self) -> Set[str]:
+        return set(self._items)
+
+    def add_item(self, item: Dict):
+        item_id = item['id']
+        self.remove(item_id)
+        ordinal = item.get('expiry_ordinal')
+        self._items[item_id] = dict(item)
+        self._ordinals[item_id] = ordinal
+        if ordinal is not None:
+            insort(self._keys, (ordinal, item_id))
+
+    def remove(self, item_id: str):
+        if self._items.pop(item_id, None) is None:
+            return
+        ordinal = self._ordinals.pop(item_id)
+        if ordinal is not None:
+            del self._keys[bisect_left(self._keys, (ordinal, item_id))]
+
+    def window(self, start: Optional[int] = None, end: Optional[int] = None) -> List[Dict]:
+        """Son kullanma günü [start, end] aralığındaki ürünlerin kopyaları (None = sınırsız), güne göre sıralı"""
+        low = 0 if start is None else bisect_left(self._keys, (start, ""))
+        high = len(self._keys) if end is None else bisect_left(self._keys, (end + 1, ""))
+        return [dict(self._items[item_id]) for _, item_id in self._keys[low:high]]
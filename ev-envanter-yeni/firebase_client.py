@@ -2,14 +2,45 @@
 import streamlit as st
 import firebase_admin
 from firebase_admin import credentials, firestore
-from typing import Dict, Any, List, Optional
-import json
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 import os
+import time
+from datetime import date
+from expiry_engine import normalize_item_fields
+from inventory_cache import InventoryCache
+from inventory_mirror import InventoryMirror
+from inventory_stats import (STAT_BUCKETS, STAT_COUNTERS, STAT_FIELDS, STATS_VERSION, InventoryStats,
+                             build_stats, stats_delta)
+from local_store import ORDER_FIELDS, SCHEMA_VERSION, create_local_store, page_with_cursor, query_items
+from expiry_index import ExpiryIndex
+from index_registry import UserIndexRegistry
+from search_index import InventorySearchIndex
+from utils import get_setting
+
+# Firestore bir WriteBatch'te en fazla 500 işlem kabul eder
+FIRESTORE_BATCH_LIMIT = 500
+
+# Geriye doldurma bittiğinde veri biçimi sürümünün yazıldığı koleksiyon (belge: 'inventory')
+SCHEMA_COLLECTION = 'schema'
 
 
 class FirebaseClient:
     def __init__(self):
         """Firebase bağlantısını başlat"""
+        # Yazma işlemleriyle güncellenen envanter önbelleği (tüm oturumlar paylaşır)
+        self.inventory_cache = InventoryCache(
+            max_bytes=int(get_setting("INVENTORY_CACHE_MAX_MB", 64)) * 1024 * 1024,
+            ttl_seconds=float(get_setting("INVENTORY_CACHE_TTL_SECONDS", 60))
+        )
+        # Ürün adı araması için kullanıcı bazlı trigram indeksleri
+        self.search_indexes = UserIndexRegistry(InventorySearchIndex,
+                                                max_users=int(get_setting("SEARCH_INDEX_MAX_USERS", 100)))
+        # Son kullanma aralığı sorguları için kullanıcı bazlı sıralı indeksler
+        self.expiry_indexes = UserIndexRegistry(ExpiryIndex,
+                                                max_users=int(get_setting("EXPIRY_INDEX_MAX_USERS", 100)))
+        # Firestore anlık dinleyici aynası (isteğe bağlı, yalnızca Firestore modunda)
+        self.inventory_mirror = None
+
         if not firebase_admin._apps:
             try:
                 # Seçenek 1: Service Account Key dosyası (Önerilen)
@@ -25,24 +56,28 @@ class FirebaseClient:
                     firebase_admin.initialize_app(cred)
                     st.success("🔥 Firebase (Secrets) bağlantısı başarılı!")
 
-                # Seçenek 3: Test modu (yerel JSON)
+                # Seçenek 3: Test modu (yerel JSON / SQLite)
                 else:
                     st.warning("⚠️ Firebase bulunamadı, yerel test modu aktif!")
-                    self._use_local_storage = True
-                    self.data_file = "inventory_database.json"
-                    self._init_local_database()
+                    self._init_local_storage()
                     return
 
             except Exception as e:
                 st.error(f"❌ Firebase başlatma hatası: {str(e)}")
                 st.info("Yerel test moduna geçiliyor...")
-                self._use_local_storage = True
-                self.data_file = "inventory_database.json"
-                self._init_local_database()
+                self._init_local_storage()
                 return
 
         self._use_local_storage = False
         self.db = firestore.client()
+        self._fields_backfilled = self._check_backfill()
+        if str(get_setting("FIRESTORE_LISTENER_MIRROR", "false")).lower() in ("1", "true", "yes", "on"):
+            self.inventory_mirror = InventoryMirror(
+                lambda user_id: self.db.collection('inventory').where('user_id', '==', user_id),
+                self._doc_to_item,
+                idle_seconds=float(get_setting("FIRESTORE_LISTENER_IDLE_SECONDS", 300)),
+                on_change=self._on_mirror_change
+            )
 
         # Test kullanıcıları
         self.test_users = {
@@ -50,39 +85,37 @@ class FirebaseClient:
             "admin@admin.com": {"password": "admin123", "uid": "admin_user_456"}
         }
 
-    def _init_local_database(self):
-        """Yerel database başlat"""
-        if not os.path.exists(self.data_file):
-            initial_data = {
-                "users": {
-                    "test@test.com": {"password": "123456", "uid": "test_user_123"},
-                    "admin@admin.com": {"password": "admin123", "uid": "admin_user_456"}
-                },
-                "inventory": {}
-            }
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(initial_data, f, ensure_ascii=False, indent=2)
-
-    def _load_local_data(self):
-        """Yerel veriyi yükle"""
+    def _check_backfill(self) -> bool:
+        """Firestore belgelerine expiry_ordinal/created_at geriye doldurması yapılmış mı
+
+        Alanı olmayan belgeler o alana göre sıralanan ya da süzülen sorgularda hiç
+        dönmez; doldurma yapılana kadar sorgular sırasız okunup bellekte süzülür.
+        """
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return {"users": {}, "inventory": {}}
+            marker = self.db.collection(SCHEMA_COLLECTION).document('inventory').get()
+            if marker.exists and (marker.to_dict() or {}).get('version', 0) >= SCHEMA_VERSION:
+                return True
+        except Exception as e:
+            st.error(f"❌ Şema sürümü okunamadı: {str(e)}")
+            return False
+        st.warning("⚠️ Firestore kayıtları eski biçimde; `python maintenance.py backfill` çalıştırın.")
+        return False
 
-    def _save_local_data(self, data):
-        """Yerel veriyi kaydet"""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+    def _init_local_storage(self):
+        """Yerel depoyu başlat (LOCAL_STORAGE_BACKEND: "json", "sharded" veya "sqlite")"""
+        self._use_local_storage = True
+        backend = str(get_setting("LOCAL_STORAGE_BACKEND", "json")).lower()
+        # JSON modunda aynı anda gelen yazmaları tek kayıtta birleştirme penceresi
+        group_commit_window = float(get_setting("JSON_GROUP_COMMIT_MS", 0)) / 1000
+        self.local_store = create_local_store(backend, group_commit_window=group_commit_window,
+                                              max_open_shards=int(get_setting("SHARDED_MAX_OPEN_FILES", 256)))
 
     def sign_in(self, email: str, password: str) -> Optional[Dict]:
         """Kullanıcı girişi"""
         if self._use_local_storage:
-            data = self._load_local_data()
-            users = data.get("users", {})
-            if email in users and users[email]["password"] == password:
-                return {"localId": users[email]["uid"], "email": email}
+            user = self.local_store.get_user(email)
+            if user and user["password"] == password:
+                return {"localId": user["uid"], "email": email}
         else:
             # Firebase Authentication burada olacak
             if email in self.test_users and self.test_users[email]["password"] == password:
@@ -93,80 +126,458 @@ class FirebaseClient:
 
     def get_inventory(self, user_id: str) -> List[Dict]:
         """Kullanıcının envanterini getir"""
+        if self.inventory_mirror is not None:
+            mirrored = self.inventory_mirror.get(user_id)
+            if mirrored is not None:
+                return mirrored
+
+        cached = self.inventory_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        version = self.inventory_cache.version(user_id)
         if self._use_local_storage:
-            data = self._load_local_data()
-            inventory = data.get("inventory", {}).get(user_id, {})
-            items = []
-            for item_id, item_data in inventory.items():
-                item_data['id'] = item_id
-                items.append(item_data)
-            return items
+            try:
+                items = self.local_store.get_inventory(user_id)
+            except Exception as e:
+                st.error(f"❌ Envanter getirme hatası: {str(e)}")
+                return []
         else:
             # Firebase Firestore'dan veri çek
             try:
                 docs = self.db.collection('inventory').where('user_id', '==', user_id).stream()
-                items = []
-                for doc in docs:
-                    item = doc.to_dict()
-                    item['id'] = doc.id
-                    items.append(item)
-                return items
+                items = [self._doc_to_item(doc) for doc in docs]
             except Exception as e:
                 st.error(f"❌ Envanter getirme hatası: {str(e)}")
                 return []
 
+        self.inventory_cache.put(user_id, items, version)
+        # Başka süreçlerden gelen değişiklikleri indekslere de yansıt
+        self.search_indexes.sync(user_id, items)
+        self.expiry_indexes.sync(user_id, items)
+        return items
+
+    def _ensure_index(self, registry: UserIndexRegistry, user_id: str) -> bool:
+        """İndeks kullanılabilirse True; yoksa bellekteki envanterden kurulur
+
+        İndeks yalnızca ayna hazırken ya da önbellek tazeyken kullanılır. Aksi halde
+        yalnızca indeks kurmak için depodan tüm envanter okunmaz; çağıran sorguyu
+        depoya (Firestore'da sunucuya) yönlendirir.
+        """
+        if self.inventory_mirror is not None and self.inventory_mirror.ready(user_id):
+            fresh = True
+        else:
+            fresh = self.inventory_cache.is_fresh(user_id)
+        if not fresh:
+            return False
+        if not registry.has(user_id):
+            registry.build(user_id, self.get_inventory(user_id))
+        return True
+
+    def search_inventory(self, user_id: str, text: str, limit: Optional[int] = None,
+                         items: Optional[List[Dict]] = None) -> List[str]:
+        """Ürün adında arama yap, eşleşen ürün id'lerini en iyi eşleşme başta döndür
+
+        İndeks kullanılamıyorsa arama çağıranın zaten okuduğu `items` üzerinde (verilmezse
+        envanter üzerinde) geçici bir indeksle yapılır.
+        """
+        if self._ensure_index(self.search_indexes, user_id):
+            ranked = self.search_indexes.read(user_id, lambda index: index.search(text, None if items is not None else limit))
+            if ranked is not None:
+                if items is not None:
+                    allowed = {item['id'] for item in items}
+                    ranked = [item_id for item_id in ranked if item_id in allowed][:limit]
+                return ranked
+
+        index = InventorySearchIndex()
+        for item in (items if items is not None else self.get_inventory(user_id)):
+            index.add_item(item)
+        return index.search(text, limit)
+
+    def iter_expiring_items(self, expiry_from: Optional[int] = None,
+                            expiry_to: Optional[int] = None) -> Iterator[Tuple[str, Dict]]:
+        """Tüm kullanıcılarda son kullanma günü aralıktaki ürünler: (user_id, ürün), akış halinde
+
+        Firestore'da tek alanlı expiry_ordinal indeksiyle koleksiyon genelinde tek sorgudur.
+        """
+        if self._use_local_storage:
+            yield from self.local_store.iter_expiring_items(expiry_from, expiry_to)
+            return
+        if not self._fields_backfilled:
+            # Alanı eksik belgeler aralık sorgusunda dönmez: tüm belgeleri akışla tara
+            for doc in self.db.collection('inventory').stream():
+                item = self._doc_to_item(doc)
+                ordinal = item.get('expiry_ordinal')
+                if ordinal is not None and (expiry_from is None or ordinal >= expiry_from) \
+                        and (expiry_to is None or ordinal <= expiry_to):
+                    yield item.get('user_id'), item
+            return
+        # Alt sınır her zaman verilir; tarihi olmayan (null) belgeler böylece dışarıda kalır
+        query = self.db.collection('inventory').where(
+            'expiry_ordinal', '>=', expiry_from if expiry_from is not None else -2 ** 62)
+        if expiry_to is not None:
+            query = query.where('expiry_ordinal', '<=', expiry_to)
+        for doc in query.stream():
+            item = self._doc_to_item(doc)
+            yield item.get('user_id'), item
+
+    def get_expiring_items(self, user_id: str, days_threshold: int = 7) -> List[Dict]:
+        """Son kullanmasına `days_threshold` gün ya da daha az kalan ürünler (days_left ile, güne göre sıralı)"""
+        today = date.today().toordinal()
+        items, _ = self.query_inventory(user_id, expiry_from=today, expiry_to=today + days_threshold)
+        for item in items:
+            item['days_left'] = item['expiry_ordinal'] - today
+        return items
+
+    def query_inventory(self, user_id: str, category: Optional[str] = None, expiry_from: Optional[int] = None,
+                        expiry_to: Optional[int] = None, order_by: str = "expiry_ordinal", descending: bool = False,
+                        limit: Optional[int] = None,
+                        start_after: Optional[Tuple] = None) -> Tuple[List[Dict], Optional[Tuple]]:
+        """Filtrelenmiş envanter sayfası getir
+
+        expiry_from/expiry_to gün sıra numarasıdır (date.toordinal, dahil). Sonuç
+        (ürünler, imleç) çiftidir; imleç bir sonraki sayfa için start_after'a verilir,
+        son sayfada None olur. Firestore'da süzme ve sıralama sunucuda yapılır
+        (gerekli bileşik indeksler firestore.indexes.json dosyasındadır).
+        """
+        if order_by not in ORDER_FIELDS:
+            raise ValueError(f"Sıralanamayan alan: {order_by}")
+        if (expiry_from is not None or expiry_to is not None) and order_by != "expiry_ordinal":
+            # Firestore aralık filtresi uygulanan alana göre sıralama ister
+            raise ValueError("Son kullanma aralığı ile yalnızca expiry_ordinal'a göre sıralanabilir")
+        filters = dict(category=category, expiry_from=expiry_from, expiry_to=expiry_to, order_by=order_by,
+                       descending=descending, limit=limit, start_after=start_after)
+
+        # Son kullanma aralıkları sıralı indeksin diliminden, sonuç sayısıyla orantılı maliyetle
+        # (yalnızca ayna/önbellek sıcakken; soğukken sorgu aşağıda depoya iner)
+        if (order_by == "expiry_ordinal" and (expiry_from is not None or expiry_to is not None)
+                and self._ensure_index(self.expiry_indexes, user_id)):
+            window = self.expiry_indexes.read(user_id, lambda index: index.window(expiry_from, expiry_to))
+            if window is not None:
+                return query_items(window, **filters)
+
+        # Envanter aynada ya da önbellekteyse depoya hiç gitmeden bellekte süz
+        if self.inventory_mirror is not None:
+            mirrored = self.inventory_mirror.select(user_id, lambda items: query_items(items, **filters))
+            if mirrored is not None:
+                return mirrored
+        cached = self.inventory_cache.select(user_id, lambda items: query_items(items, **filters))
+        if cached is not None:
+            return cached
+
+        try:
+            if self._use_local_storage:
+                return self.local_store.query_inventory(user_id, **filters)
+            return self._query_firestore(user_id, **filters)
+        except Exception as e:
+            st.error(f"❌ Envanter sorgu hatası: {str(e)}")
+            return [], None
+
+    def _query_firestore(self, user_id: str, category, expiry_from, expiry_to, order_by, descending,
+                         limit, start_after) -> Tuple[List[Dict], Optional[Tuple]]:
+        """query_inventory filtrelerini Firestore where/order_by/start_after/limit zincirine çevir"""
+        if not self._fields_backfilled:
+            # order_by/aralık filtresi alanı eksik belgeleri düşürür: sırasız oku, bellekte süz
+            return query_items(self.get_inventory(user_id), category=category, expiry_from=expiry_from,
+                               expiry_to=expiry_to, order_by=order_by, descending=descending, limit=limit,
+                               start_after=start_after)
+        collection = self.db.collection('inventory')
+        query = collection.where('user_id', '==', user_id)
+        if category is not None:
+            query = query.where('category', '==', category)
+        if expiry_from is not None:
+            query = query.where('expiry_ordinal', '>=', expiry_from)
+        if expiry_to is not None:
+            query = query.where('expiry_ordinal', '<=', expiry_to)
+
+        direction = firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+        # Eşitlikte id sırası açıkça verilir (örtük sırayla aynı, ek indeks gerekmez);
+        # böylece imleç belge okumadan (sıralama değeri, id) alanlarından kurulur
+        query = query.order_by(order_by, direction=direction).order_by('__name__', direction=direction)
+        if start_after is not None:
+            value, item_id = start_after
+            if order_by == "expiry_ordinal" and value == ORDER_FIELDS[order_by]:
+                # Tarihi olmayan ürünün imleci: Firestore'da değer null
+                value = None
+            query = query.start_after({order_by: value, '__name__': item_id})
+        if limit is not None:
+            query = query.limit(limit + 1)
+
+        items = [self._doc_to_item(doc) for doc in query.stream()]
+        return page_with_cursor(items, order_by, limit)
+
+    @staticmethod
+    def _doc_to_item(doc) -> Dict:
+        """Firestore belgesini ürün sözlüğüne çevir"""
+        item = doc.to_dict()
+        item['id'] = doc.id
+        # Geriye doldurma (backfill) yapılmamış eski belgeler için alanları okurken tamamla
+        if 'expiry_ordinal' not in item or not isinstance(item.get('created_at'), (int, float)):
+            normalize_item_fields(item)
+        return item
+
+    def get_cache_stats(self) -> Dict:
+        """Envanter önbelleğinin isabet/ıskalama sayaçları"""
+        stats = self.inventory_cache.stats()
+        if self.inventory_mirror is not None:
+            stats['mirror'] = self.inventory_mirror.stats()
+        return stats
+
+    def _after_add(self, user_id: str, items: List[Dict]):
+        """Eklenen ürünleri (id ile birlikte) önbelleğe, aynaya ve indekslere yansıt"""
+        self.inventory_cache.apply_add(user_id, items)
+        self.search_indexes.apply_add(user_id, items)
+        self.expiry_indexes.apply_add(user_id, items)
+        if self.inventory_mirror is not None:
+            self.inventory_mirror.apply_add(user_id, items)
+
+    def _after_delete(self, user_id: str, item_ids: List[str]):
+        """Silinen ürünleri önbellekten, aynadan ve indekslerden çıkar"""
+        self.inventory_cache.apply_remove(user_id, item_ids)
+        self.search_indexes.apply_remove(user_id, item_ids)
+        self.expiry_indexes.apply_remove(user_id, item_ids)
+        if self.inventory_mirror is not None:
+            self.inventory_mirror.apply_remove(user_id, item_ids)
+
+    def _on_mirror_change(self, user_id: str, items: List[Dict], item_ids: List[str], reset: bool):
+        """Dinleyiciden gelen (başka cihaz/süreçlerdeki) değişiklikleri önbelleğe ve indekslere yansıt"""
+        if reset:
+            # Dinleyici ayrıyken yapılan silmeler olay olarak gelmez; türetilmiş veriler yeniden kurulur
+            self.inventory_cache.invalidate(user_id)
+            self.search_indexes.drop(user_id)
+            self.expiry_indexes.drop(user_id)
+            return
+        for target in (self.inventory_cache, self.search_indexes, self.expiry_indexes):
+            if items:
+                target.apply_add(user_id, items)
+            if item_ids:
+                target.apply_remove(user_id, item_ids)
+
     def add_item(self, user_id: str, item: Dict) -> bool:
         """Yeni ürün ekle"""
+        # Okuma tarafında tarih ayrıştırmamak için gün sıra numarası ve sayısal zaman damgası
+        self._prepare_new_item(item)
+
         if self._use_local_storage:
             try:
-                data = self._load_local_data()
-                if "inventory" not in data:
-                    data["inventory"] = {}
-                if user_id not in data["inventory"]:
-                    data["inventory"][user_id] = {}
-
-                import time
-                item_id = f"item_{int(time.time() * 1000)}"
-                item['created_at'] = time.time()
-                data["inventory"][user_id][item_id] = item
-                self._save_local_data(data)
+                item_id = self.local_store.add_item(user_id, item)
+                self._after_add(user_id, [dict(item, id=item_id)])
                 return True
             except Exception as e:
                 st.error(f"❌ Ürün ekleme hatası: {str(e)}")
                 return False
         else:
-            # Firebase Firestore'a ekle
+            # Firebase Firestore'a ekle (özetle aynı atomik yazmada)
             try:
                 item['user_id'] = user_id
-                item['created_at'] = firestore.SERVER_TIMESTAMP
-                self.db.collection('inventory').add(item)
+                doc_ref = self.db.collection('inventory').document()
+                batch = self.db.batch()
+                batch.set(doc_ref, item)
+                self._stage_stats(batch, user_id, stats_delta([item]))
+                batch.commit()
+                self._after_add(user_id, [dict(item, id=doc_ref.id)])
                 return True
             except Exception as e:
                 st.error(f"❌ Ürün ekleme hatası: {str(e)}")
                 return False
 
+    def bulk_add_items(self, user_id: str, items: Iterable[Dict]) -> int:
+        """Çok sayıda ürünü toplu ekle, eklenen ürün sayısını döndür
+
+        Firestore'da 500 işlemlik WriteBatch parçalarıyla (her parça özet
+        güncellemesini de içerir), yerel modda tek kayıtla yazılır. `items` bir üreteç (generator) olabilir; Firestore'da satırlar
+        parça parça tüketilir.
+        """
+        added = []
+        try:
+            if self._use_local_storage:
+                prepared = [self._prepare_new_item(item) for item in items]
+                item_ids = self.local_store.add_items(user_id, prepared)
+                added = [dict(item, id=item_id) for item, item_id in zip(prepared, item_ids)]
+            else:
+                collection = self.db.collection('inventory')
+                batch = self.db.batch()
+                pending = []
+                for item in items:
+                    item = self._prepare_new_item(item)
+                    item['user_id'] = user_id
+                    # Belge id'si istemcide rastgele üretilir, çakışma olmaz
+                    doc_ref = collection.document()
+                    batch.set(doc_ref, item)
+                    pending.append(dict(item, id=doc_ref.id))
+                    # Parçanın son işlemi özet güncellemesi
+                    if len(pending) == FIRESTORE_BATCH_LIMIT - 1:
+                        self._stage_stats(batch, user_id, stats_delta(pending))
+                        batch.commit()
+                        added.extend(pending)
+                        batch = self.db.batch()
+                        pending = []
+                if pending:
+                    self._stage_stats(batch, user_id, stats_delta(pending))
+                    batch.commit()
+                    added.extend(pending)
+        except Exception as e:
+            st.error(f"❌ Toplu ekleme hatası: {str(e)}")
+        finally:
+            if added:
+                self._after_add(user_id, added)
+        return len(added)
+
+    @staticmethod
+    def _prepare_new_item(item: Dict) -> Dict:
+        """Yeni ürüne sayısal created_at ve expiry_ordinal ekle"""
+        item['created_at'] = time.time()
+        normalize_item_fields(item)
+        return item
+
     def delete_item(self, user_id: str, item_id: str) -> bool:
         """Ürün sil"""
+        return self.delete_items(user_id, [item_id]) == 1
+
+    def delete_items(self, user_id: str, item_ids: Iterable[str]) -> int:
+        """Id listesindeki ürünleri toplu sil, silinen ürün sayısını döndür
+
+        Firestore'da yalnızca kullanıcıya ait belgeler silinir.
+        """
+        item_ids = list(dict.fromkeys(item_ids))
+        deleted = []
+        try:
+            if self._use_local_storage:
+                deleted = self.local_store.delete_items(user_id, item_ids)
+            else:
+                collection = self.db.collection('inventory')
+                refs = [collection.document(item_id) for item_id in item_ids]
+                owned = []
+                for start in range(0, len(refs), FIRESTORE_BATCH_LIMIT):
+                    # Özetten düşmek için gereken alanlar da okunur
+                    snapshots = self.db.get_all(refs[start:start + FIRESTORE_BATCH_LIMIT],
+                                                field_paths=['user_id', *STAT_FIELDS])
+                    owned.extend(dict(snapshot.to_dict(), id=snapshot.id) for snapshot in snapshots
+                                 if snapshot.exists and snapshot.get('user_id') == user_id)
+                deleted = self._batch_delete(user_id, owned)
+        except Exception as e:
+            st.error(f"❌ Ürün silme hatası: {str(e)}")
+        finally:
+            if deleted:
+                self._after_delete(user_id, deleted)
+        return len(deleted)
+
+    def delete_matching_items(self, user_id: str, **filters) -> int:
+        """query_inventory filtreleriyle (ör. expiry_to) eşleşen tüm ürünleri sil
+
+        Sorgu sonucu önbellekten/aynadan gelebilir; başka oturumun zaten sildiği ürünler
+        özetten iki kez düşülmesin diye silme, varlık ve sahipliği yeniden okuyan
+        delete_items ile yapılır.
+        """
+        items, _ = self.query_inventory(user_id, **filters)
+        return self.delete_items(user_id, [item['id'] for item in items])
+
+    def delete_expired_items(self, user_id: str, before_ordinal: Optional[int] = None) -> int:
+        """Son kullanma tarihi verilen günden (varsayılan: bugün) önce olan ürünleri sil"""
+        if before_ordinal is None:
+            before_ordinal = date.today().toordinal()
+        return self.delete_matching_items(user_id, expiry_to=before_ordinal - 1)
+
+    def _batch_delete(self, user_id: str, items: List[Dict]) -> List[str]:
+        """Ürün belgelerini özetle birlikte 500'lük WriteBatch parçalarıyla sil, silinen id'leri döndür"""
+        collection = self.db.collection('inventory')
+        deleted = []
+        # Parçanın son işlemi özet güncellemesi
+        for start in range(0, len(items), FIRESTORE_BATCH_LIMIT - 1):
+            chunk = items[start:start + FIRESTORE_BATCH_LIMIT - 1]
+            batch = self.db.batch()
+            for item in chunk:
+                batch.delete(collection.document(item['id']))
+            self._stage_stats(batch, user_id, stats_delta(chunk, sign=-1))
+            batch.commit()
+            deleted.extend(item['id'] for item in chunk)
+        return deleted
+
+    def _stats_ref(self, user_id: str):
+        return self.db.collection('inventory_stats').document(user_id)
+
+    def _stage_stats(self, batch, user_id: str, delta: Dict):
+        """Özet farkını yazma grubuna Increment olarak ekle (ürün yazmasıyla birlikte atomik)
+
+        Sürüm alanı yalnızca yeniden hesaplamada yazılır: kayıt yokken ilk yazmanın
+        oluşturduğu ya da eski sürümdeki kayıt, ilk okumada ürünlerden yeniden hesaplanır.
+        """
+        update = {counter: firestore.Increment(delta[counter]) for counter in STAT_COUNTERS if delta[counter]}
+        for bucket in STAT_BUCKETS:
+            counts = {key: firestore.Increment(change) for key, change in delta[bucket].items() if change}
+            if counts:
+                update[bucket] = counts
+        if update:
+            batch.set(self._stats_ref(user_id), update, merge=True)
+
+    def get_inventory_stats(self, user_id: str) -> InventoryStats:
+        """Dashboard metrikleri için kullanıcının özet kaydı (tek küçük okuma)
+
+        Kayıt yoksa ya da eski sürümdeyse ürünlerden hesaplanıp yazılır.
+        """
+        try:
+            if self._use_local_storage:
+                record = self.local_store.get_stats(user_id)
+            else:
+                snapshot = self._stats_ref(user_id).get()
+                record = snapshot.to_dict() if snapshot.exists else None
+                if record is not None and record.get('version') != STATS_VERSION:
+                    record = None
+            if record is None:
+                record = self.rebuild_inventory_stats([user_id])[user_id]
+        except Exception as e:
+            st.error(f"❌ Envanter özeti hatası: {str(e)}")
+            return InventoryStats(build_stats(self.get_inventory(user_id)))
+        return InventoryStats(record)
+
+    def rebuild_inventory_stats(self, user_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """Özet kayıtlarını ürünlerden baştan hesapla (varsayılan: tüm kullanıcılar)"""
         if self._use_local_storage:
-            try:
-                data = self._load_local_data()
-                if (user_id in data.get("inventory", {}) and
-                        item_id in data["inventory"][user_id]):
-                    del data["inventory"][user_id][item_id]
-                    self._save_local_data(data)
-                    return True
-                return False
-            except Exception as e:
-                st.error(f"❌ Ürün silme hatası: {str(e)}")
-                return False
+            return self.local_store.rebuild_stats(user_ids)
+
+        if user_ids is None:
+            user_ids = {doc.get('user_id') for doc in self.db.collection('inventory').select(['user_id']).stream()}
+            user_ids |= {doc.id for doc in self.db.collection('inventory_stats').select([]).stream()}
+        return {user_id: self._rebuild_user_stats(user_id) for user_id in user_ids}
+
+    def _rebuild_user_stats(self, user_id: str) -> Dict:
+        """Kullanıcının ürünlerini okuyup özetini aynı işlemde (transaction) yaz"""
+        @firestore.transactional
+        def rebuild(transaction):
+            query = self.db.collection('inventory').where('user_id', '==', user_id).select(STAT_FIELDS)
+            record = build_stats(doc.to_dict() for doc in transaction.get(query))
+            transaction.set(self._stats_ref(user_id), record)
+            return record
+        return rebuild(self.db.transaction())
+
+    def backfill_item_fields(self) -> int:
+        """Mevcut kayıtlara expiry_ordinal ve sayısal created_at ekle (tek seferlik)"""
+        if self._use_local_storage:
+            updated = self.local_store.backfill_items()
         else:
-            # Firebase'dan sil
-            try:
-                self.db.collection('inventory').document(item_id).delete()
-                return True
-            except Exception as e:
-                st.error(f"❌ Ürün silme hatası: {str(e)}")
-                return False
+            updated = 0
+            batch = self.db.batch()
+            pending = 0
+            for doc in self.db.collection('inventory').stream():
+                item = doc.to_dict()
+                if normalize_item_fields(item):
+                    batch.update(doc.reference, {
+                        'expiry_ordinal': item['expiry_ordinal'],
+                        'created_at': item['created_at']
+                    })
+                    pending += 1
+                    updated += 1
+                    if pending == FIRESTORE_BATCH_LIMIT:
+                        batch.commit()
+                        batch = self.db.batch()
+                        pending = 0
+            if pending:
+                batch.commit()
+            # Diğer süreçler bir sonraki başlatmada sunucu tarafı sıralamaya geçer
+            self.db.collection(SCHEMA_COLLECTION).document('inventory').set({'version': SCHEMA_VERSION})
+            self._fields_backfilled = True
+        self.inventory_cache.clear()
+        return updated
 
 
 @st.cache_resource
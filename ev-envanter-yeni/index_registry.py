@@ -0,0 +1,76 @@
+# index_registry.py - Kullanıcı bazlı bellek içi envanter indeksleri
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List
+
+
+class UserIndexRegistry:
+    """Kullanıcı bazlı indeksler (en fazla `max_users`, LRU)
+
+    İndeks ilk kullanımda envanterden kurulur, ekleme/silme ile güncellenir;
+    envanter depodan yeniden okunduğunda `sync` yalnızca id farklarını uygular.
+    İndeks nesneleri `add_item(item)`, `remove(item_id)` ve `ids()` sağlamalıdır.
+    """
+
+    def __init__(self, factory: Callable[[], Any], max_users: int = 100):
+        self._factory = factory
+        self.max_users = max_users
+        self._indexes: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def has(self, user_id: str) -> bool:
+        with self._lock:
+            return user_id in self._indexes
+
+    def build(self, user_id: str, items: Iterable[Dict]):
+        index = self._factory()
+        for item in items:
+            index.add_item(item)
+        with self._lock:
+            self._indexes[user_id] = index
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+
+    def drop(self, user_id: str):
+        """İndeksi sil (bir sonraki kullanımda yeniden kurulur)"""
+        with self._lock:
+            self._indexes.pop(user_id, None)
+
+    def sync(self, user_id: str, items: List[Dict]):
+        """İndeks varsa depodan okunan envanterle eşitle"""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                return
+            current = {item['id']: item for item in items}
+            existing = index.ids()
+            for item_id in existing - current.keys():
+                index.remove(item_id)
+            for item_id in current.keys() - existing:
+                index.add_item(current[item_id])
+
+    def apply_add(self, user_id: str, items: Iterable[Dict]):
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                return
+            for item in items:
+                index.add_item(item)
+
+    def apply_remove(self, user_id: str, item_ids: Iterable[str]):
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                return
+            for item_id in item_ids:
+                index.remove(item_id)
+
+    def read(self, user_id: str, fn: Callable[[Any], Any], default: Any = None) -> Any:
+        """İndeks üzerinde `fn`i kilit altında çalıştır; indeks yoksa `default`"""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                return default
+            self._indexes.move_to_end(user_id)
+            return fn(index)
@@ -0,0 +1,170 @@
+# inventory_cache.py - Kullanıcı bazlı envanter önbelleği
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def _estimate_size(item: Dict) -> int:
+    """Ürün sözlüğünün yaklaşık bellek boyutu (byte)"""
+    size = sys.getsizeof(item)
+    for key, value in item.items():
+        size += sys.getsizeof(key) + sys.getsizeof(value)
+    return size
+
+
+class _Entry:
+    __slots__ = ("items", "size", "loaded_at")
+
+    def __init__(self, items: Dict[str, Dict], loaded_at: float):
+        self.items = items
+        self.size = sum(_estimate_size(item) for item in items.values())
+        self.loaded_at = loaded_at
+
+
+class InventoryCache:
+    """Yazma işlemleriyle güncellenen, LRU tahliyeli ve bellek sınırlı envanter önbelleği
+
+    Her kullanıcının bir sürüm numarası vardır ve her yazma işleminde artar.
+    Depodan okuma yapan taraf okumadan önceki sürümü `put` ile geri verir;
+    arada bir yazma olduysa eski veri önbelleğe yazılmaz.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 60):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def version(self, user_id: str) -> int:
+        """Kullanıcının güncel sürüm numarası"""
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def get(self, user_id: str) -> Optional[List[Dict]]:
+        """Önbellekteki envanterin kopyasını döndür, yoksa None"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and self.ttl_seconds and time.time() - entry.loaded_at > self.ttl_seconds:
+                # Başka cihaz/süreçlerden gelen değişiklikleri kaçırmamak için süre dolunca yeniden oku
+                self._drop(user_id)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(user_id)
+            # Çağıranlar ürünleri değiştirebildiği için (ör. days_left) kopya döndür
+            return [dict(item) for item in entry.items.values()]
+
+    def is_fresh(self, user_id: str) -> bool:
+        """Kullanıcının envanteri önbellekte ve süresi dolmamış mı (sayaçları etkilemez)"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            return entry is not None and not (self.ttl_seconds and time.time() - entry.loaded_at > self.ttl_seconds)
+
+    def select(self, user_id: str, fn: Callable[[List[Dict]], Tuple[List[Dict], Any]]) -> Optional[Tuple[List[Dict], Any]]:
+        """Önbellekteki envanter üzerinde sorgu çalıştır, yalnızca sonuçları kopyala; yoksa None"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or (self.ttl_seconds and time.time() - entry.loaded_at > self.ttl_seconds):
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(user_id)
+            items, extra = fn(list(entry.items.values()))
+            return [dict(item) for item in items], extra
+
+    def put(self, user_id: str, items: List[Dict], version: int):
+        """Depodan okunan envanteri önbelleğe yaz (sürüm değişmediyse)"""
+        with self._lock:
+            if self._versions.get(user_id, 0) != version:
+                return
+            self._drop(user_id)
+            entry = _Entry({item['id']: dict(item) for item in items}, time.time())
+            if entry.size > self.max_bytes:
+                return
+            self._entries[user_id] = entry
+            self._total_bytes += entry.size
+            self._evict()
+
+    def apply_add(self, user_id: str, items: Iterable[Dict]):
+        """Eklenen ürünleri (id alanı dolu) önbelleğe yaz"""
+        with self._lock:
+            self._bump(user_id)
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            for item in items:
+                item = dict(item)
+                old = entry.items.get(item['id'])
+                if old is not None:
+                    entry.size -= _estimate_size(old)
+                    self._total_bytes -= _estimate_size(old)
+                entry.items[item['id']] = item
+                size = _estimate_size(item)
+                entry.size += size
+                self._total_bytes += size
+            self._entries.move_to_end(user_id)
+            self._evict()
+
+    def apply_remove(self, user_id: str, item_ids: Iterable[str]):
+        """Silinen ürünleri önbellekten çıkar"""
+        with self._lock:
+            self._bump(user_id)
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            for item_id in item_ids:
+                old = entry.items.pop(item_id, None)
+                if old is not None:
+                    size = _estimate_size(old)
+                    entry.size -= size
+                    self._total_bytes -= size
+
+    def invalidate(self, user_id: str):
+        """Kullanıcının önbelleğini geçersiz kıl"""
+        with self._lock:
+            self._bump(user_id)
+            self._drop(user_id)
+
+    def clear(self):
+        """Tüm önbelleği temizle"""
+        with self._lock:
+            for user_id in list(self._entries):
+                self.invalidate(user_id)
+
+    def stats(self) -> Dict:
+        """İsabet/ıskalama sayaçları ve bellek kullanımı"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'users': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes
+            }
+
+    def _bump(self, user_id: str):
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def _drop(self, user_id: str):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+
+    def _evict(self):
+        """Bellek sınırı aşıldıysa en uzun süredir kullanılmayan kullanıcıları çıkar"""
+        while self._total_bytes > self.max_bytes and self._entries:
+            user_id, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.size
+            self.evictions += 1
@@ -0,0 +1,203 @@
+# inventory_mirror.py - Firestore anlık dinleyicileriyle beslenen envanter aynası
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class _Mirror:
+    __slots__ = ("items", "watch", "ready", "last_access")
+
+    def __init__(self, now: float):
+        self.items: Dict[str, Dict] = {}
+        self.watch = None
+        self.ready = threading.Event()
+        self.last_access = now
+
+
+class InventoryMirror:
+    """Etkin kullanıcılar için Firestore `on_snapshot` dinleyicisi ve bellekte envanter kopyası
+
+    İlk erişimde kullanıcının sorgusuna dinleyici bağlanır; ilk anlık görüntü tüm
+    belgeleri, sonrakiler yalnızca değişen belgeleri (ADDED/MODIFIED/REMOVED) getirir.
+    Okumalar depoya gitmeden aynadan yapılır. `idle_seconds` boyunca okunmayan
+    kullanıcıların dinleyicisi ayrılır ve aynası silinir.
+
+    `open_query(user_id)` `on_snapshot(callback)` destekleyen bir sorgu, `to_item(doc)`
+    belgeyi ürün sözlüğüne çeviren fonksiyon olmalıdır; testlerde değişiklik olayları
+    üreten bellek içi bir sahte sorgu verilebilir. `on_change(user_id, eklenen/değişen,
+    silinen id'ler, reset)` çağrısında reset, dinleyicinin yeni bağlandığını (ayrıyken
+    kaçırılan silmeler olabileceğini) bildirir.
+    """
+
+    def __init__(self, open_query: Callable[[str], Any], to_item: Callable[[Any], Dict],
+                 idle_seconds: float = 300, ready_timeout: float = 10,
+                 on_change: Optional[Callable[[str, List[Dict], List[str], bool], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self._open_query = open_query
+        self._to_item = to_item
+        self.idle_seconds = idle_seconds
+        self.ready_timeout = ready_timeout
+        self._on_change = on_change
+        self._clock = clock
+        self._mirrors: Dict[str, _Mirror] = {}
+        self._lock = threading.Lock()
+        self.snapshots = 0
+        self.detached = 0
+
+    def get(self, user_id: str) -> Optional[List[Dict]]:
+        """Aynadaki envanterin kopyası; dinleyici hazır değilse None"""
+        mirror = self._ready_mirror(user_id)
+        if mirror is None:
+            return None
+        with self._lock:
+            # Çağıranlar ürünleri değiştirebildiği için (ör. days_left) kopya döndür
+            return [dict(item) for item in mirror.items.values()]
+
+    def select(self, user_id: str, fn: Callable[[List[Dict]], Tuple[List[Dict], Any]]) -> Optional[Tuple[List[Dict], Any]]:
+        """Aynadaki envanter üzerinde sorgu çalıştır, yalnızca sonuçları kopyala; hazır değilse None"""
+        mirror = self._ready_mirror(user_id)
+        if mirror is None:
+            return None
+        with self._lock:
+            items, extra = fn(list(mirror.items.values()))
+            return [dict(item) for item in items], extra
+
+    def ready(self, user_id: str) -> bool:
+        """Dinleyici bağlı ve ilk görüntü gelmişse True; dinleyici bağlamaz, okuma sayılır"""
+        with self._lock:
+            mirror = self._mirrors.get(user_id)
+            if mirror is None or not mirror.ready.is_set() or not getattr(mirror.watch, "is_active", True):
+                return False
+            mirror.last_access = self._clock()
+            return True
+
+    def _ready_mirror(self, user_id: str) -> Optional[_Mirror]:
+        """Gerekirse dinleyiciyi bağla ve ilk anlık görüntüyü bekle"""
+        self.detach_idle()
+        stale = []
+        with self._lock:
+            mirror = self._mirrors.get(user_id)
+            if mirror is not None and not getattr(mirror.watch, "is_active", True):
+                # Bağlantı hatayla kapandıysa yeniden bağlan
+                stale.append(self._pop(user_id))
+                mirror = None
+            if mirror is None:
+                mirror = _Mirror(self._clock())
+                self._mirrors[user_id] = mirror
+                attach = True
+            else:
+                mirror.last_access = self._clock()
+                attach = False
+        self._unsubscribe(stale)
+
+        if attach:
+            try:
+                watch = self._open_query(user_id).on_snapshot(
+                    lambda docs, changes, read_time: self._apply_snapshot(user_id, mirror, changes))
+            except Exception:
+                with self._lock:
+                    if self._mirrors.get(user_id) is mirror:
+                        del self._mirrors[user_id]
+                return None
+            with self._lock:
+                if self._mirrors.get(user_id) is mirror:
+                    mirror.watch = watch
+                    watch = None
+            if watch is not None:
+                # Bağlanırken ayrıldı
+                self._unsubscribe([watch])
+                return None
+
+        if not mirror.ready.wait(self.ready_timeout):
+            return None
+        return mirror
+
+    def _apply_snapshot(self, user_id: str, mirror: _Mirror, changes: Iterable):
+        """Dinleyiciden gelen belge değişikliklerini aynaya uygula"""
+        upserted = []
+        removed = []
+        with self._lock:
+            if self._mirrors.get(user_id) is not mirror:
+                return
+            reset = not mirror.ready.is_set()
+            for change in changes:
+                if change.type.name == "REMOVED":
+                    if mirror.items.pop(change.document.id, None) is not None:
+                        removed.append(change.document.id)
+                else:
+                    item = self._to_item(change.document)
+                    mirror.items[item['id']] = item
+                    upserted.append(item)
+            self.snapshots += 1
+            mirror.ready.set()
+        if self._on_change is not None and (upserted or removed or reset):
+            self._on_change(user_id, upserted, removed, reset)
+
+    def apply_add(self, user_id: str, items: Iterable[Dict]):
+        """Bu süreçte yazılan ürünleri, dinleyici olayı gelmeden aynaya yansıt"""
+        with self._lock:
+            mirror = self._mirrors.get(user_id)
+            if mirror is None or not mirror.ready.is_set():
+                return
+            for item in items:
+                mirror.items[item['id']] = dict(item)
+
+    def apply_remove(self, user_id: str, item_ids: Iterable[str]):
+        """Bu süreçte silinen ürünleri aynadan çıkar"""
+        with self._lock:
+            mirror = self._mirrors.get(user_id)
+            if mirror is None or not mirror.ready.is_set():
+                return
+            for item_id in item_ids:
+                mirror.items.pop(item_id, None)
+
+    def detach_idle(self):
+        """`idle_seconds` boyunca okunmayan kullanıcıların dinleyicisini ayır"""
+        if not self.idle_seconds:
+            return
+        cutoff = self._clock() - self.idle_seconds
+        with self._lock:
+            idle = [user_id for user_id, mirror in self._mirrors.items() if mirror.last_access < cutoff]
+            watches = [self._pop(user_id) for user_id in idle]
+        self._unsubscribe(watches)
+
+    def detach(self, user_id: str):
+        """Kullanıcının dinleyicisini ayır ve aynasını sil"""
+        with self._lock:
+            watches = [self._pop(user_id)]
+        self._unsubscribe(watches)
+
+    def close(self):
+        """Tüm dinleyicileri ayır"""
+        with self._lock:
+            watches = [self._pop(user_id) for user_id in list(self._mirrors)]
+        self._unsubscribe(watches)
+
+    def _pop(self, user_id: str):
+        """Aynayı sil ve dinleyicisini döndür (kilit tutulurken çağrılır)"""
+        mirror = self._mirrors.pop(user_id, None)
+        if mirror is None:
+            return None
+        self.detached += 1
+        return mirror.watch
+
+    @staticmethod
+    def _unsubscribe(watches: Iterable):
+        # Dinleyici iş parçacığı kilidi bekliyor olabilir; ayırma kilit dışında yapılır
+        for watch in watches:
+            if watch is None:
+                continue
+            try:
+                watch.unsubscribe()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict:
+        """Bağlı dinleyici, ayna boyutu ve olay sayaçları"""
+        with self._lock:
+            return {
+                'listeners': len(self._mirrors),
+                'items': sum(len(mirror.items) for mirror in self._mirrors.values()),
+                'snapshots': self.snapshots,
+                'detached': self.detached
+            }
@@ -0,0 +1,135 @@
+# inventory_stats.py - Kullanıcı bazlı, yazmalarla güncellenen envanter özeti
+import math
+from datetime import date
+from typing import Dict, Iterable, Optional
+
+from expiry_engine import LOW_STOCK_THRESHOLD, expiry_to_ordinal
+
+# Özet kaydının biçim sürümü; farklı sürümdeki kayıtlar okunurken baştan hesaplanır
+STATS_VERSION = 1
+
+# Özet kaydındaki sayaçlar
+STAT_COUNTERS = ("total_items", "low_stock", "unparsed_expiry")
+# Özet kaydındaki sayaç sözlükleri: kategori -> adet, son kullanma günü (ordinal, metin) -> adet
+STAT_BUCKETS = ("categories", "expiry_days")
+
+# Özeti hesaplamak için gereken ürün alanları (Firestore'da yalnızca bunlar okunur)
+STAT_FIELDS = ["category", "quantity", "expiry_date", "expiry_ordinal"]
+
+
+def empty_stats() -> Dict:
+    """Boş özet kaydı"""
+    record = {'version': STATS_VERSION}
+    record.update({counter: 0 for counter in STAT_COUNTERS})
+    record.update({bucket: {} for bucket in STAT_BUCKETS})
+    return record
+
+
+def _is_low_stock(quantity) -> bool:
+    """analyze_inventory ile aynı kural: sayıya çevrilemeyen miktar 0 sayılır"""
+    try:
+        quantity = float(quantity)
+    except (TypeError, ValueError):
+        return True
+    return (0.0 if math.isnan(quantity) else quantity) <= LOW_STOCK_THRESHOLD
+
+
+def stats_delta(items: Iterable[Dict], sign: int = 1) -> Dict:
+    """Ürünlerin özete katkısı; silinen ürünler için sign=-1
+
+    Bir ürün güncellendiğinde eski hali -1, yeni hali +1 ile uygulanır.
+    """
+    delta = empty_stats()
+    for item in items:
+        delta['total_items'] += sign
+        if _is_low_stock(item.get('quantity', 0)):
+            delta['low_stock'] += sign
+        category = item.get('category', 'Diğer')
+        delta['categories'][category] = delta['categories'].get(category, 0) + sign
+        if item.get('expiry_date'):
+            ordinal = item.get('expiry_ordinal') or expiry_to_ordinal(item['expiry_date'])
+            if ordinal:
+                day = str(ordinal)
+                delta['expiry_days'][day] = delta['expiry_days'].get(day, 0) + sign
+            else:
+                delta['unparsed_expiry'] += sign
+    return delta
+
+
+def apply_stats_delta(record: Dict, delta: Dict) -> Dict:
+    """Farkı özet kaydına yerinde uygula, sıfırlanan sayaçları sil"""
+    for counter in STAT_COUNTERS:
+        record[counter] = record.get(counter, 0) + delta.get(counter, 0)
+    for bucket in STAT_BUCKETS:
+        counts = record.setdefault(bucket, {})
+        for key, change in delta.get(bucket, {}).items():
+            value = counts.get(key, 0) + change
+            if value:
+                counts[key] = value
+            else:
+                counts.pop(key, None)
+    return record
+
+
+def build_stats(items: Iterable[Dict]) -> Dict:
+    """Özeti ürünlerden baştan hesapla (onarım için)"""
+    return apply_stats_delta(empty_stats(), stats_delta(items))
+
+
+class InventoryStats:
+    """Özet kaydı üzerinden dashboard metrikleri
+
+    `stats` ve `status_counts`, InventoryAnalysis ile aynı sonucu tüm ürünleri
+    okumadan, yalnızca gün histogramıyla verir.
+    """
+
+    def __init__(self, record: Optional[Dict] = None):
+        self.record = record or empty_stats()
+
+    def _day_counts(self, today: Optional[date] = None) -> Dict[int, int]:
+        """Son kullanmasına kalan gün -> ürün sayısı"""
+        today_ordinal = (today or date.today()).toordinal()
+        return {int(day) - today_ordinal: count for day, count in self.record.get('expiry_days', {}).items()
+                if count > 0}
+
+    def stats(self, today: Optional[date] = None) -> Dict:
+        """calculate_inventory_stats ile aynı biçimde özet"""
+        days = self._day_counts(today)
+        return {
+            'total_items': self.record.get('total_items', 0),
+            'expiring_soon': sum(count for day, count in days.items() if 0 <= day <= 7),
+            'expired': sum(count for day, count in days.items() if day < 0),
+            'low_stock': self.record.get('low_stock', 0),
+            'categories': {category: count for category, count in self.record.get('categories', {}).items()
+                           if count > 0}
+        }
+
+    def status_counts(self, today: Optional[date] = None) -> Dict[str, int]:
+        """Dashboard grafiği için son kullanma durumu sayıları"""
+        days = self._day_counts(today)
+        expired = sum(count for day, count in days.items() if day < 0)
+        critical = sum(count for day, count in days.items() if 0 <= day <= 3)
+        approaching = sum(count for day, count in days.items() if 3 < day <= 7)
+        dated = sum(days.values()) + self.record.get('unparsed_expiry', 0)
+        return {
+            "İyi": dated - expired - critical - approaching,
+            "Yaklaşıyor": approaching,
+            "Kritik": critical,
+            "Geçmiş": expired
+        }
+
+    def count(self, category: Optional[str] = None, expiry_from: Optional[int] = None,
+              expiry_to: Optional[int] = None) -> Optional[int]:
+        """query_inventory filtresine uyan ürün sayısı; kategori ve gün aralığı birlikteyse None
+
+        Özet kategori ve gün sayaçlarını ayrı tuttuğu için ikisinin kesişimi bilinemez.
+        """
+        if expiry_from is None and expiry_to is None:
+            if category is None:
+                return self.record.get('total_items', 0)
+            return max(self.record.get('categories', {}).get(category, 0), 0)
+        if category is not None:
+            return None
+        return sum(count for day, count in self.record.get('expiry_days', {}).items()
+                   if count > 0 and (expiry_from is None or int(day) >= expiry_from)
+                   and (expiry_to is None or int(day) <= expiry_to))
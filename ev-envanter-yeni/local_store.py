@@ -0,0 +1,733 @@
+# local_store.py - Yerel test modu için depolama katmanları
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from atomic_json import AtomicJsonFile, file_lock
+from expiry_engine import normalize_item_fields
+from inventory_stats import STAT_FIELDS, STATS_VERSION, apply_stats_delta, build_stats, stats_delta
+
+# İlk kurulumda eklenen test kullanıcıları
+DEFAULT_USERS = {
+    "test@test.com": {"password": "123456", "uid": "test_user_123"},
+    "admin@admin.com": {"password": "admin123", "uid": "admin_user_456"}
+}
+
+# SQLite'ta ayrı sütun olarak tutulan ürün alanları (geri kalanlar `extra` içinde)
+ITEM_COLUMNS = ["name", "category", "quantity", "unit", "expiry_date", "expiry_ordinal",
+                "location", "notes", "created_at"]
+
+# Kayıtlı veri biçiminin sürümü; 2: expiry_ordinal ve sayısal created_at alanları
+SCHEMA_VERSION = 2
+
+# Sorgularda sıralanabilecek alanlar ve alan eksikse kullanılan değer
+# (SQLite'taki COALESCE ifadeleriyle aynı olmalı). Eksik değerler Firestore'daki null
+# sıralamasıyla aynı yerde, artan sıralamada en başta yer alır.
+ORDER_FIELDS = {
+    "expiry_ordinal": -2 ** 62,
+    "created_at": 0.0,
+    "name": ""
+}
+
+
+def new_item_id() -> str:
+    """Zamana göre sıralanabilen, sıkı döngüde bile çakışmayan ürün id'si"""
+    return f"item_{int(time.time() * 1000)}_{uuid.uuid4().hex[:12]}"
+
+
+def _sort_value(item: Dict, order_by: str):
+    value = item.get(order_by)
+    return ORDER_FIELDS[order_by] if value is None else value
+
+
+def query_items(items: List[Dict], category: Optional[str] = None, expiry_from: Optional[int] = None,
+                expiry_to: Optional[int] = None, order_by: str = "expiry_ordinal", descending: bool = False,
+                limit: Optional[int] = None, start_after: Optional[Tuple] = None) -> Tuple[List[Dict], Optional[Tuple]]:
+    """Bellekteki ürün listesine FirebaseClient.query_inventory ile aynı filtreleri uygula"""
+    if category is not None:
+        items = [item for item in items if item.get('category') == category]
+    if expiry_from is not None or expiry_to is not None:
+        low = expiry_from if expiry_from is not None else -2 ** 62
+        high = expiry_to if expiry_to is not None else 2 ** 62
+        items = [item for item in items
+                 if item.get('expiry_ordinal') is not None and low <= item['expiry_ordinal'] <= high]
+
+    items = sorted(items, key=lambda item: (_sort_value(item, order_by), item['id']), reverse=descending)
+    if start_after is not None:
+        cursor = tuple(start_after)
+        if descending:
+            items = [item for item in items if (_sort_value(item, order_by), item['id']) < cursor]
+        else:
+            items = [item for item in items if (_sort_value(item, order_by), item['id']) > cursor]
+    return page_with_cursor(items, order_by, limit)
+
+
+def _in_window(item: Dict, expiry_from: Optional[int], expiry_to: Optional[int]) -> bool:
+    ordinal = item.get('expiry_ordinal')
+    return ordinal is not None and (expiry_from is None or ordinal >= expiry_from) \
+        and (expiry_to is None or ordinal <= expiry_to)
+
+
+def _refresh_stats(container: Dict, key: str, inventory: Dict[str, Dict], delta: Dict):
+    """JSON depolarında container[key] özetine farkı uygula; kayıt yoksa ya da eskiyse baştan hesapla"""
+    record = container.get(key)
+    if record is not None and record.get('version') == STATS_VERSION:
+        apply_stats_delta(record, delta)
+    else:
+        container[key] = build_stats(inventory.values())
+
+
+def _read_derived(derived: AtomicJsonFile, source_path: str) -> Optional[Dict]:
+    """Kaynak dosyadan türetilen yan dosyayı oku; yoksa, bozuksa ya da kaynaktan eskiyse None
+
+    Yan dosya her kayıttan sonra yazıldığı için kaynaktan eski olması, son kayıttan
+    sonra yazılamadığı (ör. çökme) ya da yazmanın sürdüğü anlamına gelir.
+    """
+    try:
+        if os.stat(derived.path).st_mtime_ns < os.stat(source_path).st_mtime_ns:
+            return None
+        return derived.read()
+    except (OSError, ValueError):
+        return None
+
+
+def page_with_cursor(items: List[Dict], order_by: str, limit: Optional[int]) -> Tuple[List[Dict], Optional[Tuple]]:
+    """Sıralı sonuçları sayfaya böl; sonraki sayfa için (sıralama değeri, id) imlecini döndür"""
+    if limit is None or len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, (_sort_value(items[-1], order_by), items[-1]['id'])
+
+
+class JsonStore:
+    """Tüm kullanıcıları tek bir JSON dosyasında tutan yerel depo
+
+    Yazmalar kilitli oku-değiştir-yaz olarak yapılır, böylece aynı dosyayı
+    kullanan birden fazla Streamlit süreci birbirinin değişikliğini ezmez.
+    Özet kayıtları ürünlerle aynı kayıtta tutulur; dashboard'un tüm envanteri
+    ayrıştırmaması için her kayıttan sonra küçük bir yan dosyaya (`*.stats.json`) kopyalanır.
+    """
+
+    def __init__(self, data_file: str = "inventory_database.json", group_commit_window: float = 0.0):
+        self.data_file = data_file
+        self._stats_file = AtomicJsonFile(os.path.splitext(data_file)[0] + ".stats.json")
+        self._file = AtomicJsonFile(data_file, group_commit_window, on_commit=self._write_stats_file)
+        self._init_database()
+
+    def _init_database(self):
+        """Yerel database başlat, eski biçimdeki kayıtları güncelle"""
+        if not self._file.exists():
+            def create(data):
+                if not data:
+                    data.update({
+                        "schema_version": SCHEMA_VERSION,
+                        "users": dict(DEFAULT_USERS),
+                        "inventory": {}
+                    })
+            self._file.update(create)
+        elif self._load_data().get("schema_version", 1) < SCHEMA_VERSION:
+            self.backfill_items()
+
+        if _read_derived(self._stats_file, self.data_file) is None:
+            with file_lock(self._file.lock_path):
+                self._write_stats_file(self._load_data())
+
+    def _write_stats_file(self, data: Dict):
+        self._stats_file.replace({"stats": data.get("stats", {})})
+
+    def _load_data(self) -> Dict:
+        """Yerel veriyi yükle"""
+        return self._file.read() or {"users": {}, "inventory": {}}
+
+    def get_user(self, email: str) -> Optional[Dict]:
+        """E-posta ile kullanıcı kaydını getir"""
+        return self._load_data().get("users", {}).get(email)
+
+    def get_inventory(self, user_id: str) -> List[Dict]:
+        """Kullanıcının envanterini getir"""
+        inventory = self._load_data().get("inventory", {}).get(user_id, {})
+        items = []
+        for item_id, item_data in inventory.items():
+            item_data['id'] = item_id
+            items.append(item_data)
+        return items
+
+    def query_inventory(self, user_id: str, **filters) -> Tuple[List[Dict], Optional[Tuple]]:
+        """Filtrelenmiş ve sıralanmış envanter sayfası"""
+        return query_items(self.get_inventory(user_id), **filters)
+
+    def iter_expiring_items(self, expiry_from: Optional[int] = None,
+                            expiry_to: Optional[int] = None) -> Iterator[Tuple[str, Dict]]:
+        """Tüm kullanıcılarda son kullanma günü aralıktaki ürünler: (user_id, ürün)"""
+        for user_id, inventory in self._load_data().get("inventory", {}).items():
+            for item_id, item in inventory.items():
+                if _in_window(item, expiry_from, expiry_to):
+                    yield user_id, dict(item, id=item_id)
+
+    def backfill_items(self) -> int:
+        """Tüm kayıtlara expiry_ordinal ve sayısal created_at ekle, güncellenen ürün sayısını döndür"""
+        def backfill(data):
+            updated = 0
+            for inventory in data.get("inventory", {}).values():
+                for item in inventory.values():
+                    if normalize_item_fields(item):
+                        updated += 1
+            data["schema_version"] = SCHEMA_VERSION
+            return updated
+        return self._file.update(backfill)
+
+    def add_item(self, user_id: str, item: Dict) -> str:
+        """Ürünü ekle ve yeni ürün id'sini döndür"""
+        return self.add_items(user_id, [item])[0]
+
+    def add_items(self, user_id: str, items: Iterable[Dict]) -> List[str]:
+        """Ürünleri tek kayıtla ekle ve yeni id'leri sırayla döndür"""
+        items = list(items)
+
+        def add(data):
+            inventory = data.setdefault("inventory", {}).setdefault(user_id, {})
+            item_ids = []
+            for item in items:
+                item_id = new_item_id()
+                inventory[item_id] = item
+                item_ids.append(item_id)
+            _refresh_stats(data.setdefault("stats", {}), user_id, inventory, stats_delta(items))
+            return item_ids
+        return self._file.update(add)
+
+    def delete_item(self, user_id: str, item_id: str) -> bool:
+        """Ürünü sil, bulunamazsa False döndür"""
+        return bool(self.delete_items(user_id, [item_id]))
+
+    def delete_items(self, user_id: str, item_ids: Iterable[str]) -> List[str]:
+        """Ürünleri tek kayıtla sil, silinen id'leri döndür"""
+        item_ids = list(item_ids)
+
+        def delete(data):
+            inventory = data.get("inventory", {}).get(user_id, {})
+            removed = {item_id: inventory.pop(item_id) for item_id in item_ids if item_id in inventory}
+            if removed:
+                _refresh_stats(data.setdefault("stats", {}), user_id, inventory,
+                               stats_delta(removed.values(), sign=-1))
+            return list(removed)
+        return self._file.update(delete)
+
+    def get_stats(self, user_id: str) -> Optional[Dict]:
+        """Kullanıcının envanter özeti; kayıt yoksa ya da eskiyse None"""
+        # Yan dosya güncel değilse özet ana dosyadan okunur
+        data = _read_derived(self._stats_file, self.data_file) or self._load_data()
+        record = data.get("stats", {}).get(user_id)
+        return record if record is not None and record.get('version') == STATS_VERSION else None
+
+    def rebuild_stats(self, user_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """Özetleri ürünlerden baştan hesapla (varsayılan: tüm kullanıcılar)"""
+        user_ids = None if user_ids is None else list(user_ids)
+
+        def rebuild(data):
+            inventories = data.get("inventory", {})
+            stats = data.setdefault("stats", {})
+            rebuilt = {}
+            for user_id in (inventories if user_ids is None else user_ids):
+                stats[user_id] = rebuilt[user_id] = build_stats(inventories.get(user_id, {}).values())
+            return rebuilt
+        return self._file.update(rebuild)
+
+
+class ShardedJsonStore:
+    """Her kullanıcının envanterini ayrı bir JSON dosyasında tutan yerel depo
+
+    Dizin yapısı:
+        inventory_data/users.json              -> kullanıcı dizini
+        inventory_data/inventory/<user_id>.json -> kullanıcının ürünleri ve özeti
+        inventory_data/stats/<user_id>.json     -> özetin kopyası (dashboard okuması için)
+
+    Bir yazmanın maliyeti yalnızca o kullanıcının envanteri kadardır ve
+    farklı kullanıcıların yazmaları aynı dosya kilidini beklemez. Bellekte en fazla
+    `max_open_shards` kullanıcı dosyası nesnesi tutulur (en uzun süredir kullanılmayan
+    çıkarılır); çıkarılan dosyaya sonraki erişim yeni nesne açar, yazmalar dosya
+    kilidiyle sıralı kalır.
+    """
+
+    def __init__(self, data_dir: str = "inventory_data", legacy_file: Optional[str] = None,
+                 group_commit_window: float = 0.0, max_open_shards: int = 256):
+        self.data_dir = data_dir
+        self.inventory_dir = os.path.join(data_dir, "inventory")
+        self.stats_dir = os.path.join(data_dir, "stats")
+        self.group_commit_window = group_commit_window
+        self.max_open_shards = max_open_shards
+        self._users_file = AtomicJsonFile(os.path.join(data_dir, "users.json"), group_commit_window)
+        self._shards: "OrderedDict[str, AtomicJsonFile]" = OrderedDict()
+        self._shards_lock = threading.Lock()
+        self._init_database(legacy_file)
+
+    def _init_database(self, legacy_file: Optional[str]):
+        """Dizinleri oluştur; ilk açılışta tek dosyalı JSON veritabanını parçalara böl"""
+        os.makedirs(self.inventory_dir, exist_ok=True)
+        os.makedirs(self.stats_dir, exist_ok=True)
+        if self._users_file.exists():
+            return
+
+        legacy = AtomicJsonFile(legacy_file).read() if legacy_file and os.path.exists(legacy_file) else None
+        if legacy is None:
+            legacy = {"users": dict(DEFAULT_USERS), "inventory": {}}
+
+        for user_id, inventory in legacy.get("inventory", {}).items():
+            for item in inventory.values():
+                normalize_item_fields(item)
+            self._shard(user_id).update(lambda data, inventory=inventory: data.update({"items": inventory}))
+
+        # Kullanıcı dizini en son yazılır; yarıda kalan taşıma bir sonraki açılışta tekrarlanır
+        self._users_file.update(lambda data: data.update({
+            "schema_version": SCHEMA_VERSION,
+            "users": legacy.get("users", {})
+        }))
+
+    def _shard(self, user_id: str) -> AtomicJsonFile:
+        """Kullanıcının envanter dosyası (aynı dosya için tek nesne, group commit paylaşılır)"""
+        with self._shards_lock:
+            shard = self._shards.get(user_id)
+            if shard is not None:
+                self._shards.move_to_end(user_id)
+                return shard
+            stats_file = self._stats_file(user_id)
+            shard = AtomicJsonFile(
+                os.path.join(self.inventory_dir, quote(user_id, safe="-_.") + ".json"),
+                self.group_commit_window,
+                on_commit=lambda data: stats_file.replace({"stats": data.get("stats")})
+            )
+            self._shards[user_id] = shard
+            while len(self._shards) > self.max_open_shards:
+                self._shards.popitem(last=False)
+            return shard
+
+    def _stats_file(self, user_id: str) -> AtomicJsonFile:
+        """Kullanıcının özet yan dosyası"""
+        return AtomicJsonFile(os.path.join(self.stats_dir, quote(user_id, safe="-_.") + ".json"))
+
+    def iter_user_ids(self) -> Iterator[str]:
+        """Envanter dosyası olan tüm kullanıcı id'leri"""
+        for file_name in os.listdir(self.inventory_dir):
+            if file_name.endswith(".json"):
+                yield unquote(file_name[:-len(".json")])
+
+    def get_user(self, email: str) -> Optional[Dict]:
+        """E-posta ile kullanıcı kaydını getir"""
+        return (self._users_file.read() or {}).get("users", {}).get(email)
+
+    def get_inventory(self, user_id: str) -> List[Dict]:
+        """Kullanıcının envanterini yalnızca kendi dosyasından getir"""
+        inventory = (self._shard(user_id).read() or {}).get("items", {})
+        items = []
+        for item_id, item_data in inventory.items():
+            item_data['id'] = item_id
+            items.append(item_data)
+        return items
+
+    def query_inventory(self, user_id: str, **filters) -> Tuple[List[Dict], Optional[Tuple]]:
+        """Filtrelenmiş ve sıralanmış envanter sayfası"""
+        return query_items(self.get_inventory(user_id), **filters)
+
+    def iter_expiring_items(self, expiry_from: Optional[int] = None,
+                            expiry_to: Optional[int] = None) -> Iterator[Tuple[str, Dict]]:
+        """Tüm kullanıcılarda son kullanma günü aralıktaki ürünler; bellekte aynı anda tek kullanıcı dosyası"""
+        for user_id in self.iter_user_ids():
+            for item_id, item in (self._shard(user_id).read() or {}).get("items", {}).items():
+                if _in_window(item, expiry_from, expiry_to):
+                    yield user_id, dict(item, id=item_id)
+
+    def backfill_items(self) -> int:
+        """Tüm kayıtlara expiry_ordinal ve sayısal created_at ekle, güncellenen ürün sayısını döndür"""
+        def backfill(data):
+            return sum(1 for item in data.get("items", {}).values() if normalize_item_fields(item))
+        return sum(self._shard(user_id).update(backfill) for user_id in self.iter_user_ids())
+
+    def add_item(self, user_id: str, item: Dict) -> str:
+        """Ürünü ekle ve yeni ürün id'sini döndür"""
+        return self.add_items(user_id, [item])[0]
+
+    def add_items(self, user_id: str, items: Iterable[Dict]) -> List[str]:
+        """Ürünleri kullanıcının dosyasına tek kayıtla ekle ve yeni id'leri sırayla döndür"""
+        items = list(items)
+
+        def add(data):
+            inventory = data.setdefault("items", {})
+            item_ids = []
+            for item in items:
+                item_id = new_item_id()
+                inventory[item_id] = item
+                item_ids.append(item_id)
+            _refresh_stats(data, "stats", inventory, stats_delta(items))
+            return item_ids
+        return self._shard(user_id).update(add)
+
+    def delete_item(self, user_id: str, item_id: str) -> bool:
+        """Ürünü sil, bulunamazsa False döndür"""
+        return bool(self.delete_items(user_id, [item_id]))
+
+    def delete_items(self, user_id: str, item_ids: Iterable[str]) -> List[str]:
+        """Ürünleri kullanıcının dosyasından tek kayıtla sil, silinen id'leri döndür"""
+        item_ids = list(item_ids)
+
+        def delete(data):
+            inventory = data.get("items", {})
+            removed = {item_id: inventory.pop(item_id) for item_id in item_ids if item_id in inventory}
+            if removed:
+                _refresh_stats(data, "stats", inventory, stats_delta(removed.values(), sign=-1))
+            return list(removed)
+        return self._shard(user_id).update(delete)
+
+    def get_stats(self, user_id: str) -> Optional[Dict]:
+        """Kullanıcının envanter özeti; kayıt yoksa ya da eskiyse None"""
+        shard = self._shard(user_id)
+        # Yan dosya güncel değilse özet kullanıcının envanter dosyasından okunur
+        data = _read_derived(self._stats_file(user_id), shard.path) or shard.read() or {}
+        record = data.get("stats")
+        return record if record is not None and record.get('version') == STATS_VERSION else None
+
+    def rebuild_stats(self, user_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """Özetleri ürünlerden baştan hesapla (varsayılan: tüm kullanıcılar)"""
+        def rebuild(data):
+            data["stats"] = build_stats(data.get("items", {}).values())
+            return data["stats"]
+        return {user_id: self._shard(user_id).update(rebuild)
+                for user_id in (self.iter_user_ids() if user_ids is None else user_ids)}
+
+
+class SQLiteStore:
+    """Kullanıcı bazlı indekslerle SQLite üzerinde çalışan yerel depo"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            email TEXT PRIMARY KEY,
+            password TEXT NOT NULL,
+            uid TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS inventory (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            name TEXT,
+            category TEXT,
+            quantity REAL,
+            unit TEXT,
+            expiry_date TEXT,
+            expiry_ordinal INTEGER,
+            location TEXT,
+            notes TEXT,
+            created_at REAL,
+            extra TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_inventory_user ON inventory (user_id);
+        CREATE INDEX IF NOT EXISTS idx_inventory_user_category ON inventory (user_id, category);
+        CREATE INDEX IF NOT EXISTS idx_inventory_user_expiry ON inventory (user_id, expiry_date);
+        CREATE TABLE IF NOT EXISTS inventory_stats (
+            user_id TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, db_file: str = "inventory_database.db", json_file: Optional[str] = None):
+        self.db_file = db_file
+        self._local = threading.local()
+        self._init_database(json_file)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Her thread için ayrı bağlantı kullan (Streamlit oturumları ayrı thread'lerde çalışır)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_database(self, json_file: Optional[str]):
+        """Şemayı oluştur; boş veritabanını JSON'dan taşı ya da test kullanıcılarıyla doldur"""
+        conn = self._connect()
+        with conn:
+            conn.executescript(self.SCHEMA)
+        self._upgrade_schema(conn)
+        with conn:
+            # Eski veritabanında expiry_ordinal sütunu _upgrade_schema ile eklenir
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_inventory_expiry_ordinal ON inventory (expiry_ordinal)")
+        if conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None:
+            if json_file and os.path.exists(json_file):
+                self.migrate_from_json(json_file)
+            else:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO users (email, password, uid) VALUES (?, ?, ?)",
+                        [(email, user["password"], user["uid"]) for email, user in DEFAULT_USERS.items()]
+                    )
+
+    def _upgrade_schema(self, conn: sqlite3.Connection):
+        """Eski sürümde oluşturulmuş veritabanını güncel şemaya taşı"""
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(inventory)")}
+        with conn:
+            if "expiry_ordinal" not in columns:
+                conn.execute("ALTER TABLE inventory ADD COLUMN expiry_ordinal INTEGER")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_inventory_user_expiry_ordinal "
+                         "ON inventory (user_id, expiry_ordinal)")
+        self.backfill_items()
+        with conn:
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def backfill_items(self) -> int:
+        """Tüm kayıtlara expiry_ordinal ve sayısal created_at ekle, güncellenen ürün sayısını döndür"""
+        conn = self._connect()
+        updates = []
+        for row in conn.execute("SELECT * FROM inventory"):
+            item = self._row_to_item(row)
+            if normalize_item_fields(item):
+                updates.append((item['expiry_ordinal'], item['created_at'], item['id']))
+        with conn:
+            conn.executemany("UPDATE inventory SET expiry_ordinal = ?, created_at = ? WHERE id = ?", updates)
+        return len(updates)
+
+    def migrate_from_json(self, json_file: str) -> int:
+        """Eski JSON veritabanını içe aktar, aktarılan ürün sayısını döndür"""
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        user_rows = [(email, user.get("password", ""), user.get("uid", email))
+                     for email, user in data.get("users", {}).items()]
+        item_rows = []
+        for user_id, inventory in data.get("inventory", {}).items():
+            for item_id, item in inventory.items():
+                normalize_item_fields(item)
+                item_rows.append(self._item_to_row(user_id, item_id, item))
+
+        conn = self._connect()
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO users (email, password, uid) VALUES (?, ?, ?)", user_rows)
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO inventory (id, user_id, name, category, quantity, unit, expiry_date, "
+                "expiry_ordinal, location, notes, created_at, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                item_rows
+            )
+        return cursor.rowcount
+
+    @staticmethod
+    def _item_to_row(user_id: str, item_id: str, item: Dict) -> tuple:
+        """Ürün sözlüğünü tablo satırına çevir"""
+        extra = {k: v for k, v in item.items() if k not in ITEM_COLUMNS and k != 'id'}
+        return (item_id, user_id, *[item.get(column) for column in ITEM_COLUMNS],
+                json.dumps(extra, ensure_ascii=False) if extra else None)
+
+    @staticmethod
+    def _row_to_item(row: sqlite3.Row) -> Dict:
+        """Tablo satırını JSON modundaki ürün sözlüğü biçimine çevir"""
+        item = {column: row[column] for column in ITEM_COLUMNS if row[column] is not None}
+        # REAL sütunu tam sayıları da 5.0 olarak döndürür; JSON deposundaki gibi 5 gösterilsin
+        quantity = item.get('quantity')
+        if isinstance(quantity, float) and quantity.is_integer():
+            item['quantity'] = int(quantity)
+        if row["extra"]:
+            item.update(json.loads(row["extra"]))
+        item['id'] = row["id"]
+        return item
+
+    def get_user(self, email: str) -> Optional[Dict]:
+        """E-posta ile kullanıcı kaydını getir"""
+        row = self._connect().execute(
+            "SELECT password, uid FROM users WHERE email = ?", (email,)
+        ).fetchone()
+        return {"password": row["password"], "uid": row["uid"]} if row else None
+
+    def get_inventory(self, user_id: str) -> List[Dict]:
+        """Kullanıcının envanterini getir"""
+        rows = self._connect().execute(
+            "SELECT * FROM inventory WHERE user_id = ?", (user_id,)
+        ).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    def query_inventory(self, user_id: str, category: Optional[str] = None, expiry_from: Optional[int] = None,
+                        expiry_to: Optional[int] = None, order_by: str = "expiry_ordinal", descending: bool = False,
+                        limit: Optional[int] = None,
+                        start_after: Optional[Tuple] = None) -> Tuple[List[Dict], Optional[Tuple]]:
+        """Filtreleri indeksli SQL sorgusuna çevirerek envanter sayfası getir"""
+        if order_by not in ORDER_FIELDS:
+            raise ValueError(f"Sıralanamayan alan: {order_by}")
+        sort_expr = f"COALESCE({order_by}, ?)"
+        conditions = ["user_id = ?"]
+        params = [ORDER_FIELDS[order_by], user_id]
+        if category is not None:
+            conditions.append("category = ?")
+            params.append(category)
+        if expiry_from is not None:
+            conditions.append("expiry_ordinal >= ?")
+            params.append(expiry_from)
+        if expiry_to is not None:
+            conditions.append("expiry_ordinal <= ?")
+            params.append(expiry_to)
+        if start_after is not None:
+            conditions.append(f"({sort_expr}, id) {'<' if descending else '>'} (?, ?)")
+            params.extend([ORDER_FIELDS[order_by], *start_after])
+
+        direction = "DESC" if descending else "ASC"
+        sql = (f"SELECT *, {sort_expr} AS sort_value FROM inventory WHERE {' AND '.join(conditions)} "
+               f"ORDER BY sort_value {direction}, id {direction}")
+        if limit is not None:
+            # Sonraki sayfa olup olmadığını anlamak için bir fazla satır oku
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+
+        rows = self._connect().execute(sql, params).fetchall()
+        return page_with_cursor([self._row_to_item(row) for row in rows], order_by, limit)
+
+    def iter_expiring_items(self, expiry_from: Optional[int] = None,
+                            expiry_to: Optional[int] = None) -> Iterator[Tuple[str, Dict]]:
+        """Tüm kullanıcılarda son kullanma günü aralıktaki ürünler; satırlar imleçten akış halinde okunur"""
+        conditions = ["expiry_ordinal IS NOT NULL"]
+        params = []
+        if expiry_from is not None:
+            conditions.append("expiry_ordinal >= ?")
+            params.append(expiry_from)
+        if expiry_to is not None:
+            conditions.append("expiry_ordinal <= ?")
+            params.append(expiry_to)
+        # Ayrı bağlantı: akış sürerken aynı iş parçacığındaki yazmalar imleci bozmasın
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            for row in conn.execute(f"SELECT * FROM inventory WHERE {' AND '.join(conditions)}", params):
+                yield row["user_id"], self._row_to_item(row)
+        finally:
+            conn.close()
+
+    def add_item(self, user_id: str, item: Dict) -> str:
+        """Ürünü tek satır olarak ekle ve yeni ürün id'sini döndür"""
+        item_id = new_item_id()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO inventory (id, user_id, name, category, quantity, unit, expiry_date, "
+                "expiry_ordinal, location, notes, created_at, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._item_to_row(user_id, item_id, item)
+            )
+            self._apply_stats(conn, user_id, stats_delta([item]))
+        return item_id
+
+    def add_items(self, user_id: str, items: Iterable[Dict]) -> List[str]:
+        """Ürünleri tek işlemde (transaction) ekle ve yeni id'leri sırayla döndür"""
+        items = list(items)
+        item_ids = []
+        rows = []
+        for item in items:
+            item_id = new_item_id()
+            item_ids.append(item_id)
+            rows.append(self._item_to_row(user_id, item_id, item))
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO inventory (id, user_id, name, category, quantity, unit, expiry_date, "
+                "expiry_ordinal, location, notes, created_at, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            if items:
+                self._apply_stats(conn, user_id, stats_delta(items))
+        return item_ids
+
+    def delete_item(self, user_id: str, item_id: str) -> bool:
+        """Ürünü tek satır olarak sil, bulunamazsa False döndür"""
+        return bool(self.delete_items(user_id, [item_id]))
+
+    def delete_items(self, user_id: str, item_ids: Iterable[str]) -> List[str]:
+        """Ürünleri tek işlemde sil, silinen id'leri döndür"""
+        item_ids = list(item_ids)
+        deleted = []
+        conn = self._connect()
+        with self._write_transaction(conn):
+            # SQLite parametre sınırına takılmamak için parça parça
+            for start in range(0, len(item_ids), 500):
+                chunk = item_ids[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                deleted.extend(conn.execute(
+                    f"SELECT id, {', '.join(STAT_FIELDS)} FROM inventory WHERE user_id = ? AND id IN ({placeholders})",
+                    (user_id, *chunk)
+                ).fetchall())
+                conn.execute(f"DELETE FROM inventory WHERE user_id = ? AND id IN ({placeholders})",
+                             (user_id, *chunk))
+            if deleted:
+                self._apply_stats(conn, user_id, stats_delta(
+                    ({key: row[key] for key in STAT_FIELDS if row[key] is not None} for row in deleted), sign=-1))
+        return [row["id"] for row in deleted]
+
+    @staticmethod
+    @contextmanager
+    def _write_transaction(conn: sqlite3.Connection):
+        """Yazma kilidini baştan alan işlem: okunan satırlar işlem bitene kadar değişmez"""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    @staticmethod
+    def _apply_stats(conn: sqlite3.Connection, user_id: str, delta: Dict):
+        """Özet kaydına farkı yazma işleminin içinde uygula (kayıt yoksa okunurken hesaplanır)"""
+        row = conn.execute("SELECT data FROM inventory_stats WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return
+        record = json.loads(row["data"])
+        if record.get('version') != STATS_VERSION:
+            conn.execute("DELETE FROM inventory_stats WHERE user_id = ?", (user_id,))
+            return
+        conn.execute("UPDATE inventory_stats SET data = ? WHERE user_id = ?",
+                     (json.dumps(apply_stats_delta(record, delta), ensure_ascii=False), user_id))
+
+    def get_stats(self, user_id: str) -> Optional[Dict]:
+        """Kullanıcının envanter özeti; kayıt yoksa ya da eskiyse None"""
+        row = self._connect().execute(
+            "SELECT data FROM inventory_stats WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        record = json.loads(row["data"])
+        return record if record.get('version') == STATS_VERSION else None
+
+    def rebuild_stats(self, user_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """Özetleri ürünlerden baştan hesapla (varsayılan: tüm kullanıcılar)"""
+        conn = self._connect()
+        rebuilt = {}
+        with self._write_transaction(conn):
+            if user_ids is None:
+                user_ids = [row["user_id"] for row in conn.execute(
+                    "SELECT user_id FROM inventory UNION SELECT user_id FROM inventory_stats")]
+            for user_id in user_ids:
+                rows = conn.execute(
+                    f"SELECT {', '.join(STAT_FIELDS)} FROM inventory WHERE user_id = ?", (user_id,)
+                ).fetchall()
+                record = build_stats({key: row[key] for key in STAT_FIELDS if row[key] is not None}
+                                     for row in rows)
+                conn.execute("INSERT OR REPLACE INTO inventory_stats (user_id, data) VALUES (?, ?)",
+                             (user_id, json.dumps(record, ensure_ascii=False)))
+                rebuilt[user_id] = record
+        return rebuilt
+
+
+def create_local_store(backend: str = "json", data_file: str = "inventory_database.json",
+                       db_file: str = "inventory_database.db", data_dir: str = "inventory_data",
+                       group_commit_window: float = 0.0, max_open_shards: int = 256):
+    """Ayara göre yerel depoyu oluştur ("json", "sharded" veya "sqlite")"""
+    if backend == "sharded":
+        # İlk açılışta mevcut tek dosyalı JSON verisi kullanıcı dosyalarına bölünür
+        return ShardedJsonStore(data_dir, legacy_file=data_file, group_commit_window=group_commit_window,
+                                max_open_shards=max_open_shards)
+    if backend == "sqlite":
+        # İlk açılışta mevcut JSON verisi otomatik olarak taşınır
+        return SQLiteStore(db_file, json_file=data_file)
+    if backend == "json":
+        return JsonStore(data_file, group_commit_window)
+    raise ValueError(f"Bilinmeyen yerel depolama türü: {backend}")
@@ -0,0 +1,58 @@
+# maintenance.py - Bakım komutları (Streamlit dışında çalıştırılır)
+#
+# Kullanım:
+#   python maintenance.py migrate-sqlite [--json inventory_database.json] [--db inventory_database.db]
+#   python maintenance.py backfill
+#   python maintenance.py rebuild-stats [--user USER_ID ...]
+import argparse
+
+from local_store import SQLiteStore
+
+
+def migrate_sqlite(args):
+    """JSON veritabanını SQLite'a taşı"""
+    store = SQLiteStore(args.db)
+    count = store.migrate_from_json(args.json)
+    print(f"✅ {count} ürün {args.json} dosyasından {args.db} veritabanına aktarıldı.")
+
+
+def backfill(args):
+    """Kayıtlara expiry_ordinal ve sayısal created_at ekle (Firestore veya yerel depo)"""
+    from firebase_client import FirebaseClient
+
+    count = FirebaseClient().backfill_item_fields()
+    print(f"✅ {count} ürün güncellendi.")
+
+
+def rebuild_stats(args):
+    """Dashboard özet kayıtlarını ürünlerden baştan hesapla (sapmaları onarır)"""
+    from firebase_client import FirebaseClient
+
+    rebuilt = FirebaseClient().rebuild_inventory_stats(args.user)
+    for user_id, record in rebuilt.items():
+        print(f"  {user_id}: {record['total_items']} ürün")
+    print(f"✅ {len(rebuilt)} kullanıcının özeti yeniden hesaplandı.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ev Envanter bakım komutları")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate = subparsers.add_parser("migrate-sqlite", help="JSON veritabanını SQLite'a taşı")
+    migrate.add_argument("--json", default="inventory_database.json")
+    migrate.add_argument("--db", default="inventory_database.db")
+    migrate.set_defaults(func=migrate_sqlite)
+
+    backfill_parser = subparsers.add_parser("backfill", help="Kayıtlara expiry_ordinal ve sayısal created_at ekle")
+    backfill_parser.set_defaults(func=backfill)
+
+    stats_parser = subparsers.add_parser("rebuild-stats", help="Dashboard özet kayıtlarını yeniden hesapla")
+    stats_parser.add_argument("--user", action="append", help="Yalnızca bu kullanıcı (tekrarlanabilir)")
+    stats_parser.set_defaults(func=rebuild_stats)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# recipe_index.py - Yerel tarif derlemi ve malzeme indeksi
+import json
+import os
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from utils import normalize_name
+
+# Varsayılan tarif derlemi (modülle aynı klasörde)
+RECIPES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recipes.json")
+
+
+class AhoCorasick:
+    """Birden çok malzeme adını metinde tek geçişte arayan otomat
+
+    Eşleşmeler kelime başında başlamalıdır: "süt" → "sütlü kahve" eşleşir,
+    "un" → "tuna" eşleşmez. Metin ve kalıplar normalize_name ile
+    normalize edilmiş olmalıdır.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+
+        for pattern in set(patterns):
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append(pattern)
+
+        # Başarısızlık bağlantıları (BFS)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def find(self, text: str) -> Set[str]:
+        """Metinde geçen kalıplar"""
+        found = set()
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern in self._out[state]:
+                start = position - len(pattern) + 1
+                if start == 0 or not text[start - 1].isalnum():
+                    found.add(pattern)
+        return found
+
+
+def render_recipe(recipe: Dict, main_text: str) -> str:
+    """Tarifi uygulamanın markdown biçiminde yaz"""
+    steps = "\n".join(f"{number}. {step}" for number, step in enumerate(recipe['steps'], 1))
+    return (f"\n## {recipe['title']} ({recipe['servings']} kişilik, {recipe['minutes']} dakika)\n"
+            f"**Ana Malzemeler:** {main_text}\n"
+            f"**Ek Malzemeler:** {recipe['extras']}\n"
+            f"**Yapılışı:**\n{steps}\n"
+            f"**İpucu:** {recipe['tip']}\n")
+
+
+class RecipeIndex:
+    """Tarif derlemi üzerinde ana malzemeye göre ters indeks ve vektörel sıralama
+
+    Ürün adlarındaki malzemeler Aho-Corasick ile bulunur; arama süresi derlem
+    büyüklüğünden değil, ad uzunluğundan ve eşleşen tarif sayısından etkilenir.
+    Her tarifin malzemeleri sözlük numaralarıyla düz bir dizide tutulur
+    (`_offsets` ile bölünmüş); `rank` tüm tarifleri tek numpy geçişinde puanlar.
+    """
+
+    def __init__(self, recipes: List[Dict], staples: Iterable[str] = ()):
+        self.recipes = recipes
+        # (tür, malzeme) -> tarif indeksleri, derlemdeki sırayla
+        self._by_main: Dict[tuple, List[int]] = {}
+        self._vocabulary: Dict[str, int] = {}
+        ingredient_ids = []
+        is_main = []
+        offsets = []
+        for index, recipe in enumerate(recipes):
+            recipe['main'] = [normalize_name(name) for name in recipe['main']]
+            recipe['ingredients'] = [normalize_name(name) for name in recipe.get('ingredients', [])]
+            for name in recipe['main']:
+                self._by_main.setdefault((recipe['kind'], name), []).append(index)
+
+            offsets.append(len(ingredient_ids))
+            for name in dict.fromkeys(recipe['main'] + recipe['ingredients']):
+                ingredient_ids.append(self._vocabulary.setdefault(name, len(self._vocabulary)))
+                is_main.append(name in recipe['main'])
+
+        self._ingredients = np.array(ingredient_ids, dtype=np.int32)
+        self._is_main = np.array(is_main, dtype=bool)
+        self._offsets = np.array(offsets, dtype=np.int64)
+        self._sizes = np.diff(np.append(self._offsets, len(self._ingredients)))
+        # `rank` yalnızca yaklaşan ürün tariflerini sıralar; özel tarifler custom_recipe_for ile seçilir
+        self._is_expiring = np.array([recipe['kind'] == "expiring" for recipe in recipes], dtype=bool)
+        # Her evde bulunduğu varsayılan malzemeler (tuz, karabiber...)
+        self._staples = np.zeros(len(self._vocabulary), dtype=bool)
+        for name in staples:
+            ingredient_id = self._vocabulary.get(normalize_name(name))
+            if ingredient_id is not None:
+                self._staples[ingredient_id] = True
+
+        self._matcher = AhoCorasick(self._vocabulary)
+        self._name_cache: Dict[str, frozenset] = {}
+
+    def __len__(self):
+        return len(self.recipes)
+
+    def match_ingredients(self, name: str) -> frozenset:
+        """Ürün adında geçen (derlemde bilinen) malzemeler"""
+        key = normalize_name(name)
+        found = self._name_cache.get(key)
+        if found is None:
+            found = frozenset(self._matcher.find(key))
+            if len(self._name_cache) < 100_000:
+                self._name_cache[key] = found
+        return found
+
+    def _segment_sums(self, entries: np.ndarray) -> np.ndarray:
+        """Düz malzeme dizisiyle hizalı değerleri tarif başına topla"""
+        # Sona eklenen 0, son tarifin malzemesi yoksa da indeksin geçerli kalmasını sağlar;
+        # reduceat boş bölümlerde 0 yerine sonraki elemanı döndürdüğü için maskelenir
+        sums = np.add.reduceat(np.append(entries.astype(np.int32), 0), self._offsets)
+        return np.where(self._sizes > 0, sums, 0)
+
+    def rank(self, inventory_items: List[Dict], expiring_items: List[Dict],
+             k: int = 3) -> List[Tuple[Dict, List[Dict]]]:
+        """Yaklaşan ürün tariflerini (kind == "expiring") kapsama ve eldeki malzemelere göre sırala
+
+        Yalnızca tüm ana malzemeleri elde olan tarifler önerilir. Öncelik: kullanılan
+        farklı yaklaşan malzeme sayısı, malzemelerin elde bulunma oranı, eşitlikte
+        derlemdeki sıra (sonuç deterministiktir).
+        (tarif, tarifin kullandığı yaklaşan ürünler) çiftlerini döndürür.
+        """
+        if not self.recipes:
+            return []
+
+        available = self._staples.copy()
+        expiring = np.zeros(len(self._vocabulary), dtype=bool)
+        first_item: Dict[int, Dict] = {}
+        for item in inventory_items:
+            for name in self.match_ingredients(item.get('name', '')):
+                available[self._vocabulary[name]] = True
+        # expiring_items aciliyete göre sıralı gelir; her malzeme için en acil ürün tutulur
+        for item in expiring_items:
+            for name in self.match_ingredients(item.get('name', '')):
+                ingredient_id = self._vocabulary[name]
+                expiring[ingredient_id] = available[ingredient_id] = True
+                first_item.setdefault(ingredient_id, item)
+        if not first_item:
+            return []
+
+        entry_available = available[self._ingredients]
+        coverage = self._segment_sums(expiring[self._ingredients])
+        missing_main = self._segment_sums(self._is_main & ~entry_available)
+        availability = self._segment_sums(entry_available) / np.maximum(self._sizes, 1)
+
+        candidates = np.flatnonzero((coverage > 0) & (missing_main == 0) & self._is_expiring)
+        order = np.lexsort((candidates, -availability[candidates], -coverage[candidates]))
+        results = []
+        for index in candidates[order[:k]]:
+            start = self._offsets[index]
+            recipe_ids = self._ingredients[start:start + self._sizes[index]]
+            covered = [first_item[int(ingredient_id)] for ingredient_id in recipe_ids if expiring[ingredient_id]]
+            results.append((self.recipes[index], covered))
+        return results
+
+    def custom_recipe_for(self, selected_items: List[str]) -> Optional[Dict]:
+        """Seçilen malzemelerin tamamını karşılayan ilk özel tarif (derlemdeki sırayla)"""
+        available = set()
+        for name in selected_items:
+            available |= self.match_ingredients(name)
+
+        candidates = set()
+        for ingredient in available:
+            candidates.update(self._by_main.get(("custom", ingredient), ()))
+
+        for index in sorted(candidates):
+            recipe = self.recipes[index]
+            max_selected = recipe.get('max_selected')
+            if len(selected_items) < recipe.get('min_selected', 1):
+                continue
+            if max_selected is not None and len(selected_items) > max_selected:
+                continue
+            if available.issuperset(recipe['main']):
+                return recipe
+        return None
+
+
+def load_recipes(path: str = RECIPES_FILE) -> Dict:
+    """Tarif derlemini JSON dosyasından oku"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=4)
+def get_recipe_index(path: str = RECIPES_FILE) -> RecipeIndex:
+    """Derlemi bir kez yükleyip indeksle (süreç boyunca paylaşılır)"""
+    data = load_recipes(path)
+    return RecipeIndex(data['recipes'], data.get('staples', ()))
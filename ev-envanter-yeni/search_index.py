@@ -0,0 +1,118 @@
+# search_index.py - Türkçe harf kurallarına uygun, trigram tabanlı ürün arama indeksi
+import heapq
+import math
+from typing import Dict, List, Optional, Set
+
+from utils import turkish_casefold
+
+# Aksanlı harfleri sadeleştirme: "çorba" ile "corba", "göğüs" ile "gogus" eşleşir
+_FOLD_TABLE = str.maketrans("çğıöşüâîû", "cgiosuaiu")
+
+
+def search_key(text: str) -> str:
+    """Arama için normalize et: Türkçe küçük harf, aksansız, yalnızca harf/rakam ve tek boşluk"""
+    folded = turkish_casefold(text or "").translate(_FOLD_TABLE)
+    return " ".join("".join(char if char.isalnum() else " " for char in folded).split())
+
+
+def _trigrams(key: str, prefix: bool = False) -> Set[str]:
+    """Kelime başlarına iki boşluk eklenmiş trigramlar (kısa aramalar kelime başıyla eşleşir)
+
+    `prefix` True ise son kelimenin bitiş trigramı atlanır; yazılmakta olan
+    kelime ad içindeki daha uzun bir kelimenin başıyla eşleşebilir.
+    """
+    grams = set()
+    words = key.split()
+    for position, word in enumerate(words):
+        padded = "  " + word
+        if not (prefix and position == len(words) - 1):
+            padded += " "
+        for start in range(len(padded) - 2):
+            grams.add(padded[start:start + 3])
+    return grams
+
+
+class InventorySearchIndex:
+    """Bir kullanıcının ürün adları üzerinde trigram indeksi
+
+    Sonuçlar önce adın içinde aranan metni (kelime başından) tam geçirenler,
+    sonra aranan metnin trigramlarının en az `min_overlap` oranını içeren
+    adlar (yazım hataları) olacak şekilde sıralanır.
+    """
+
+    def __init__(self, min_overlap: float = 0.5):
+        self.min_overlap = min_overlap
+        self._keys: Dict[str, str] = {}
+        self._grams: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def ids(self) -> Set[str]:
+        return set(self._keys)
+
+    def add_item(self, item: Dict):
+        self.add(item['id'], item.get('name', ''))
+
+    def add(self, item_id: str, name: str):
+        if item_id in self._keys:
+            self.remove(item_id)
+        key = search_key(name)
+        grams = _trigrams(key)
+        self._keys[item_id] = key
+        self._grams[item_id] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(item_id)
+
+    def remove(self, item_id: str):
+        self._keys.pop(item_id, None)
+        for gram in self._grams.pop(item_id, ()):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(item_id)
+                if not posting:
+                    del self._postings[gram]
+
+    def search(self, text: str, limit: Optional[int] = None) -> List[str]:
+        """Aranan metne uyan ürün id'leri, en iyi eşleşme başta"""
+        query = search_key(text)
+        query_grams = _trigrams(query, prefix=True)
+        if not query_grams:
+            return []
+        postings = sorted((self._postings.get(gram, set()) for gram in query_grams), key=len)
+
+        # Tam eşleşme adayları tüm trigramları içermeli: en küçük listeden başlayarak kesiştir
+        exact = set(postings[0]).intersection(*postings[1:])
+        keys = self._keys
+        query_length = len(query)
+        scored = []
+        for item_id in exact:
+            key = keys[item_id]
+            if query in key:
+                # Adın başında geçenler ve kısa adlar önce
+                scored.append((-(2.0 + key.startswith(query) * 0.5 + query_length / len(key)), key, item_id))
+
+        # Çok kısa aramalarda yazım hatası toleransı anlamsız sonuç verir
+        if query_length >= 4 and (limit is None or len(scored) < limit):
+            # Bulanık eşleşme en az `need` trigram paylaşmalı; böyle bir ad en seyrek
+            # len - need + 1 trigramdan birini mutlaka içerir (yalnızca onlar taranır)
+            need = max(1, math.ceil(self.min_overlap * len(query_grams)))
+            candidates = set().union(*postings[:len(postings) - need + 1])
+            for item_id in candidates:
+                key = keys[item_id]
+                if item_id in exact and query in key:
+                    continue
+                grams = self._grams[item_id]
+                shared = len(query_grams & grams)
+                if shared < need:
+                    continue
+                # Paylaşılan oran, eşitlikte Jaccard benzerliği
+                score = shared / len(query_grams) + 0.1 * shared / (len(query_grams) + len(grams) - shared)
+                scored.append((-score, key, item_id))
+
+        if limit is not None:
+            scored = heapq.nsmallest(limit, scored)
+        else:
+            scored.sort()
+        return [item_id for _, _, item_id in scored]
@@ -0,0 +1,222 @@
+# test_ai_throttle.py - İstek birleştirme ve hız sınırlama testleri (sahte saat ile)
+import threading
+
+import pytest
+
+from ai_throttle import RequestThrottle, ThrottleError, TokenBucket
+
+
+class FakeClock:
+    """Yalnızca sleep çağrılarıyla ilerleyen saat"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeUpstream:
+    """Gemini akışı yerine geçen, serbest bırakılana kadar bekleyen sahte çağrı"""
+
+    def __init__(self, parts=("a", "b")):
+        self.parts = parts
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        assert self.release.wait(5)
+        yield from self.parts
+
+
+def make_throttle(clock, **kwargs):
+    options = dict(rate_per_minute=60, burst=5, max_queue=20, max_wait=30, max_concurrency=1)
+    options.update(kwargs)
+    return RequestThrottle(clock=clock, sleep=clock.sleep, **options)
+
+
+def test_token_bucket_waits_for_refill():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=0.5, capacity=2, clock=clock, sleep=clock.sleep)
+
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(2.0)
+    assert clock.sleeps == [pytest.approx(2.0)]
+
+
+def test_token_bucket_timeout():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=0.5, capacity=1, clock=clock, sleep=clock.sleep)
+    bucket.acquire()
+
+    with pytest.raises(ThrottleError):
+        bucket.acquire(timeout=1.0)
+    assert clock.sleeps == []
+
+
+def test_identical_requests_share_one_upstream_call():
+    clock = FakeClock()
+    throttle = make_throttle(clock)
+    upstream = FakeUpstream()
+    completed = []
+
+    first = throttle.stream("key", upstream, on_complete=completed.append)
+    second = throttle.stream("key", upstream, on_complete=completed.append)
+    upstream.release.set()
+
+    assert "".join(first) == "ab"
+    assert "".join(second) == "ab"
+    # Sonuç, aboneler akışın sonunu görmeden kaydedilir
+    assert completed == ["ab"]
+    assert upstream.calls == 1
+    stats = throttle.stats()
+    assert stats["upstream_calls"] == 1
+    assert stats["coalesced"] == 1
+
+
+def test_full_queue_is_rejected():
+    clock = FakeClock()
+    throttle = make_throttle(clock, max_queue=1)
+    running = FakeUpstream()
+    throttle.stream("running", running)
+    assert running.started.wait(5)
+
+    # Tek iş parçacığı meşgul: bu çağrı başlayana kadar kuyrukta sayılır
+    queued = FakeUpstream()
+    waiting = throttle.stream("waiting", queued)
+    assert throttle.stats()["queued"] == 1
+    with pytest.raises(ThrottleError):
+        throttle.stream("rejected", FakeUpstream())
+
+    running.release.set()
+    queued.release.set()
+    assert "".join(waiting) == "ab"
+    assert throttle.stats()["rejected"] == 1
+
+
+def test_request_waiting_for_a_worker_expires_after_max_wait():
+    clock = FakeClock()
+    throttle = make_throttle(clock, max_wait=10)
+    running = FakeUpstream()
+    throttle.stream("running", running)
+    assert running.started.wait(5)
+
+    late = FakeUpstream()
+    stream = throttle.stream("late", late)
+    clock.now += 11
+    running.release.set()
+
+    with pytest.raises(ThrottleError):
+        list(stream)
+    assert late.calls == 0
+    assert throttle.stats()["queued"] == 0
+
+
+def test_rate_limit_fails_fast_when_wait_exceeds_max_wait():
+    clock = FakeClock()
+    throttle = make_throttle(clock, rate_per_minute=1, burst=1, max_wait=10)
+    first = FakeUpstream()
+    throttle.stream("first", first)
+    assert first.started.wait(5)
+
+    # Sonraki jeton 60 saniye sonra: çağrı kuyruğa alınmadan reddedilir
+    with pytest.raises(ThrottleError):
+        throttle.stream("second", FakeUpstream())
+    first.release.set()
+    assert throttle.stats()["rejected"] == 1
+
+
+def test_abandoned_request_is_not_started():
+    clock = FakeClock()
+    throttle = make_throttle(clock)
+    running = FakeUpstream()
+    throttle.stream("running", running)
+    assert running.started.wait(5)
+
+    # Beklerken tüm aboneler ayrıldı: Gemini çağrılmaz, iş parçacığı hemen boşalır
+    skipped = FakeUpstream()
+    throttle.stream("skipped", skipped).close()
+    running.release.set()
+    after = FakeUpstream(parts=("c",))
+    after.release.set()
+    assert "".join(throttle.stream("after", after)) == "c"
+
+    assert skipped.calls == 0
+    assert throttle.stats()["abandoned"] == 1
+
+
+def test_stream_is_abandoned_only_after_last_subscriber_leaves():
+    clock = FakeClock()
+    throttle = make_throttle(clock)
+    closed = threading.Event()
+
+    def upstream():
+        try:
+            yield "a"
+            assert release.wait(5)
+            yield "b"
+            yield "c"
+        finally:
+            closed.set()
+
+    release = threading.Event()
+    first = throttle.stream("key", upstream)
+    second = throttle.stream("key", upstream)
+    assert first.wait_ready(5)
+    first.close()
+    assert not throttle._flights["key"].abandoned
+
+    second.close()
+    release.set()
+    assert closed.wait(5)
+    # Bırakılan akışın yerine aynı anahtarla yeni çağrı başlar
+    fresh = FakeUpstream(parts=("x",))
+    fresh.release.set()
+    assert "".join(throttle.stream("key", fresh)) == "x"
+    assert throttle.stats()["abandoned"] == 1
+
+
+def test_poll_returns_new_parts_without_blocking():
+    clock = FakeClock()
+    throttle = make_throttle(clock)
+    upstream = FakeUpstream()
+    stream = throttle.stream("key", upstream)
+
+    assert stream.poll() == ([], False)
+    upstream.release.set()
+    assert stream.wait_ready(5)
+    parts = []
+    while True:
+        new_parts, finished = stream.poll()
+        parts.extend(new_parts)
+        if finished:
+            break
+    assert parts == ["a", "b"]
+    assert stream.poll() == ([], True)
+
+
+def test_poll_raises_upstream_error_after_parts():
+    clock = FakeClock()
+    throttle = make_throttle(clock)
+
+    def failing():
+        yield "a"
+        raise RuntimeError("kesildi")
+
+    stream = throttle.stream("key", failing)
+    assert stream.wait_ready(5)
+    parts = []
+    with pytest.raises(RuntimeError):
+        for _ in range(1000):
+            parts.extend(stream.poll()[0])
+            threading.Event().wait(0.005)
+    assert parts == ["a"]
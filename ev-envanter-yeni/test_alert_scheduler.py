@@ -0,0 +1,111 @@
+# test_alert_scheduler.py - Günlük son kullanma uyarısı taraması testleri
+import json
+from datetime import date, datetime
+
+import pytest
+
+from alert_scheduler import JsonlAlertSink, SQLiteAlertOutbox, next_run_at, sweep
+
+TODAY = date(2026, 1, 1)
+DAY = TODAY.toordinal()
+
+
+def item(item_id, days, created_at=1.0):
+    return {'id': item_id, 'name': f"Ürün {item_id}", 'expiry_ordinal': DAY + days, 'created_at': created_at}
+
+
+class FakeSource:
+    """iter_expiring_items yerine geçer; istenen aralıkları kaydeder"""
+
+    def __init__(self, items, fail_after=None):
+        self.items = items
+        self.fail_after = fail_after
+        self.ranges = []
+
+    def __call__(self, expiry_from, expiry_to):
+        self.ranges.append((expiry_from, expiry_to))
+        for count, (user_id, entry) in enumerate(self.items):
+            if count == self.fail_after:
+                raise ConnectionError("bağlantı koptu")
+            if expiry_from <= entry['expiry_ordinal'] <= expiry_to:
+                yield user_id, entry
+
+
+def alert_ids(alerts):
+    return sorted(alert['alert_id'].split(":", 2)[1] + ":" + alert['level'] for alert in alerts)
+
+
+def test_first_sweep_alerts_only_critical_window(tmp_path):
+    source = FakeSource([("u1", item("a", 0)), ("u1", item("b", 3)), ("u2", item("c", 4))])
+    outbox = SQLiteAlertOutbox(str(tmp_path / "outbox.db"))
+
+    counts = sweep(source, outbox, str(tmp_path / "state.json"), today=TODAY, clock=lambda: 10.0)
+
+    assert source.ranges == [(DAY, DAY + 3)]
+    assert counts == {'scanned': 2, 'critical': 2, 'expired': 0, 'written': 2}
+    assert alert_ids(outbox.pending()) == ["a:critical", "b:critical"]
+
+
+def test_rerun_on_the_same_day_writes_nothing(tmp_path):
+    source = FakeSource([("u1", item("a", 1)), ("u1", item("b", 2))])
+    outbox = SQLiteAlertOutbox(str(tmp_path / "outbox.db"))
+    state_file = str(tmp_path / "state.json")
+    sweep(source, outbox, state_file, today=TODAY, clock=lambda: 10.0)
+
+    counts = sweep(source, outbox, state_file, today=TODAY, clock=lambda: 20.0)
+
+    assert counts['critical'] == counts['written'] == 0
+    assert len(outbox.pending()) == 2
+
+
+def test_missed_days_are_caught_up_from_last_sweep(tmp_path):
+    source = FakeSource([
+        ("u1", item("a", 1)),  # ilk taramada kritikti, sonra süresi geçti
+        ("u1", item("b", 2)),  # hâlâ kritik, uyarısı verildi
+        ("u1", item("c", 5)),  # aradaki günlerde kritik pencereye girdi
+        ("u2", item("e", 9)),  # henüz pencere dışında
+    ])
+    outbox = SQLiteAlertOutbox(str(tmp_path / "outbox.db"))
+    state_file = str(tmp_path / "state.json")
+    sweep(source, outbox, state_file, today=TODAY, clock=lambda: 10.0)
+    outbox.mark_delivered(alert['alert_id'] for alert in outbox.pending())
+    # Son taramadan sonra eklendi
+    source.items.append(("u2", item("d", 2, created_at=15.0)))
+
+    counts = sweep(source, outbox, state_file, today=date(2026, 1, 3), clock=lambda: 20.0)
+
+    assert source.ranges[-1] == (DAY, DAY + 2 + 3)
+    assert counts == {'scanned': 4, 'critical': 2, 'expired': 1, 'written': 3}
+    assert alert_ids(outbox.pending()) == ["a:expired", "c:critical", "d:critical"]
+
+
+def test_interrupted_sweep_is_repeated_without_duplicate_alerts(tmp_path):
+    entries = [("u1", item("a", 0)), ("u1", item("b", 1)), ("u1", item("c", 2))]
+    outbox = SQLiteAlertOutbox(str(tmp_path / "outbox.db"))
+    state_file = str(tmp_path / "state.json")
+
+    with pytest.raises(ConnectionError):
+        sweep(FakeSource(entries, fail_after=2), outbox, state_file, today=TODAY, batch_size=1, clock=lambda: 10.0)
+    assert len(outbox.pending()) == 2
+
+    # Durum ilerlemediği için aynı aralık yeniden taranır; outbox yazılmış uyarıları yok sayar
+    counts = sweep(FakeSource(entries), outbox, state_file, today=TODAY, batch_size=1, clock=lambda: 20.0)
+    assert counts['critical'] == 3 and counts['written'] == 1
+    assert alert_ids(outbox.pending()) == ["a:critical", "b:critical", "c:critical"]
+
+
+def test_jsonl_sink_appends_one_alert_per_line(tmp_path):
+    path = tmp_path / "alerts.jsonl"
+    source = FakeSource([("u1", item("a", 0)), ("u1", item("b", 1))])
+
+    counts = sweep(source, JsonlAlertSink(str(path)), str(tmp_path / "state.json"), today=TODAY)
+
+    alerts = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert counts['written'] == 2
+    assert alert_ids(alerts) == ["a:critical", "b:critical"]
+    assert alerts[0]['name'] == "Ürün a"
+
+
+def test_next_run_is_today_or_tomorrow():
+    assert next_run_at(datetime(2026, 1, 1, 6, 30), 7) == datetime(2026, 1, 1, 7)
+    assert next_run_at(datetime(2026, 1, 1, 7, 0), 7) == datetime(2026, 1, 2, 7)
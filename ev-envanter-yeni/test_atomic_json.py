@@ -0,0 +1,125 @@
+# test_atomic_json.py - Atomik JSON dosyası yazma testleri
+import threading
+
+import pytest
+
+from atomic_json import AtomicJsonFile
+
+
+def test_failed_write_leaves_no_partial_change(tmp_path):
+    store = AtomicJsonFile(str(tmp_path / "data.json"))
+    store.update(lambda data: data.update({"items": {"a": 1}}))
+
+    def broken(data):
+        data["items"]["b"] = 2
+        raise RuntimeError("yarıda kaldı")
+
+    try:
+        store.update(broken)
+    except RuntimeError:
+        pass
+    assert store.read() == {"items": {"a": 1}}
+
+
+def test_failed_write_does_not_affect_batched_writes(tmp_path):
+    store = AtomicJsonFile(str(tmp_path / "data.json"), group_commit_window=0.05)
+    results = {}
+
+    def add(key):
+        def fn(data):
+            data[key] = True
+            return key
+        return fn
+
+    def broken(data):
+        data["broken"] = True
+        raise RuntimeError("yarıda kaldı")
+
+    def run(name, fn):
+        try:
+            results[name] = store.update(fn)
+        except RuntimeError as e:
+            results[name] = e
+
+    threads = [threading.Thread(target=run, args=(name, fn))
+               for name, fn in [("a", add("a")), ("broken", broken), ("b", add("b"))]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results["a"] == "a" and results["b"] == "b"
+    assert isinstance(results["broken"], RuntimeError)
+    assert store.read() == {"a": True, "b": True}
+
+
+def test_concurrent_writes_are_group_committed_without_loss(tmp_path):
+    store = AtomicJsonFile(str(tmp_path / "data.json"), group_commit_window=0.02)
+
+    def add(n):
+        store.update(lambda data: data.setdefault("items", []).append(n))
+
+    threads = [threading.Thread(target=add, args=(n,)) for n in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(store.read()["items"]) == list(range(20))
+    assert store.writes == 20
+    assert store.commits < 20
+
+
+def test_separate_handles_on_one_file_do_not_lose_updates(tmp_path):
+    # Aynı dosyayı açan iki nesne, iki ayrı süreç gibi yalnızca dosya kilidini paylaşır
+    path = str(tmp_path / "data.json")
+    handles = [AtomicJsonFile(path), AtomicJsonFile(path)]
+
+    def increment(handle):
+        for _ in range(25):
+            handle.update(lambda data: data.update({"count": data.get("count", 0) + 1}))
+
+    threads = [threading.Thread(target=increment, args=(handle,)) for handle in handles]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert handles[0].read() == {"count": 50}
+
+
+def test_corrupt_file_is_not_overwritten(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text("{bozuk", encoding='utf-8')
+    store = AtomicJsonFile(str(path))
+
+    with pytest.raises(ValueError):
+        store.read()
+    with pytest.raises(ValueError):
+        store.update(lambda data: data.update({"a": 1}))
+    assert path.read_text(encoding='utf-8') == "{bozuk"
+
+
+def test_on_commit_sees_committed_data_and_its_errors_are_ignored(tmp_path):
+    seen = []
+
+    def on_commit(data):
+        seen.append(dict(data))
+        raise OSError("yan dosya yazılamadı")
+
+    store = AtomicJsonFile(str(tmp_path / "data.json"), on_commit=on_commit)
+
+    assert store.update(lambda data: data.update({"a": 1}) or "ok") == "ok"
+    assert seen == [{"a": 1}]
+    assert store.read() == {"a": 1}
+
+
+def test_only_failed_write_does_not_rewrite_the_file(tmp_path):
+    seen = []
+    store = AtomicJsonFile(str(tmp_path / "data.json"), on_commit=seen.append)
+    store.update(lambda data: data.update({"a": 1}))
+
+    with pytest.raises(KeyError):
+        store.update(lambda data: data["yok"])
+    assert store.commits == 1
+    assert len(seen) == 1
@@ -0,0 +1,64 @@
+# test_expiry_index.py - Son kullanma günü indeksi testleri (aralıklar, ekleme/silme)
+from expiry_index import ExpiryIndex
+from local_store import query_items
+
+
+def make_items():
+    return [
+        {'id': "a", 'name': "Süt", 'expiry_ordinal': 739619},
+        {'id': "b", 'name': "Yumurta", 'expiry_ordinal': 739617},
+        {'id': "c", 'name': "Pirinç", 'expiry_ordinal': None},
+        {'id': "d", 'name': "Peynir", 'expiry_ordinal': 739626},
+        {'id': "e", 'name': "Ayran", 'expiry_ordinal': 739619},
+    ]
+
+
+def make_index(items):
+    index = ExpiryIndex()
+    for item in items:
+        index.add_item(item)
+    return index
+
+
+def test_window_bounds_are_inclusive_and_sorted_by_day():
+    index = make_index(make_items())
+
+    assert [item['id'] for item in index.window(739617, 739619)] == ["b", "a", "e"]
+    assert [item['id'] for item in index.window(739619, 739619)] == ["a", "e"]
+    assert [item['id'] for item in index.window(739620, 739625)] == []
+    assert [item['id'] for item in index.window(739626)] == ["d"]
+    assert [item['id'] for item in index.window(end=739618)] == ["b"]
+    # Tarihsiz ürünler sınırsız aralıkta da yer almaz
+    assert [item['id'] for item in index.window()] == ["b", "a", "e", "d"]
+
+
+def test_window_matches_query_items():
+    items = make_items()
+    index = make_index(items)
+
+    for start, end in [(None, None), (739618, None), (None, 739619), (739617, 739626), (739627, 739700)]:
+        expected = query_items(items, expiry_from=start, expiry_to=end)[0]
+        if start is None and end is None:
+            expected = [item for item in expected if item['expiry_ordinal'] is not None]
+        assert index.window(start, end) == expected
+
+
+def test_updates_and_removals_move_items():
+    index = make_index(make_items())
+
+    index.add_item({'id': "a", 'name': "Süt", 'expiry_ordinal': 739630})
+    index.add_item({'id': "d", 'name': "Peynir", 'expiry_ordinal': None})
+    index.remove("e")
+    index.remove("yok")
+
+    assert [item['id'] for item in index.window(739617, 739626)] == ["b"]
+    assert [item['id'] for item in index.window(739627)] == ["a"]
+    assert len(index) == 4 and index.ids() == {"a", "b", "c", "d"}
+
+
+def test_window_returns_copies():
+    index = make_index(make_items())
+
+    index.window(739617, 739617)[0]['days_left'] = 0
+
+    assert 'days_left' not in index.window(739617, 739617)[0]
@@ -0,0 +1,83 @@
+# test_inventory_cache.py - Envanter önbelleği testleri (sürüm, LRU, TTL)
+import inventory_cache
+from inventory_cache import InventoryCache, _estimate_size
+
+
+def make_items(prefix, count=3):
+    return [{'id': f"{prefix}{n}", 'name': f"Ürün {n}", 'quantity': n} for n in range(count)]
+
+
+def test_put_is_skipped_when_a_write_happened_during_the_read():
+    cache = InventoryCache()
+    version = cache.version("u")
+    # Depo okunurken başka oturum ürün ekledi
+    cache.apply_add("u", [{'id': "new", 'name': "Yeni"}])
+    cache.put("u", make_items("a"), version)
+
+    assert cache.get("u") is None
+    cache.put("u", make_items("a"), cache.version("u"))
+    assert [item['id'] for item in cache.get("u")] == ["a0", "a1", "a2"]
+
+
+def test_writes_update_cached_inventory_and_returned_items_are_copies():
+    cache = InventoryCache()
+    cache.put("u", make_items("a"), cache.version("u"))
+
+    cache.apply_add("u", [{'id': "b0", 'name': "Yeni"}, {'id': "a1", 'name': "Değişti"}])
+    cache.apply_remove("u", ["a0", "yok"])
+    items = cache.get("u")
+    assert {item['id']: item['name'] for item in items} == {"a1": "Değişti", "a2": "Ürün 2", "b0": "Yeni"}
+
+    items[0]['days_left'] = 3
+    assert all('days_left' not in item for item in cache.get("u"))
+    assert cache.stats()['bytes'] == sum(_estimate_size(item) for item in cache.get("u"))
+
+
+def test_least_recently_used_user_is_evicted_over_the_memory_limit():
+    items = make_items("a")
+    size = sum(_estimate_size(item) for item in items)
+    cache = InventoryCache(max_bytes=size * 2)
+    for user_id in ("u1", "u2"):
+        cache.put(user_id, items, cache.version(user_id))
+    cache.get("u1")
+
+    cache.put("u3", items, cache.version("u3"))
+
+    assert cache.get("u2") is None
+    assert cache.get("u1") is not None and cache.get("u3") is not None
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entry_larger_than_the_limit_is_not_cached():
+    cache = InventoryCache(max_bytes=10)
+    cache.put("u", make_items("a"), cache.version("u"))
+
+    assert cache.get("u") is None
+    assert cache.stats()['bytes'] == 0
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(inventory_cache.time, "time", lambda: now[0])
+    cache = InventoryCache(ttl_seconds=60)
+    cache.put("u", make_items("a"), cache.version("u"))
+
+    now[0] += 59
+    assert cache.is_fresh("u")
+    assert cache.select("u", lambda items: (items[:1], None)) is not None
+    now[0] += 2
+    assert not cache.is_fresh("u")
+    assert cache.select("u", lambda items: (items, None)) is None
+    assert cache.get("u") is None
+    assert cache.stats()['users'] == 0
+
+
+def test_invalidate_drops_entry_and_stale_reads():
+    cache = InventoryCache()
+    version = cache.version("u")
+    cache.put("u", make_items("a"), version)
+
+    cache.invalidate("u")
+    cache.put("u", make_items("a"), version)
+
+    assert cache.get("u") is None
@@ -0,0 +1,143 @@
+# test_inventory_mirror.py - Anlık dinleyici aynası testleri (bellek içi sahte sorgu ile)
+from types import SimpleNamespace
+
+from inventory_mirror import InventoryMirror
+
+
+class FakeDoc:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeWatch:
+    def __init__(self, query):
+        self.query = query
+        self.is_active = True
+
+    def unsubscribe(self):
+        self.is_active = False
+        self.query.watch = None
+
+
+class FakeQuery:
+    """on_snapshot'a bağlanınca ilk görüntüyü gönderen, sonra olayları elle üreten sahte sorgu"""
+
+    def __init__(self, docs):
+        self.docs = dict(docs)
+        self.callback = None
+        self.watch = None
+        self.attached = 0
+
+    def on_snapshot(self, callback):
+        self.callback = callback
+        self.attached += 1
+        self.watch = FakeWatch(self)
+        self._emit([("ADDED", doc_id) for doc_id in self.docs])
+        return self.watch
+
+    def change(self, kind, doc_id, data=None):
+        if kind == "REMOVED":
+            self.docs.pop(doc_id)
+        else:
+            self.docs[doc_id] = data
+        if self.watch is not None:
+            self._emit([(kind, doc_id)])
+
+    def _emit(self, events):
+        changes = [SimpleNamespace(type=SimpleNamespace(name=kind),
+                                   document=FakeDoc(doc_id, self.docs.get(doc_id, {})))
+                   for kind, doc_id in events]
+        self.callback([], changes, None)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def to_item(doc):
+    return dict(doc.to_dict(), id=doc.id)
+
+
+def make_mirror(query, clock, changes):
+    return InventoryMirror(lambda user_id: query, to_item, idle_seconds=60, ready_timeout=1,
+                           on_change=lambda *args: changes.append(args), clock=clock)
+
+
+def names(items):
+    return sorted(item['name'] for item in items)
+
+
+def test_first_snapshot_loads_items_and_reports_reset():
+    query = FakeQuery({"a": {'name': "Süt"}, "b": {'name': "Yumurta"}})
+    changes = []
+    mirror = make_mirror(query, FakeClock(), changes)
+
+    assert not mirror.ready("u")
+    assert names(mirror.get("u")) == ["Süt", "Yumurta"]
+    assert mirror.ready("u")
+    assert len(changes) == 1
+    user_id, upserted, removed, reset = changes[0]
+    assert (user_id, names(upserted), removed, reset) == ("u", ["Süt", "Yumurta"], [], True)
+
+
+def test_change_events_update_the_mirror():
+    query = FakeQuery({"a": {'name': "Süt"}})
+    changes = []
+    mirror = make_mirror(query, FakeClock(), changes)
+    mirror.get("u")
+
+    query.change("ADDED", "b", {'name': "Peynir"})
+    query.change("MODIFIED", "a", {'name': "Süt (açık)"})
+    query.change("REMOVED", "b")
+
+    assert names(mirror.get("u")) == ["Süt (açık)"]
+    assert [(names(upserted), removed, reset) for _, upserted, removed, reset in changes[1:]] == [
+        (["Peynir"], [], False),
+        (["Süt (açık)"], [], False),
+        ([], ["b"], False),
+    ]
+    assert query.attached == 1
+    assert mirror.stats()['snapshots'] == 4
+
+
+def test_idle_listener_is_detached_and_reattached_with_reset():
+    query = FakeQuery({"a": {'name': "Süt"}})
+    clock = FakeClock()
+    changes = []
+    mirror = make_mirror(query, clock, changes)
+    mirror.get("u")
+
+    clock.now += 61
+    mirror.detach_idle()
+    assert query.watch is None
+    assert not mirror.ready("u")
+    assert mirror.stats() == {'listeners': 0, 'items': 0, 'snapshots': 1, 'detached': 1}
+
+    # Ayrıkken yapılan silme olay olarak gelmez; yeniden bağlanınca reset bildirilir
+    query.change("REMOVED", "a")
+    query.change("ADDED", "c", {'name': "Ayran"})
+    assert names(mirror.get("u")) == ["Ayran"]
+    assert query.attached == 2
+    assert changes[-1][3] is True
+
+
+def test_reads_keep_listener_attached():
+    query = FakeQuery({"a": {'name': "Süt"}})
+    clock = FakeClock()
+    mirror = make_mirror(query, clock, [])
+    mirror.get("u")
+
+    for _ in range(3):
+        clock.now += 40
+        assert mirror.ready("u")
+        mirror.detach_idle()
+    assert query.attached == 1
+    assert mirror.stats()['detached'] == 0
@@ -0,0 +1,189 @@
+# test_local_store.py - Yerel depo (SQLite, parçalı JSON) testleri
+import json
+import os
+import sqlite3
+
+from inventory_stats import build_stats
+from local_store import ShardedJsonStore, SQLiteStore, query_items
+
+
+def make_items():
+    return [
+        {'name': "Süt", 'category': "Süt Ürünleri", 'quantity': 2, 'unit': "litre",
+         'expiry_date': "2026-01-03", 'expiry_ordinal': 739619, 'created_at': 3.0},
+        {'name': "Yumurta", 'category': "Protein", 'quantity': 12, 'unit': "adet",
+         'expiry_date': "2026-01-01", 'expiry_ordinal': 739617, 'created_at': 1.0},
+        {'name': "Pirinç", 'category': "Tahıl", 'quantity': 1.5, 'unit': "kg",
+         'expiry_date': "", 'expiry_ordinal': None, 'created_at': 2.0},
+        {'name': "Peynir", 'category': "Süt Ürünleri", 'quantity': 1, 'unit': "kg",
+         'expiry_date': "2026-01-10", 'expiry_ordinal': 739626, 'created_at': 4.0, 'brand': "Köy"},
+    ]
+
+
+def test_sqlite_round_trip_keeps_item_fields(tmp_path):
+    store = SQLiteStore(str(tmp_path / "db.sqlite"))
+    item_ids = store.add_items("u1", make_items())
+
+    items = {item['id']: item for item in store.get_inventory("u1")}
+    assert set(items) == set(item_ids)
+    cheese = items[item_ids[3]]
+    assert cheese['brand'] == "Köy"
+    assert cheese['quantity'] == 1 and isinstance(cheese['quantity'], int)
+    assert items[item_ids[2]]['quantity'] == 1.5
+    assert 'expiry_ordinal' not in items[item_ids[2]]
+    assert store.get_inventory("u2") == []
+
+
+def test_sqlite_queries_match_in_memory_filters(tmp_path):
+    store = SQLiteStore(str(tmp_path / "db.sqlite"))
+    store.add_items("u1", make_items())
+    store.add_items("u2", make_items())
+    everything = store.get_inventory("u1")
+
+    for filters in [dict(), dict(category="Süt Ürünleri"), dict(expiry_from=739618),
+                    dict(expiry_to=739620), dict(order_by="created_at", descending=True),
+                    dict(order_by="name")]:
+        expected = [item['id'] for item in query_items(everything, **filters)[0]]
+        assert [item['id'] for item in store.query_inventory("u1", **filters)[0]] == expected
+
+
+def test_sqlite_pages_cover_every_item_once(tmp_path):
+    store = SQLiteStore(str(tmp_path / "db.sqlite"))
+    store.add_items("u1", make_items() * 3)
+
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = store.query_inventory("u1", limit=5, start_after=cursor)
+        seen.extend(item['id'] for item in page)
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted(item['id'] for item in store.get_inventory("u1"))
+    assert len(seen) == len(set(seen)) == 12
+
+
+def test_sqlite_delete_only_removes_own_items(tmp_path):
+    store = SQLiteStore(str(tmp_path / "db.sqlite"))
+    own = store.add_items("u1", make_items())
+    other = store.add_items("u2", make_items())
+
+    assert store.delete_items("u1", [own[0], other[0], "yok"]) == [own[0]]
+    assert len(store.get_inventory("u1")) == 3
+    assert len(store.get_inventory("u2")) == 4
+    assert not store.delete_item("u1", own[0])
+
+
+def test_sqlite_stats_follow_writes_after_rebuild(tmp_path):
+    store = SQLiteStore(str(tmp_path / "db.sqlite"))
+    item_ids = store.add_items("u1", make_items())
+    # Kayıt yokken yazmalar özet oluşturmaz; ilk okumada hesaplanır
+    assert store.get_stats("u1") is None
+
+    store.rebuild_stats(["u1"])
+    store.delete_items("u1", item_ids[:2])
+    store.add_item("u1", {'name': "Ayran", 'category': "İçecek", 'quantity': 1, 'unit': "adet",
+                          'expiry_date': "2026-01-02", 'expiry_ordinal': 739618, 'created_at': 5.0})
+    assert store.get_stats("u1") == build_stats(store.get_inventory("u1"))
+
+
+def test_sqlite_imports_json_database_on_first_open(tmp_path):
+    legacy = tmp_path / "inventory_database.json"
+    legacy.write_text(json.dumps({
+        'users': {"a@a.com": {'password': "x", 'uid': "u1"}},
+        'inventory': {"u1": {"item_1": {'name': "Süt", 'expiry_date': "2026-01-03", 'quantity': 2}}},
+    }), encoding='utf-8')
+
+    store = SQLiteStore(str(tmp_path / "db.sqlite"), json_file=str(legacy))
+
+    assert store.get_user("a@a.com") == {'password': "x", 'uid': "u1"}
+    [item] = store.get_inventory("u1")
+    assert (item['id'], item['expiry_ordinal'], item['created_at']) == ("item_1", 739619, 0.0)
+
+
+def test_sqlite_upgrades_database_without_expiry_ordinal(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE users (email TEXT PRIMARY KEY, password TEXT NOT NULL, uid TEXT NOT NULL UNIQUE);
+        CREATE TABLE inventory (id TEXT PRIMARY KEY, user_id TEXT NOT NULL, name TEXT, category TEXT,
+            quantity REAL, unit TEXT, expiry_date TEXT, location TEXT, notes TEXT, created_at TEXT, extra TEXT);
+        INSERT INTO users VALUES ('a@a.com', 'x', 'u1');
+        INSERT INTO inventory (id, user_id, name, expiry_date) VALUES ('item_1', 'u1', 'Süt', '2026-01-03');
+    """)
+    conn.close()
+
+    store = SQLiteStore(path)
+
+    assert [item['id'] for item in store.query_inventory("u1", expiry_from=739619, expiry_to=739619)[0]] == ["item_1"]
+
+
+def test_sharded_splits_legacy_json_on_first_open(tmp_path):
+    legacy = tmp_path / "inventory_database.json"
+    legacy.write_text(json.dumps({
+        'users': {"a@a.com": {'password': "x", 'uid': "u1"}},
+        'inventory': {"u1": {"item_1": {'name': "Süt", 'expiry_date': "2026-01-03"}},
+                      "u/2": {"item_2": {'name': "Un"}}},
+    }), encoding='utf-8')
+    data_dir = str(tmp_path / "data")
+
+    store = ShardedJsonStore(data_dir, legacy_file=str(legacy))
+
+    assert store.get_user("a@a.com") == {'password': "x", 'uid': "u1"}
+    assert sorted(store.iter_user_ids()) == ["u/2", "u1"]
+    [item] = store.get_inventory("u1")
+    assert (item['id'], item['expiry_ordinal']) == ("item_1", 739619)
+    # Taşıma bir kez yapılır; sonraki açılışta eski dosya yeniden okunmaz
+    legacy.write_text("{}", encoding='utf-8')
+    assert [item['id'] for item in ShardedJsonStore(data_dir, legacy_file=str(legacy)).get_inventory("u/2")] \
+        == ["item_2"]
+
+
+def test_sharded_write_only_touches_own_file(tmp_path):
+    store = ShardedJsonStore(str(tmp_path / "data"))
+    store.add_items("u1", make_items())
+    store.add_items("u2", make_items())
+    other_file = store._shard("u2").path
+    before = os.stat(other_file).st_mtime_ns
+
+    item_ids = [item['id'] for item in store.get_inventory("u1")]
+    assert store.delete_items("u1", item_ids[:1] + ["yok"]) == item_ids[:1]
+    store.add_item("u1", make_items()[0])
+
+    assert os.stat(other_file).st_mtime_ns == before
+    assert len(store.get_inventory("u1")) == 4
+    assert len(store.get_inventory("u2")) == 4
+
+
+def test_sharded_queries_and_expiring_scan(tmp_path):
+    store = ShardedJsonStore(str(tmp_path / "data"))
+    store.add_items("u1", make_items())
+    store.add_items("u2", make_items()[:2])
+
+    names = [item['name'] for item in store.query_inventory("u1", category="Süt Ürünleri")[0]]
+    assert names == ["Süt", "Peynir"]
+    expiring = sorted((user_id, item['name']) for user_id, item in store.iter_expiring_items(739617, 739619))
+    assert expiring == [("u1", "Süt"), ("u1", "Yumurta"), ("u2", "Süt"), ("u2", "Yumurta")]
+
+
+def test_sharded_stats_sidecar_tracks_writes(tmp_path):
+    store = ShardedJsonStore(str(tmp_path / "data"))
+    store.add_items("u1", make_items())
+
+    assert store.get_stats("u1") == build_stats(store.get_inventory("u1"))
+    assert os.path.exists(store._stats_file("u1").path)
+    store.delete_items("u1", [store.get_inventory("u1")[0]['id']])
+    assert store.get_stats("u1") == build_stats(store.get_inventory("u1"))
+
+
+def test_sharded_open_files_are_bounded(tmp_path):
+    store = ShardedJsonStore(str(tmp_path / "data"), max_open_shards=2)
+    for n in range(5):
+        store.add_items(f"u{n}", make_items()[:n + 1])
+
+    assert len(store._shards) == 2
+    assert sum(1 for _ in store.iter_expiring_items()) == 1 + 2 + 2 + 3 + 3
+    assert len(store._shards) == 2
+    # Çıkarılan kullanıcının dosyasına yeniden yazılabilir
+    store.add_item("u0", make_items()[1])
+    assert len(store.get_inventory("u0")) == 2
+    assert store.get_stats("u0") == build_stats(store.get_inventory("u0"))
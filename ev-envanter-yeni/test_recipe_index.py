@@ -0,0 +1,45 @@
+# test_recipe_index.py - Yerel tarif derlemi sıralama testleri
+from recipe_index import RECIPES_FILE, RecipeIndex, load_recipes
+
+
+def make_index() -> RecipeIndex:
+    data = load_recipes(RECIPES_FILE)
+    return RecipeIndex(data['recipes'], data.get('staples', ()))
+
+
+def test_rank_never_returns_custom_recipes():
+    index = make_index()
+    items = [{'name': name} for name in ["yumurta", "domates", "biber", "soğan", "süt", "un"]]
+
+    ranked = index.rank(items, items, k=len(index))
+
+    assert ranked
+    assert all(recipe['kind'] == "expiring" for recipe, _ in ranked)
+
+
+def test_rank_only_custom_matches_returns_nothing():
+    recipes = [
+        {'kind': "custom", 'main': ["yumurta"], 'title': "Özel"},
+        {'kind': "expiring", 'main': ["domates"], 'title': "Yaklaşan"},
+    ]
+    index = RecipeIndex(recipes)
+
+    assert index.rank([{'name': "yumurta"}], [{'name': "yumurta"}]) == []
+    assert [recipe['title'] for recipe, _ in index.rank([], [{'name': "domates"}])] == ["Yaklaşan"]
+
+
+def test_rank_skips_recipes_whose_main_ingredient_is_missing():
+    index = make_index()
+
+    # Yalnızca süt var: omlet (yumurta) ve domates çorbası önerilmez
+    ranked = index.rank([{'name': "Süt"}], [{'name': "Süt"}], k=len(index))
+    assert [recipe['main'] for recipe, _ in ranked] == [["süt"]]
+
+    # Tavuk olmadan tavuk sote önerilmez
+    ranked = index.rank([{'name': "Domates"}], [{'name': "Domates"}], k=len(index))
+    assert ranked
+    assert all(recipe['main'] == ["domates"] for recipe, _ in ranked)
+
+    # Ana malzeme elde varsa yaklaşan ürün yan malzeme olarak kullanılabilir
+    ranked = index.rank([{'name': "Yumurta"}, {'name': "Süt"}], [{'name': "Süt"}], k=len(index))
+    assert any(recipe['main'] == ["yumurta"] for recipe, _ in ranked)
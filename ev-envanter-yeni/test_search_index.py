@@ -0,0 +1,53 @@
+# test_search_index.py - Ürün arama indeksi testleri (Türkçe harfler, önek, yazım hatası)
+from search_index import InventorySearchIndex, search_key
+
+
+def make_index(names):
+    index = InventorySearchIndex()
+    for n, name in enumerate(names):
+        index.add(f"i{n}", name)
+    return index
+
+
+def test_search_key_folds_turkish_letters_and_punctuation():
+    assert search_key("Süt") == "sut"
+    assert search_key("Tavuk Göğsü (kemiksiz)") == "tavuk gogsu kemiksiz"
+    # Türkçe büyük harf kuralları: İ -> i, I -> ı -> i
+    assert search_key("İNCİR") == "incir"
+    assert search_key("IŞIK") == "isik"
+
+
+def test_unaccented_query_finds_accented_names():
+    index = make_index(["Süt", "Tavuk göğsü", "Çorba", "Un"])
+
+    assert index.search("sut") == ["i0"]
+    assert index.search("SÜT") == ["i0"]
+    assert index.search("gogus") == ["i1"]
+    assert index.search("corb") == ["i2"]
+
+
+def test_prefix_matches_rank_before_inner_matches():
+    index = make_index(["Beyaz peynir", "Peynir", "Peynirli poğaça", "Süt"])
+
+    assert index.search("peyn") == ["i1", "i2", "i0"]
+    assert index.search("peyn", limit=1) == ["i1"]
+
+
+def test_typo_is_tolerated_only_for_longer_queries():
+    index = make_index(["Beyaz peynir", "Pirinç", "Pide"])
+
+    assert index.search("peynr") == ["i0"]
+    assert index.search("pdi") == []
+
+
+def test_removed_and_renamed_items_leave_the_index():
+    index = make_index(["Süt", "Ayran"])
+
+    index.remove("i0")
+    index.add("i1", "Kefir")
+    index.remove("yok")
+
+    assert index.search("sut") == []
+    assert index.search("ayran") == []
+    assert index.search("kefir") == ["i1"]
+    assert len(index) == 1 and index.ids() == {"i1"}
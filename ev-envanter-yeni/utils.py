@@ -1,17 +1,34 @@
 # utils.py
-from datetime import datetime, timedelta
-from typing import List, Dict, Tuple
+from datetime import date, datetime, timedelta
+from typing import Any, IO, Iterator, List, Dict, Optional, Tuple
+import csv
+import html
+import io
+import json
+import math
+import os
 import streamlit as st
+from expiry_engine import NO_EXPIRY_DAYS, analyze_inventory
+
+
+def get_setting(name: str, default: Any = None) -> Any:
+    """Ayarı önce Streamlit secrets'tan, yoksa ortam değişkeninden oku"""
+    try:
+        if name in st.secrets:
+            return st.secrets[name]
+    except Exception:
+        # secrets.toml yoksa Streamlit hata fırlatabilir
+        pass
+    return os.environ.get(name, default)
 
 
 def days_until_expiry(expiry_date_str: str) -> int:
-    """Son kullanma tarihine kaç gün kaldığını hesapla"""
+    """Son kullanma tarihine kaç gün kaldığını hesapla (bugün = 0)"""
     try:
-        expiry_date = datetime.strptime(expiry_date_str, '%Y-%m-%d')
-        today = datetime.now()
-        return (expiry_date - today).days
+        expiry_date = datetime.strptime(expiry_date_str, '%Y-%m-%d').date()
+        return (expiry_date - date.today()).days
     except:
-        return 999
+        return NO_EXPIRY_DAYS
 
 
 def get_expiry_status(days_left: int) -> Tuple[str, str, str]:
@@ -41,55 +58,30 @@ def calculate_inventory_stats(inventory: List[Dict]) -> Dict:
             'categories': {}
         }
 
-    total_items = len(inventory)
-    expiring_soon = 0
-    expired = 0
-    low_stock = 0
-    categories = {}
-
-    for item in inventory:
-        # Kategori sayısı
-        category = item.get('category', 'Diğer')
-        categories[category] = categories.get(category, 0) + 1
-
-        # Son kullanma tarihi kontrolü
-        expiry_date = item.get('expiry_date', '')
-        if expiry_date:
-            days_left = days_until_expiry(expiry_date)
-            if days_left < 0:
-                expired += 1
-            elif days_left <= 7:
-                expiring_soon += 1
-
-        # Stok kontrolü
-        quantity = item.get('quantity', 0)
-        if quantity <= 5:
-            low_stock += 1
-
-    return {
-        'total_items': total_items,
-        'expiring_soon': expiring_soon,
-        'expired': expired,
-        'low_stock': low_stock,
-        'categories': categories
-    }
+    return analyze_inventory(inventory).stats()
 
 
 def get_expiring_items(inventory: List[Dict], days_threshold: int = 7) -> List[Dict]:
     """Belirtilen gün içinde son kullanma tarihi gelecek ürünleri getir"""
+    analysis = analyze_inventory(inventory)
+
+    # Gün sayısına göre sıralı
     expiring_items = []
+    for index in analysis.window_indices(0, days_threshold):
+        item = inventory[index]
+        item['days_left'] = int(analysis.days_left[index])
+        expiring_items.append(item)
+    return expiring_items
 
-    for item in inventory:
-        expiry_date = item.get('expiry_date', '')
-        if expiry_date:
-            days_left = days_until_expiry(expiry_date)
-            if 0 <= days_left <= days_threshold:
-                item['days_left'] = days_left
-                expiring_items.append(item)
 
-    # Gün sayısına göre sırala
-    expiring_items.sort(key=lambda x: x['days_left'])
-    return expiring_items
+def turkish_casefold(text: str) -> str:
+    """Türkçe kurallarıyla küçük harfe çevir (İ → i, I → ı)"""
+    return str(text).replace('İ', 'i').replace('I', 'ı').lower()
+
+
+def normalize_name(name: Any) -> str:
+    """Ürün adını karşılaştırma için normalize et (boşluklar ve büyük/küçük harf)"""
+    return " ".join(turkish_casefold(name or "").split())
 
 
 def format_date_turkish(date_str: str) -> str:
@@ -105,6 +97,25 @@ def format_date_turkish(date_str: str) -> str:
         return date_str
 
 
+def expiry_cards_html(items: List[Dict], css_class: str, emoji: str, show_days_left: bool = True) -> str:
+    """Uyarı kartlarını tek HTML bloğu olarak hazırla (ürün alanları kaçışlanır)"""
+    cards = []
+    for item in items:
+        expiry = format_date_turkish(item.get('expiry_date', ''))
+        if show_days_left:
+            expiry += f" ({item['days_left']} gün kaldı)"
+        # Boş satır HTML bloğunu bitireceği için her kart tek satır
+        cards.append(
+            f'<div class="{css_class}">'
+            f'<strong>{emoji} {html.escape(str(item.get("name", "Bilinmeyen")))}</strong><br>'
+            f'📅 Son Kullanma: {html.escape(expiry)}<br>'
+            f'📦 Miktar: {html.escape(str(item.get("quantity", 0)))} {html.escape(str(item.get("unit", "adet")))}<br>'
+            f'📍 Konum: {html.escape(str(item.get("location") or "Belirtilmemiş"))}'
+            f'</div>'
+        )
+    return "\n".join(cards)
+
+
 # Kategori listesi
 CATEGORIES = [
     "Meyve & Sebze",
@@ -121,6 +132,9 @@ CATEGORIES = [
     "Diğer"
 ]
 
+# Tarif isteklerine girmeyen (yiyecek olmayan) kategoriler
+NON_FOOD_CATEGORIES = {"Temizlik", "Kişisel Bakım"}
+
 # Birim listesi
 UNITS = [
     "adet",
@@ -132,4 +146,71 @@ UNITS = [
     "kutu",
     "şişe",
     "poşet"
-]
\ No newline at end of file
+]
+
+
+def validate_item_row(row: Dict) -> Tuple[Optional[Dict], Optional[str]]:
+    """İçe aktarılan satırı ürün sözlüğüne çevir; geçersizse (None, hata mesajı) döndür"""
+    name = str(row.get('name') or '').strip()
+    if not name:
+        return None, "Ürün adı (name) boş"
+
+    category = str(row.get('category') or 'Diğer').strip()
+    if category not in CATEGORIES:
+        return None, f"Geçersiz kategori: {category}"
+
+    unit = str(row.get('unit') or 'adet').strip()
+    if unit not in UNITS:
+        return None, f"Geçersiz birim: {unit}"
+
+    # Yalnızca boş bırakılan miktar 1 sayılır; açıkça yazılan 0 korunur
+    raw_quantity = row.get('quantity')
+    if raw_quantity is None or str(raw_quantity).strip() == '':
+        raw_quantity = 1
+    try:
+        quantity = float(str(raw_quantity).replace(',', '.'))
+    except ValueError:
+        return None, f"Geçersiz miktar: {row.get('quantity')}"
+    if not math.isfinite(quantity):
+        return None, f"Geçersiz miktar: {row.get('quantity')}"
+    if quantity < 0:
+        return None, f"Miktar negatif olamaz: {quantity}"
+
+    expiry_date = str(row.get('expiry_date') or '').strip()
+    if expiry_date:
+        try:
+            datetime.strptime(expiry_date, '%Y-%m-%d')
+        except ValueError:
+            return None, f"Geçersiz tarih (YYYY-AA-GG olmalı): {expiry_date}"
+
+    return {
+        'name': name,
+        'category': category,
+        'quantity': quantity,
+        'unit': unit,
+        'expiry_date': expiry_date,
+        'location': str(row.get('location') or '').strip(),
+        'notes': str(row.get('notes') or '').strip()
+    }, None
+
+
+def read_item_rows(file: IO[bytes], filename: str) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """CSV veya JSONL dosyasını satır satır oku: (satır no, ürün, hata) üretir"""
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    if filename.lower().endswith('.jsonl'):
+        for line_no, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, None, f"JSON okunamadı: {e.msg}"
+                continue
+            if not isinstance(row, dict):
+                yield line_no, None, "Her satır bir JSON nesnesi olmalı"
+                continue
+            yield (line_no, *validate_item_row(row))
+    else:
+        # Başlık satırı 1. satır olduğundan veriler 2. satırdan başlar
+        for line_no, row in enumerate(csv.DictReader(text), start=2):
+            yield (line_no, *validate_item_row(row))